@@ -0,0 +1,29 @@
+import os
+import sys
+import time
+import statistics
+from typing import Callable, List
+
+# Benchmarks run from a plain checkout: import `src` from the repo root and give the model config
+# dummy credentials. Nothing here reaches a real LLM, search provider or database.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("LLM_PROVIDER", "openai")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("USER_AGENT", "bench")
+
+
+def time_calls(fn: Callable[[], object], runs: int, warmup: int = 2) -> List[float]:
+    """Wall time of `runs` calls of `fn`, in milliseconds, after `warmup` untimed calls."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(label: str, samples: List[float], unit: str = "ms"):
+    print(f"{label:<48} median {statistics.median(samples):10.4f} {unit}   max {max(samples):10.4f} {unit}   (n={len(samples)})")
@@ -0,0 +1,25 @@
+"""
+user-001: building and compiling InsightAgentGraph per request vs reusing the graph compiled once.
+
+    python scripts/bench_graph_compile.py [runs]
+"""
+import sys
+import _bench
+from langgraph.checkpoint.memory import MemorySaver
+from src.ai.insight_graph import InsightAgentGraph
+
+
+def main(runs: int = 50):
+    graph = InsightAgentGraph()
+
+    def compile_per_request():
+        # What get_graph() did before: a fresh checkpointer and a full StateGraph build + compile
+        graph.checkpointer = MemorySaver()
+        return graph._create_graph()
+
+    _bench.report("before: build + compile per request", _bench.time_calls(compile_per_request, runs))
+    _bench.report("after: get_graph() on the shared graph", _bench.time_calls(graph.get_graph, runs))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,154 @@
+"""
+user-020: connections opened by back-to-back and concurrent agent LLM calls with a fresh ChatLiteLLM
+per call and litellm's default HTTP clients, vs the get_llm registry and the shared keep-alive pool.
+
+A local OpenAI-compatible stub, on its own thread and event loop, answers /chat/completions after
+--latency seconds and counts the TCP connections it accepts, so "new" connections are connections the
+client had to open and every other request reused one. A call that gets no answer within --timeout
+seconds is counted as timed out rather than hanging the run.
+
+    python scripts/bench_llm_pool.py [--calls 100] [--waves 4] [--concurrency 50] [--latency 0.02] [--timeout 30]
+"""
+import time
+import asyncio
+import threading
+import argparse
+import _bench
+import litellm
+import openai
+from aiohttp import web
+from langchain_community.chat_models import ChatLiteLLM
+from langchain_core.messages import HumanMessage
+import src.ai.llm.model as model
+
+MODEL = "openai/gpt-4o-mini"
+
+
+class StubServer:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.connections = set()
+        self.new_connections = 0
+        self.requests = 0
+        self.port = None
+        self._ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+    async def completions(self, request: web.Request) -> web.Response:
+        # One protocol object per TCP connection; holding them keeps their ids from being reused
+        if request.protocol not in self.connections:
+            self.connections.add(request.protocol)
+            self.new_connections += 1
+        self.requests += 1
+        await request.read()
+        await asyncio.sleep(self.latency)
+        return web.json_response({
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()), "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6},
+        })
+
+    def reset(self):
+        self.new_connections = 0
+        self.requests = 0
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_post("/chat/completions", self.completions)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._ready.set()
+
+    def start(self) -> str:
+        """Serve from a separate thread so the client's event loop can't delay the stub's accepts and replies."""
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._serve(), self._loop)
+        self._ready.wait()
+        return f"http://127.0.0.1:{self.port}"
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def fresh_client(api_base: str):
+    """Before user-020: every agent and call site built its own client."""
+    return ChatLiteLLM(model=MODEL, api_base=api_base, max_retries=0)
+
+
+def registry_client(api_base: str):
+    """Now: one client per settings key, sending through litellm.aclient_session."""
+    return model.get_llm(MODEL, temperature=0.0, agent_name="bench")
+
+
+timed_out = 0
+
+
+async def call(get_client, api_base: str, timeout: float):
+    global timed_out
+    client = get_client(api_base)
+    try:
+        await asyncio.wait_for(client.ainvoke([HumanMessage(content="ping")], api_base=api_base), timeout)
+    except asyncio.TimeoutError:
+        timed_out += 1
+
+
+async def scenario(label: str, server: StubServer, run):
+    global timed_out
+    server.reset()
+    timed_out = 0
+    litellm.in_memory_llm_clients_cache.flush_cache()
+    started = time.perf_counter()
+    await run()
+    seconds = time.perf_counter() - started
+    print(f"{label:<52} {server.requests:4d} requests   {server.new_connections:3d} new connections   {timed_out:2d} timed out   {seconds:6.2f} s")
+
+
+async def run_mode(name: str, get_client, server: StubServer, api_base: str, calls: int, waves: int, concurrency: int, timeout: float):
+    async def back_to_back():
+        for _ in range(calls):
+            await call(get_client, api_base, timeout)
+
+    async def concurrent_waves():
+        for _ in range(waves):
+            await asyncio.gather(*(call(get_client, api_base, timeout) for _ in range(concurrency)))
+
+    await scenario(f"{name}, {calls} back-to-back", server, back_to_back)
+    await scenario(f"{name}, {waves} x {concurrency} concurrent", server, concurrent_waves)
+    if litellm.aclient_session is not None:
+        await model.close_llm_pool()
+        return
+    # Close the clients litellm built for this mode while their loop is still running
+    for client in list(litellm.in_memory_llm_clients_cache.cache_dict.values()):
+        if isinstance(client, openai.AsyncOpenAI):
+            await client.close()
+    litellm.in_memory_llm_clients_cache.flush_cache()
+
+
+def main(calls: int, waves: int, concurrency: int, latency: float, timeout: float):
+    server = StubServer(latency)
+    api_base = server.start()
+    model.get_llm(MODEL, temperature=0.0, agent_name="bench").model_kwargs["api_base"] = api_base
+    pool = litellm.aclient_session
+    print(f"stub latency {latency}s, pool max_keepalive {model.LLM_POOL_MAX_KEEPALIVE}")
+
+    # Each mode gets its own event loop: the fresh clients' sockets, collected while still registered
+    # with the loop, otherwise leave later connections on a reused fd waiting forever.
+    for name, get_client, session in (("before: fresh client, litellm default HTTP", fresh_client, None), ("after: registry + shared pool", registry_client, pool)):
+        litellm.aclient_session = session
+        asyncio.run(run_mode(name, get_client, server, api_base, calls, waves, concurrency, timeout))
+    server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--waves", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the stub takes per completion")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds before a call is given up on")
+    args = parser.parse_args()
+    main(args.calls, args.waves, args.concurrency, args.latency, args.timeout)
@@ -0,0 +1,113 @@
+"""
+user-006: end-to-end latency of a planner run with the old fixed agent sleeps vs the llm_scheduler.
+
+The run is the model-call shape of a non-reasoning planner query: intent, planner, executor, then
+two Web Search tasks and one Finance Data task dispatched together (three ReAct model calls each),
+then the Response Generator. The model is stubbed at ChatLiteLLM._agenerate with a fixed latency,
+so both modes make the same calls and only the waiting around them differs.
+
+    python scripts/bench_llm_scheduler.py [--latency 0.5] [--delay-scale 1.0]
+
+--delay-scale shrinks the old invoke_delay sleeps for a quick run; the report states the scale used.
+"""
+import time
+import asyncio
+import argparse
+import _bench
+from langchain_community.chat_models import ChatLiteLLM
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from src.ai.llm.model import ScheduledChatLiteLLM
+
+# (agent, old invoke_delay in seconds, model calls per run) for each wave of the graph
+WAVES = [
+    [("Query Intent Detector", 12.0, 1)],
+    [("Planner Agent", 10.0, 1)],
+    [("Executor Agent", 20.0, 1)],
+    [("Web Search Agent", 30.0, 3), ("Web Search Agent", 30.0, 3), ("Finance Data Agent", 30.0, 3)],
+    [("Response Generator Agent", 10.0, 1)],
+]
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("429 Too Many Requests")
+        self.response = type("Response", (), {"headers": {"retry-after": str(retry_after)}})()
+
+
+class StubProvider:
+    """Answers every model call after `latency` seconds; the first `rate_limited` calls of a model get a 429."""
+
+    def __init__(self, latency: float, rate_limited: int = 0, retry_after: float = 1.0):
+        self.latency = latency
+        self.rate_limited = rate_limited
+        self.retry_after = retry_after
+        self.calls = 0
+
+    async def agenerate(self, llm, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.rate_limited and llm.model.endswith("primary"):
+            self.rate_limited -= 1
+            raise RateLimited(self.retry_after)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+
+async def old_agent(delay: float, calls: int, model, model_alt):
+    """
+    The agents before user-006: sleep invoke_delay once, run all their model calls, and on any
+    error sleep again and redo the run on the alternate model.
+    """
+    await asyncio.sleep(delay)
+    try:
+        for _ in range(calls):
+            await model.ainvoke([HumanMessage(content="q")])
+    except Exception:
+        await asyncio.sleep(delay)
+        for _ in range(calls):
+            await model_alt.ainvoke([HumanMessage(content="q")])
+
+
+async def new_agent(delay: float, calls: int, model, model_alt):
+    """The agents now: no sleeps; ScheduledChatLiteLLM retries rate limits itself before the fallback."""
+    for _ in range(calls):
+        try:
+            await model.ainvoke([HumanMessage(content="q")])
+        except Exception:
+            await model_alt.ainvoke([HumanMessage(content="q")])
+
+
+async def planner_run(agent, delay_scale: float, model, model_alt) -> float:
+    started = time.perf_counter()
+    for wave in WAVES:
+        await asyncio.gather(*(agent(delay * delay_scale, calls, model, model_alt) for _, delay, calls in wave))
+    return time.perf_counter() - started
+
+
+async def measure(label: str, agent, model_cls, provider: StubProvider, delay_scale: float):
+    ChatLiteLLM._agenerate = lambda llm, *args, **kwargs: provider.agenerate(llm, *args, **kwargs)
+    model = model_cls(model="openai/bench-primary")
+    model_alt = model_cls(model="openai/bench-alternate")
+    seconds = await planner_run(agent, delay_scale, model, model_alt)
+    print(f"{label:<58} {seconds:8.2f} s   ({provider.calls} model calls)")
+
+
+async def main(latency: float, delay_scale: float):
+    print(f"stub model latency {latency}s, old invoke_delay scale {delay_scale}")
+    print("-- every call succeeds")
+    await measure("before: fixed invoke_delay sleeps", old_agent, ChatLiteLLM, StubProvider(latency), delay_scale)
+    await measure("after: ScheduledChatLiteLLM, no sleeps", new_agent, ScheduledChatLiteLLM, StubProvider(latency), 0)
+    await measure("no scheduler, no sleeps (model time only)", new_agent, ChatLiteLLM, StubProvider(latency), 0)
+    print("-- the primary model's first call returns 429 (Retry-After: 1)")
+    await measure("before: sleep, fail, sleep, alternate model", old_agent, ChatLiteLLM, StubProvider(latency, rate_limited=1), delay_scale)
+    await measure("after: wait out Retry-After, retry the primary model", new_agent, ScheduledChatLiteLLM, StubProvider(latency, rate_limited=1), 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per stubbed model call")
+    parser.add_argument("--delay-scale", type=float, default=1.0, help="multiplier for the old invoke_delay sleeps")
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.delay_scale))
@@ -0,0 +1,116 @@
+"""
+user-008: loading a 200-message session with the old per-message find_one lookups vs the $in batching
+in get_messages_by_session.
+
+Runs against an in-memory Mongo (pip install mongomock-motor) seeded with a synthetic session:
+every 4th message has two uploaded files and every 3rd has feedback. mongomock answers instantly,
+so each query is also charged a simulated network round trip (--rtt, in milliseconds).
+
+    python scripts/bench_session_messages.py [--messages 200] [--rtt 1.0] [--runs 5]
+"""
+import asyncio
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+import _bench
+from beanie import init_beanie
+from mongomock_motor import AsyncCursor, AsyncMongoMockClient, AsyncMongoMockCollection
+import src.backend.db.mongodb as mongodb
+from src.backend.db.mongodb import DOCUMENT_MODELS, MessageFeedback, MessageLog, UploadResponse
+
+SESSION_ID = "bench-session"
+round_trips = 0
+
+
+def charge_round_trips(rtt_ms: float):
+    """Count every find_one and every cursor read as one round trip and wait `rtt_ms` for it."""
+    find_one = AsyncMongoMockCollection.find_one
+    to_list = AsyncCursor.to_list
+
+    async def _round_trip():
+        global round_trips
+        round_trips += 1
+        await asyncio.sleep(rtt_ms / 1000)
+
+    async def timed_find_one(self, *args, **kwargs):
+        await _round_trip()
+        return await find_one(self, *args, **kwargs)
+
+    async def timed_to_list(self, *args, **kwargs):
+        await _round_trip()
+        return await to_list(self, *args, **kwargs)
+
+    AsyncMongoMockCollection.find_one = timed_find_one
+    AsyncCursor.to_list = timed_to_list
+
+
+async def seed(messages: int):
+    start = datetime(2026, 1, 1)
+    for i in range(messages):
+        message_id = f"m{i}"
+        doc_ids = [f"f{i}a", f"f{i}b"] if i % 4 == 0 else []
+        await MessageLog(
+            session_id=SESSION_ID, message_id=message_id, created_at=start + timedelta(minutes=i),
+            human_input={"user_query": f"question {i}", "doc_ids": doc_ids},
+            response={"agent_name": "Response Generator Agent", "content": "answer " * 50, "id": f"r{i}"},
+            research=[{"created_at": (start + timedelta(minutes=i, seconds=s)).isoformat(), "title": f"step {s}"} for s in range(3)],
+        ).insert()
+        for file_id in doc_ids:
+            await UploadResponse(file_id=file_id, original_filename=f"{file_id}.pdf", user_id="bench", blob=f"uploads/{file_id}.pdf").insert()
+        if i % 3 == 0:
+            await MessageFeedback(message_id=message_id, response_id=f"r{i}", liked=i % 2 == 0, feedback_tag=[], human_feedback=[]).insert()
+
+
+async def lookups_per_message(session_id: str):
+    """The lookups get_messages_by_session made before user-008: one find_one per message and per file."""
+    logs = await MessageLog.find({"session_id": session_id}, sort=[("created_at", 1)]).to_list()
+    joined = []
+    for log in logs:
+        feedback = await MessageFeedback.find_one({"message_id": log.message_id})
+        doc_info = []
+        for file_id in log.human_input.get("doc_ids", []):
+            doc = await UploadResponse.find_one({"file_id": file_id})
+            if doc:
+                doc_info.append({"file_id": file_id, "file_name": doc.original_filename, "file_type": doc.original_filename.split(".")[-1]})
+        joined.append((log.message_id, feedback.liked if feedback else None, doc_info))
+    return joined
+
+
+async def lookups_batched(session_id: str):
+    """get_messages_by_session as it is now, reduced to the same (message, liked, files) triples."""
+    session = await mongodb.get_messages_by_session(session_id)
+    liked = {"yes": True, "no": False, None: None}
+    return [(m["message_id"], liked[m["feedback"]["liked"]], m["doc_info"]) for m in session["message_list"]]
+
+
+async def measure(label: str, load, runs: int):
+    global round_trips
+    samples = []
+    for _ in range(runs):
+        round_trips = 0
+        started = time.perf_counter()
+        result = await load(SESSION_ID)
+        samples.append((time.perf_counter() - started) * 1000)
+    print(f"{label:<44} {round_trips:4d} round trips   median {statistics.median(samples):8.1f} ms   (n={runs})")
+    return result
+
+
+async def main(messages: int, rtt: float, runs: int):
+    await init_beanie(database=AsyncMongoMockClient()["insight_agent"], document_models=DOCUMENT_MODELS)
+    await seed(messages)
+    charge_round_trips(rtt)
+    print(f"{messages} messages, simulated round trip {rtt} ms")
+    before = await measure("before: find_one per message and file", lookups_per_message, runs)
+    after = await measure("after: one $in query per collection", lookups_batched, runs)
+    assert before == after, "the two lookups disagree"
+    print(f"identical output: {sum(len(files) for _, _, files in after)} doc_info entries, {sum(liked is not None for _, liked, _ in after)} messages with feedback")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--rtt", type=float, default=1.0, help="simulated milliseconds per Mongo round trip")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.rtt, args.runs))
@@ -0,0 +1,114 @@
+"""
+user-012: per-chunk streaming cost of TokenCoalescer + sse_frame vs the old count-15 json.dumps batching.
+
+Replays scripts/fixtures/token_stream.json through the per-chunk path of run_query's stream loop:
+partial-content bookkeeping plus batching and SSE encoding. The coalescer reads a virtual clock set
+to each token's recorded offset, so its time-based flush fires as it would at the recorded pace
+while the replay itself runs as fast as the CPU allows.
+
+    python scripts/bench_sse_coalescing.py [runs]
+"""
+import os
+import sys
+import json
+import time
+import _bench
+import src.backend.utils.sse as sse
+from src.backend.utils.sse import TokenCoalescer
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "token_stream.json")
+MESSAGE_ID = "bench-message"
+
+
+def load_chunks():
+    with open(FIXTURE, encoding="utf-8") as f:
+        events = json.load(f)["events"]
+    chunks = []
+    for offset_ms, agent_name, chunk_type, text in events:
+        field = "title" if chunk_type == "research-chunk" else "content"
+        chunks.append((offset_ms / 1000, {"type": chunk_type, "agent_name": agent_name, field: text, "id": f"{agent_name}-1"}))
+    return chunks
+
+
+def old_path(chunks):
+    """run_query's chunk handling before user-012: a frame every 15 chunks or on agent change, built with json.dumps."""
+    frames = []
+    token_buffer = []
+    partial_content_buffer = []
+
+    def batched_frame():
+        batched_event = {
+            "type": token_buffer[0].get('type', 'unknown_chunk_type'),
+            "agent_name": token_buffer[0].get('agent_name', ''),
+            "message_id": MESSAGE_ID,
+            "id": token_buffer[0].get('id', '')
+        }
+        if any('content' in t for t in token_buffer):
+            batched_event["content"] = "".join([t.get('content', '') for t in token_buffer if 'content' in t])
+        if any('title' in t for t in token_buffer):
+            batched_event["title"] = "".join([t.get('title', '') for t in token_buffer if 'title' in t])
+        return f"data: {json.dumps(batched_event)}\n\n".encode('utf-8')
+
+    for _, chunk in chunks:
+        data_to_send = chunk.copy()
+        if 'content' in data_to_send:
+            partial_content_buffer.append({'content': data_to_send['content'], 'agent_name': data_to_send.get('agent_name', ''), 'type': data_to_send['type'], 'timestamp': time.time()})
+        if token_buffer and (len(token_buffer) >= 15 or data_to_send.get('agent_name') != token_buffer[0].get('agent_name')):
+            frames.append(batched_frame())
+            token_buffer = []
+        token_buffer.append(data_to_send)
+    if token_buffer:
+        frames.append(batched_frame())
+    return frames
+
+
+def new_path(chunks, flush_interval=sse.SSE_FLUSH_INTERVAL, paced=True):
+    """
+    run_query's chunk handling now: TokenCoalescer flushes by agent/type change, size or age, via sse_frame.
+    `paced=False` keeps the clock still, as when the agent produces tokens faster than the loop drains them.
+    """
+    frames = []
+    partial_content_buffer = []
+    coalescer = TokenCoalescer(MESSAGE_ID, flush_interval=flush_interval)
+    clock[0] = 0.0
+    for offset, chunk in chunks:
+        if paced:
+            clock[0] = offset
+        if 'content' in chunk:
+            partial_content_buffer.append((chunk.get('agent_name', ''), chunk['content']))
+        frame = coalescer.add(chunk)
+        if frame:
+            frames.append(frame)
+    if coalescer:
+        frames.append(coalescer.flush())
+    return frames
+
+
+clock = [0.0]
+
+
+def measure(label, path, chunks, runs):
+    path(chunks)
+    started = time.process_time()
+    for _ in range(runs):
+        frames = path(chunks)
+    cpu = (time.process_time() - started) / runs
+    print(f"{label:<36} {len(frames):5d} events/answer   {len(chunks) / cpu / 1000:7.0f}k chunks/s CPU   {cpu * 1000:6.2f} ms CPU/answer   {sum(map(len, frames)):6d} bytes")
+    return frames
+
+
+def main(runs: int = 200):
+    chunks = load_chunks()
+    duration = chunks[-1][0]
+    sse.time.monotonic = lambda: clock[0]
+    print(f"{len(chunks)} chunks over {duration:.1f} s of recorded stream, {runs} runs")
+    old = measure("before: count-15 + json.dumps", old_path, chunks, runs)
+    print(f"{'':<36} {len(old) / duration:5.1f} events/s at the recorded pace")
+    for flush_interval in (sse.SSE_FLUSH_INTERVAL, 0.1, 0.25):
+        new = measure(f"after: coalescer, {flush_interval * 1000:.0f} ms flush", lambda c: new_path(c, flush_interval), chunks, runs)
+        print(f"{'':<36} {len(new) / duration:5.1f} events/s at the recorded pace")
+    measure("after: coalescer, backlogged stream", lambda c: new_path(c, paced=False), chunks, runs)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
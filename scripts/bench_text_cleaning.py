@@ -0,0 +1,120 @@
+"""
+user-021: remove_redundant_blocks (rolling hash over 30-token windows) vs the windowed tuple implementation
+it replaced, on the saved Tavily raw_content pages in scripts/fixtures/tavily_raw_content.json.
+
+Each page first goes through the steps clean_page_text runs before block removal (whitespace, repeated
+words, duplicate lines), so both implementations see the text they would see in production. Reports the
+time per page, the tokens each removes (estimate_tokens, as in the search savings logs) and how many
+30-token windows still repeat afterwards. The old code stopped each window length after 100 phrases,
+so it is also run with its limits lifted.
+
+    python scripts/bench_text_cleaning.py [runs]
+"""
+import os
+import sys
+import json
+import statistics
+import regex as re
+import _bench
+from src.ai.tools.result_dedup import estimate_tokens
+from src.ai.tools.text_cleaning import collapse_repeated_words, remove_duplicate_lines, remove_redundant_blocks
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "tavily_raw_content.json")
+MIN_BLOCK_WORDS = 30
+
+
+def old_remove_redundant_blocks(text: str, min_block_words: int = 30, capped: bool = True) -> str:
+    """
+    AdvancedInternetSearchTool._remove_long_redundant_blocks_optimized before user-021. `capped=False`
+    lifts its 5000-token and 100-phrase limits, to time the windowed algorithm over the whole page.
+    """
+    tokens = text.split()
+    n = len(tokens)
+
+    # Early termination for small texts
+    if n < min_block_words * 2:
+        return text
+
+    # Limit processing for very large texts to avoid performance issues
+    if capped and n > 5000:  # Process only first 5000 tokens for very long content
+        tokens = tokens[:5000]
+        n = 5000
+
+    keep = [True] * n
+    first_occurrence = {}
+
+    # Reduce max phrase length to improve performance
+    max_phrase = min(min_block_words + 5, n // 3)  # Reduced from n//2
+
+    # Process only larger blocks first (reverse order for efficiency)
+    for L in range(max_phrase, min_block_words - 1, -1):
+        for i in range(0, n - L + 1):
+            if not all(keep[i:i+L]):
+                continue
+
+            phrase = tuple(tokens[i:i+L])
+            if phrase in first_occurrence:
+                # Mark tokens for removal
+                for k in range(i, i+L):
+                    keep[k] = False
+            else:
+                first_occurrence[phrase] = i
+
+            # Early termination if we've processed enough
+            if capped and len(first_occurrence) > 100:  # Limit memory usage
+                break
+
+    filtered = [tok for (tok, kf) in zip(tokens, keep) if kf]
+    return " ".join(filtered)
+
+
+def pre_clean(text: str) -> str:
+    """clean_page_text up to the block removal step."""
+    text = re.sub(r'\n\s*\n', '\n', text)
+    text = re.sub(r'\t+', ' ', text)
+    text = re.sub(r' +', ' ', text.strip())
+    return remove_duplicate_lines(collapse_repeated_words(text))
+
+
+def repeated_windows(text: str, width: int = MIN_BLOCK_WORDS) -> int:
+    """Windows of `width` tokens that already appeared earlier in the text."""
+    tokens = text.split()
+    seen = set()
+    repeats = 0
+    for i in range(len(tokens) - width + 1):
+        window = tuple(tokens[i:i + width])
+        if window in seen:
+            repeats += 1
+        seen.add(window)
+    return repeats
+
+
+def main(runs: int = 50):
+    with open(FIXTURE, encoding="utf-8") as f:
+        results = json.load(f)["results"]
+    pages = [(r["url"].split("/")[2], pre_clean(r["raw_content"])) for r in results]
+    implementations = [
+        ("old", lambda text: old_remove_redundant_blocks(text, MIN_BLOCK_WORDS)),
+        ("old uncapped", lambda text: old_remove_redundant_blocks(text, MIN_BLOCK_WORDS, capped=False)),
+        ("new", lambda text: remove_redundant_blocks(text, MIN_BLOCK_WORDS)),
+    ]
+    print(f"{len(pages)} pages, {sum(estimate_tokens(text) for _, text in pages)} tokens after pre-cleaning, {runs} runs")
+    print(f"{'':<30}" + "".join(f"{name:>34}" for name, _ in implementations))
+    print(f"{'':<30}" + f"{'ms':>12}{'removed':>11}{'left':>11}" * len(implementations))
+
+    totals = [[0.0, 0, 0] for _ in implementations]
+    for host, text in pages:
+        row = ""
+        for total, (_, clean) in zip(totals, implementations):
+            ms = statistics.median(_bench.time_calls(lambda: clean(text), runs))
+            cleaned = clean(text)
+            stats = [ms, estimate_tokens(text) - estimate_tokens(cleaned), repeated_windows(cleaned)]
+            total[:] = [t + v for t, v in zip(total, stats)]
+            row += f"{stats[0]:12.3f}{stats[1]:11d}{stats[2]:11d}"
+        print(f"{host:<30}{row}")
+    print(f"{'total':<30}" + "".join(f"{ms:12.3f}{removed:11d}{left:11d}" for ms, removed, left in totals))
+    print("removed: tokens taken out of the page; left: 30-token windows still repeated afterwards")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
@@ -25,5 +25,9 @@ class BaseAgent:
         raise NotImplementedError(
             "Subclasses must implement format_system_prompt")
 
-    def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Graph node entry point. Agents await `ainvoke` on their model or ReAct agent so a
+        run waiting on an LLM or tool frees the event loop for the other runs on the worker.
+        """
         raise NotImplementedError("Subclasses must implement __call__")
@@ -40,7 +40,7 @@ Address any identified issues and enhance the overall quality of the output.\n""
 
         return input_prompt
 
-    def __call__(self, state: Dict[str, Any]) -> Command[Literal["Manager Agent", "Task Router"]]:
+    async def __call__(self, state: Dict[str, Any]) -> Command[Literal["Manager Agent", "Task Router"]]:
         task = state['current_task'].copy()
 
         input_prompt = self.format_input_prompt(state)
@@ -56,13 +56,13 @@ Address any identified issues and enhance the overall quality of the output.\n""
 
         try:
             agent = create_react_agent(model=self.model, tools=self.tools, prompt=system_message)
-            communication_log = agent.invoke(input)
+            communication_log = await agent.ainvoke(input)
 
         except Exception as e:
             print(f"Falling back to alternate model: {str(e)}")
             try:
                 agent = create_react_agent(model=self.model_alt, tools=self.tools, prompt=system_message)
-                communication_log = agent.invoke(input)
+                communication_log = await agent.ainvoke(input)
 
             except Exception as e:
                 print(f"Error occurred in fallback model: {str(e)}")
@@ -82,6 +82,7 @@ Address any identified issues and enhance the overall quality of the output.\n""
             goto=agent_name,
             update={
                 "messages": filtered_message_history,
-                "current_task": task
+                "current_task": task,
+                "completed_tasks": [task]
             }
         )
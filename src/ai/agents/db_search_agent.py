@@ -39,7 +39,7 @@ class DBSearchAgent(BaseAgent):
 
         return input_prompt
 
-    def __call__(self, state: Dict[str, Any]) -> Command[Literal["Planner Agent", "Manager Agent", "Validation Agent"]]:
+    async def __call__(self, state: Dict[str, Any]) -> Command[Literal["Planner Agent", "Manager Agent", "Validation Agent"]]:
         input_prompt = self.format_input_prompt(state)
         system_message = SystemMessage(content=self.system_prompt)
         human_message = HumanMessage(content=input_prompt)
@@ -52,13 +52,13 @@ class DBSearchAgent(BaseAgent):
         input = {"messages": context_messages + [human_message]}
         try:
             agent = create_react_agent(model=self.model, tools=self.tools, prompt=system_message)
-            communication_log = agent.invoke(input)
+            communication_log = await agent.ainvoke(input)
 
         except Exception as e:
             print(f"Falling back to alternate model: {str(e)}")
             try:
                 agent = create_react_agent(model=self.model_alt, tools=self.tools, prompt=system_message)
-                communication_log = agent.invoke(input)
+                communication_log = await agent.ainvoke(input)
 
             except Exception as e:
                 print(f"Error occurred in fallback model: {str(e)}")
@@ -77,7 +77,8 @@ class DBSearchAgent(BaseAgent):
             goto=agent_name,
             update={
                 "messages": message_history,
-                "current_task": task
+                "current_task": task,
+                "completed_tasks": [task]
             }
         )
 
@@ -3,11 +3,10 @@ from src.ai.ai_schemas.structured_responses import ExecutorAgentOutput
 from src.ai.agent_prompts.executor_agent import SYSTEM_PROMPT
 from typing import Dict, Any
 from langchain_core.messages import HumanMessage, SystemMessage
-from src.ai.llm.model import get_llm, get_llm_alt
+from src.ai.llm.model import get_llm, get_llm_alt, hedged_call
 from src.ai.llm.config import ExecutorConfig
 import json
 import re
-from time import sleep
 from langgraph.prebuilt import create_react_agent
 
 exc = ExecutorConfig()
@@ -19,7 +18,6 @@ class ExecutorAgent(BaseAgent):
         self.model_alt = get_llm_alt(exc.ALT_MODEL, exc.ALT_TEMPERATURE)
         self.response_schema = ExecutorAgentOutput
         self.system_prompt = SYSTEM_PROMPT
-        self.invoke_delay = 20.0
         
         # Detect if using Ollama
         self.is_ollama = self._is_ollama_model(exc.MODEL)
@@ -135,42 +133,25 @@ RESPOND WITH ONLY THE JSON OBJECT - NO OTHER TEXT.
         print("----Executor Input----\n", input_prompt, "\n----Executor Input End----")
         return input_prompt
 
-    def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         input_prompt = self.format_input_prompt(state)
         system_message = SystemMessage(content=self.system_prompt)
         human_message = HumanMessage(content=input_prompt)
         
         # input = {"messages": [human_message]}
         
-        sleep(self.invoke_delay)
-        try:
-            # agent = create_react_agent(model=self.model, tools=self.tools, prompt=system_message)     
-            # response = agent.invoke(input)
-            if self.is_ollama:
+        def ainvoke(model):
+            is_ollama = self.is_ollama if model is self.model else self.is_ollama_alt
+            if is_ollama:
                 # Ollama: Don't use response_format, as it doesn't support it properly
                 print("Using Ollama model without structured output")
-                response = self.model.invoke(input=[system_message, human_message])
-            else:
-                # OpenAI/Azure: Use structured output
-                print("Using OpenAI/Azure model with structured output")
-                response = self.model.invoke(
-                    input=[system_message, human_message], response_format=self.response_schema)
-        except Exception as e:
-            print(f"Falling back to alternate model: {str(e)}")
-            sleep(self.invoke_delay)
-            try:
-                # agent = create_react_agent(model=self.model_alt, tools=self.tools, prompt=system_message) 
-                # response = agent.invoke(input)
-                if self.is_ollama_alt:
-                    print("Using Ollama alternate model without structured output")
-                    response = self.model_alt.invoke(input=[system_message, human_message])
-                else:
-                    print("Using OpenAI/Azure alternate model with structured output")
-                    response = self.model_alt.invoke(
-                        input=[system_message, human_message], response_format=self.response_schema)
-            except Exception as e:
-                print(f"Error occurred in fallback model: {str(e)}")
-                raise e
+                return model.ainvoke(input=[system_message, human_message])
+            # OpenAI/Azure: Use structured output
+            print("Using OpenAI/Azure model with structured output")
+            return model.ainvoke(
+                input=[system_message, human_message], response_format=self.response_schema)
+
+        response = await hedged_call("Executor Agent", self.model, self.model_alt, ainvoke)
             
         print("Xecutor Agent - task_list vvv")
         print(f"response = {response}")
@@ -8,6 +8,7 @@ from src.ai.llm.model import get_llm, get_llm_alt
 from src.ai.llm.config import FastAgentConfig, CountUsageMetricsPricingConfig
 from langgraph.types import Command
 from src.backend.utils.utils import get_date_time, format_fast_agent_update, PRICING, get_user_metadata
+from src.backend.utils.graph_log import graph_log_entry
 import asyncio
 import src.backend.db.mongodb as mongodb
 import time
@@ -62,17 +63,15 @@ async def process_fast_agent_input(user_id: str, session_id: str, user_query: st
     local_time = get_date_time(timezone)
 
     def store_current_message(content: dict):
+        # Decide before copying: most streamed items are chunks that are never stored
+        if 'response' not in content and 'type' in content and content['type'].endswith('chunk'):
+            return
+
         enriched_content = content.copy()
 
         if 'created_at' not in enriched_content:
             enriched_content['created_at'] = local_time.isoformat()
 
-        if 'response' in enriched_content:
-            return enriched_content
-
-        if 'type' in enriched_content and enriched_content['type'].endswith('chunk'):
-            return
-
         return enriched_content
 
 
@@ -106,8 +105,9 @@ async def process_fast_agent_input(user_id: str, session_id: str, user_query: st
             'doc_ids': doc_ids if doc_ids else [],
         }
         yield {"enriched_content": store_current_message(input_data)}
-        message_logs = f"HUMAN INPUT\n{str(input_data)}\n\n"
-        yield {"message_logs": message_logs}
+        log_entry = graph_log_entry("human_input", input_data)
+        if log_entry:
+            yield log_entry
         await mongodb.store_user_query(user_id, session_id, message_id, user_query, timezone, doc_ids)
 
         async for stream_mode, update in agent.astream(input={"messages": input_messages}, stream_mode=['updates', 'messages', 'custom'], config={'recursion_limit': 50}):
@@ -115,8 +115,9 @@ async def process_fast_agent_input(user_id: str, session_id: str, user_query: st
             # await asyncio.sleep(0.1)  # Small delay between steps
             if stream_mode == 'updates':
                 print("---\n", update, "\n---")
-                message_logs = f"AGENT UPDATE\n{str((stream_mode, update))}\n\n"
-                yield {"message_logs": message_logs}
+                log_entry = graph_log_entry("update", update)
+                if log_entry:
+                    yield log_entry
             
             if stream_mode == 'custom':
                 print("---\n", update, "\n---")
@@ -131,8 +132,9 @@ async def process_fast_agent_input(user_id: str, session_id: str, user_query: st
             msg_to_yield = await format_fast_agent_update(stream_mode, update)
 
             if msg_to_yield:
-                message_logs = f"FORMATTED MESSAGE\n{str(msg_to_yield)}\n\n"
-                yield {"message_logs": message_logs}
+                log_entry = graph_log_entry("message", msg_to_yield)
+                if log_entry:
+                    yield log_entry
 
             if isinstance(msg_to_yield, list):
                 for m_item in msg_to_yield:
@@ -141,7 +143,9 @@ async def process_fast_agent_input(user_id: str, session_id: str, user_query: st
                     else:
                         yield m_item
 
-                        yield {"enriched_content": store_current_message(m_item)}
+                        enriched_content = store_current_message(m_item)
+                        if enriched_content:
+                            yield {"enriched_content": enriched_content}
                         if 'sources' in m_item:
                             sources_for_message.extend(m_item['sources'])
                             
@@ -162,7 +166,7 @@ async def process_fast_agent_input(user_id: str, session_id: str, user_query: st
 
         final_data_event = {'state': "completed_from_graph"}
 
-        related_queries = await asyncio.to_thread(get_related_queries_util, await mongodb.get_session_history_from_db(session_id, message_id, limit = 3))
+        related_queries = await get_related_queries_util(await mongodb.get_session_history_from_db(session_id, message_id, limit = 3))
 
         if related_queries:
             final_data_event['related_queries'] = related_queries
@@ -178,8 +182,9 @@ async def process_fast_agent_input(user_id: str, session_id: str, user_query: st
     except Exception as e:
         error_msg = f"Error in agent processing: {traceback.format_exc()}"
         print(error_msg)
-        message_logs = f"ERROR MESSAGE\n{str(error_msg)}\n\n"
-        yield {"message_logs": message_logs}
+        log_entry = graph_log_entry("error", error_msg)
+        if log_entry:
+            yield log_entry
         error_event = {'error': error_msg}
         yield error_event
 
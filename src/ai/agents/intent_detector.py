@@ -7,10 +7,9 @@ from langgraph.types import Command
 from langgraph.graph import END
 import json
 import re
-from src.ai.llm.model import get_llm, get_llm_alt
+from src.ai.llm.model import get_llm, get_llm_alt, hedged_call
 #from src.ai.llm.config import IntentDetectionConfig
 from src.ai.llm.config import  IntentDetectionConfig
-from time import sleep
 
 
 cfg = IntentDetectionConfig()
@@ -23,7 +22,6 @@ class IntentDetector(BaseAgent):
         self.model_alt = get_llm_alt(cfg.ALT_MODEL, cfg.ALT_TEMPERATURE)
         self.response_schema = IntentDetection
         self.system_prompt = SYSTEM_PROMPT
-        self.invoke_delay = 12.0
 
     def format_input_prompt(self, state: Dict[str, Any]) -> str:
         input_prompt = ""
@@ -52,24 +50,15 @@ class IntentDetector(BaseAgent):
         history.append(HumanMessage(content=input_prompt))
         return history
 
-    def __call__(self, state: Dict[str, Any]) -> Command[Literal["Manager Agent", "Planner Agent", "DB Search Agent", "__end__"]]:
+    async def __call__(self, state: Dict[str, Any]) -> Command[Literal["Manager Agent", "Planner Agent", "DB Search Agent", "__end__"]]:
         history = self.format_input_prompt(state)
         messages = [SystemMessage(content=self.system_prompt)] + history
         
-        sleep(self.invoke_delay)
-        try:
-            output = self.model.invoke(input=messages, response_format=self.response_schema)
-            # print("From Inside Intent Detector")
-            # print(f"input to llm = \n{messages}\n")
-            # print(f"output of llm = \n{output}\n")
-        except Exception as e:
-            print(f"Falling back to alternate model: {str(e)}")
-            sleep(self.invoke_delay)
-            try:
-                output = self.model_alt.invoke(input=messages, response_format=self.response_schema)
-            except Exception as e:
-                print(f"Error occurred in fallback model: {str(e)}")
-                raise e
+        output = await hedged_call("Query Intent Detector", self.model, self.model_alt,
+                                   lambda model: model.ainvoke(input=messages, response_format=self.response_schema))
+        # print("From Inside Intent Detector")
+        # print(f"input to llm = \n{messages}\n")
+        # print(f"output of llm = \n{output}\n")
 
         # Robust JSON extraction
         response_content = output.content
@@ -3,13 +3,12 @@ from src.ai.agent_prompts.manager_agent import SYSTEM_PROMPT
 from typing import Dict, Any, Literal
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, BaseMessage
 import json
-from src.ai.llm.model import get_llm, get_llm_groq
+from src.ai.llm.model import get_llm, get_llm_groq, hedged_call
 #from src.ai.llm.config import ManagerConfig
 from src.ai.llm.config import  ManagerConfig
 from langgraph.types import Command
 from langgraph.graph import END
 import re
-from time import sleep
 
 
 
@@ -22,7 +21,6 @@ class ManagerAgent(BaseAgent):
        self.model = get_llm(mac.MODEL, mac.TEMPERATURE)
        self.model_alt = get_llm_groq(mac.ALT_MODEL, mac.ALT_TEMPERATURE, mac.ALT_TOP_P, mac.ALT_TOP_K)
        self.system_prompt = SYSTEM_PROMPT
-       self.invoke_delay = 12.0
 
 
    def format_input_prompt(self, state: Dict[str, Any]) -> str:
@@ -156,22 +154,13 @@ class ManagerAgent(BaseAgent):
        return thinking_process, json_dict
 
 
-   def __call__(self, state: Dict[str, Any]) -> Dict[str, Any] | Command[Literal["Web Search Agent", "Social Media Scrape Agent", "Finance Data Agent", "Coding Agent", "Response Generator Agent", "__end__"]]:
+   async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any] | Command[Literal["Web Search Agent", "Social Media Scrape Agent", "Finance Data Agent", "Coding Agent", "Response Generator Agent", "__end__"]]:
        input_prompt = self.format_input_prompt(state)
        system_message = SystemMessage(content=self.system_prompt)
        human_message = HumanMessage(content=input_prompt)
 
-       sleep(self.invoke_delay)
-       try:
-           response = self.model.invoke(input=[system_message, human_message])
-       except Exception as e:
-           print(f"Falling back to alternate model: {str(e)}")
-           sleep(self.invoke_delay)
-           try:
-               response = self.model_alt.invoke(input=[system_message, human_message])
-           except Exception as e:
-               print(f"Error occurred in fallback model: {str(e)}")
-               raise e
+       response = await hedged_call("Manager Agent", self.model, self.model_alt,
+                                    lambda model: model.ainvoke(input=[system_message, human_message]))
 
 
        thinking, task_json = self.extract_thinking_and_json(response.content)
@@ -32,7 +32,7 @@ class MapAgent(BaseAgent):
 
         return input_prompt
 
-    def __call__(self, state: Dict[str, Any]) -> Command[Literal["Manager Agent", "Task Router"]]:
+    async def __call__(self, state: Dict[str, Any]) -> Command[Literal["Manager Agent", "Task Router"]]:
         task = state['current_task'].copy()
 
         input_prompt = self.format_input_prompt(state)
@@ -44,13 +44,13 @@ class MapAgent(BaseAgent):
 
         try:
             agent = create_react_agent(model=self.model, tools=self.tools, response_format=self.response_schema, prompt=system_message)
-            communication_log = agent.invoke(agent_input)
+            communication_log = await agent.ainvoke(agent_input)
 
         except Exception as e:
             print(f"Falling back to alternate model: {str(e)}")
             try:
                 agent = create_react_agent(model=self.model_alt, tools=self.tools, response_format=self.response_schema, prompt=system_message)
-                communication_log = agent.invoke(agent_input)
+                communication_log = await agent.ainvoke(agent_input)
 
             except Exception as e:
                 print(f"Error occurred in fallback model: {str(e)}")
@@ -68,6 +68,7 @@ class MapAgent(BaseAgent):
             goto=agent_name,
             update={
                 "messages": message_history,
-                "current_task": task
+                "current_task": task,
+                "completed_tasks": [task]
             }
         )
@@ -6,11 +6,10 @@ from typing import Dict, Any
 from langchain_core.messages import HumanMessage, SystemMessage
 import json
 import re
-from src.ai.llm.model import get_llm, get_llm_alt
+from src.ai.llm.model import get_llm, get_llm_alt, hedged_call
 #from src.ai.llm.config import PlannerConfig
 from src.ai.llm.config import  PlannerConfig
 import asyncio
-from time import sleep
 
 pac = PlannerConfig()
 
@@ -21,7 +20,6 @@ class PlannerAgent(BaseAgent):
         self.model_alt = get_llm_alt(pac.ALT_MODEL, pac.ALT_TEMPERATURE)
         self.response_schema = PlannerAgentOutput
         self.system_prompt = SYSTEM_PROMPT
-        self.invoke_delay = 10.0
 
     def format_input_prompt(self, state: Dict[str, Any]) -> str:
         user_query = state.get('formatted_user_query', state['user_query'])
@@ -70,23 +68,13 @@ class PlannerAgent(BaseAgent):
 
         return thinking_process, json_dict
 
-    def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         input_prompt = self.format_input_prompt(state)
         system_message = SystemMessage(content=self.system_prompt)
         human_message = HumanMessage(content=input_prompt)
         
-        sleep(self.invoke_delay)
-
-        try:
-            response = self.model.invoke(input=[system_message, human_message])
-        except Exception as e:
-            print(f"Falling back to alternate model: {str(e)}")
-            sleep(self.invoke_delay)
-            try:
-                response = self.model_alt.invoke(input=[system_message, human_message])
-            except Exception as e:
-                print(f"Error occurred in fallback model: {str(e)}")
-                raise e
+        response = await hedged_call("Planner Agent", self.model, self.model_alt,
+                                     lambda model: model.ainvoke(input=[system_message, human_message]))
             
         print("========\n", response.content, "\n++++++++")
         thinking, task_json = self.extract_thinking_and_json(response.content)
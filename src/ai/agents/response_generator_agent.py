@@ -9,7 +9,6 @@ from src.ai.llm.config import  ReportGenerationConfig
 from src.ai.tools.graph_gen_tool import graph_tool_list
 from langgraph.prebuilt import create_react_agent
 from datetime import date
-from time import sleep
 
 
 rgc = ReportGenerationConfig()
@@ -22,7 +21,6 @@ class ReportGenerationAgent(BaseAgent):
         self.model_alt = get_llm_alt(rgc.ALT_MODEL, rgc.ALT_TEMPERATURE, rgc.ALT_MAX_TOKENS)
         self.tools = graph_tool_list
         self.system_prompt = SYSTEM_PROMPT
-        self.invoke_delay = 10.0
 
     def format_input_prompt(self, state: Dict[str, Any]) -> str:
         # print("--- From inside format_input_prompt of ReportGenerationAgent ---") #
@@ -58,7 +56,7 @@ class ReportGenerationAgent(BaseAgent):
 
         return input_prompt
 
-    def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         task = state['current_task'].copy()
         # print("--- Start of ReportGenerationAgent ---") #
         # print(f"\n state inside ReportGenerationAgent = {state}\n") #
@@ -69,21 +67,18 @@ class ReportGenerationAgent(BaseAgent):
 
         input = {"messages": [human_message]}
         
-        sleep(self.invoke_delay)
-
         try:
             # response = self.model.invoke(input=[system_message, human_message])
             agent = create_react_agent(model=self.model, tools=self.tools, prompt=system_message)            
-            response = agent.invoke(input)
+            response = await agent.ainvoke(input)
             print(f"response of report generation agent = {response}.") 
 
         except Exception as e:
             print(f"Falling back to alternate model: {str(e)}")
-            sleep(self.invoke_delay)
             try:
                 agent = create_react_agent(
                     model=self.model_alt, tools=self.tools, prompt=system_message)
-                response = agent.invoke(input)
+                response = await agent.ainvoke(input)
             except Exception as e:
                 print(f"Error occurred in fallback model: {str(e)}")
                 raise e
@@ -131,8 +126,10 @@ class ReportGenerationAgent(BaseAgent):
      
         print(f"===Progress in Response Generator Agent: {progress}===")
         
+        task['status'] = 'completed'
         return {
             "messages": all_messages,
             "final_response": final_response,
-            "progress_bar": progress
+            "progress_bar": progress,
+            "completed_tasks": [task]
         }
\ No newline at end of file
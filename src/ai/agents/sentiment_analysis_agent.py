@@ -28,7 +28,7 @@ Address any identified issues and enhance the overall quality of the output.\n""
 
         return input_prompt
 
-    def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         task = state['current_task'].copy()
 
         input_prompt = self.format_input_prompt(state)
@@ -41,12 +41,12 @@ Address any identified issues and enhance the overall quality of the output.\n""
                 task['required_context'], state['task_list'])
 
         try:
-            response = self.model.invoke(
+            response = await self.model.ainvoke(
                 input=[system_message] + context_messages + [human_message])
         except Exception as e:
             print(f"Falling back to alternate model: {str(e)}")
             try:
-                response = self.model_alt.invoke(
+                response = await self.model_alt.ainvoke(
                     input=[system_message] + context_messages + [human_message])
             except Exception as e:
                 print(f"Error occurred in fallback model: {str(e)}")
@@ -56,5 +56,6 @@ Address any identified issues and enhance the overall quality of the output.\n""
 
         return {
             "messages": [human_message, response],
-            "current_task": task
+            "current_task": task,
+            "completed_tasks": [task]
         }
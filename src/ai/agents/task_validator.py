@@ -38,18 +38,18 @@ class TaskValidation(BaseAgent):
 
         return input_prompt
 
-    def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         input_prompt = self.format_input_prompt(state)
         system_message = SystemMessage(content=self.system_prompt)
         human_message = HumanMessage(content=input_prompt)
 
         try:
-            response = self.model.invoke(
+            response = await self.model.ainvoke(
                 input=[system_message, human_message], response_format=self.response_schema)
         except Exception as e:
             print(f"Falling back to alternate model: {str(e)}")
             try:
-                response = self.model_alt.invoke(
+                response = await self.model_alt.ainvoke(
                     input=[system_message, human_message], response_format=self.response_schema)
             except Exception as e:
                 print(f"Error occurred in fallback model: {str(e)}")
@@ -1,5 +1,5 @@
 from typing import List, Dict, Any, Literal
-from langgraph.types import Command
+from langgraph.types import Command, Send
 from langgraph.graph import END
 from langchain_core.messages import AIMessage, ToolMessage
 from src.ai.llm.model import get_llm, get_llm_alt
@@ -7,6 +7,7 @@ from src.ai.ai_schemas.structured_responses import RelatedQueries
 import json
 import re
 from dotenv import load_dotenv
+import os
 #from src.ai.llm.config import GenerateSessionTitleConfig, GetRelatedQueriesConfig
 from src.ai.llm.config import  GenerateSessionTitleConfig, GetRelatedQueriesConfig
 
@@ -16,6 +17,8 @@ load_dotenv()
 gstc = GenerateSessionTitleConfig()
 grqc = GetRelatedQueriesConfig()
 
+TASK_ROUTER_MAX_PARALLEL = max(int(os.getenv("TASK_ROUTER_MAX_PARALLEL", 4)), 1)
+
 def get_context_messages(required_context: List[str], task_list: List[Dict[str, Any]]) -> List:
     context_messages = []
     required_tool_names = [
@@ -143,57 +146,90 @@ def get_context_messages_for_response(required_context: List[str], task_list: Li
 #     )
 
 
+RESPONSE_GENERATOR_AGENT = "Response Generator Agent"
+
+
+def _ready_tasks(task_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Pending tasks whose required_context tasks have all completed, in plan order.
+    The Response Generator writes the final answer, so it waits for every other task,
+    whatever its required_context says, and is only ever dispatched on its own.
+    """
+    task_names = {task['task_name'] for task in task_list}
+    completed = {task['task_name'] for task in task_list if task.get('status') == 'completed'}
+    others_pending = any(
+        task.get('status') != 'completed' and task.get('agent_name') != RESPONSE_GENERATOR_AGENT for task in task_list
+    )
+    ready = []
+    for task in task_list:
+        if task.get('status') == 'completed':
+            continue
+        if task.get('agent_name') == RESPONSE_GENERATOR_AGENT:
+            if not others_pending:
+                return [task]
+            continue
+        # Context naming tasks outside the plan can never be satisfied, so it is ignored
+        dependencies = [name for name in (task.get('required_context') or []) if name in task_names]
+        if all(name in completed for name in dependencies):
+            ready.append(task)
+    return ready
+
+
 def task_router_node(state: Dict[str, Any]) -> Command[Literal["Web Search Agent", "Social Media Scrape Agent", "Finance Data Agent",
                                                                "Sentiment Analysis Agent", "Data Comparison Agent", "Coding Agent",
                                                                "Response Generator Agent", "__end__"]]:
-    task_list = state['task_list'].copy()
-    current_task = state.get('current_task')
+    """
+    Dispatch every planner task whose required_context is satisfied, up to TASK_ROUTER_MAX_PARALLEL
+    at a time, as parallel Send branches. Each branch reports back through `completed_tasks` and the
+    router runs again once the whole wave has finished. task_list keeps plan order, so the Response
+    Generator reads context in the order the planner wrote it. TASK_ROUTER_MAX_PARALLEL=1 restores
+    strictly sequential execution.
+    """
+    task_list = [task.copy() for task in state['task_list']]
     TOTAL_PROGRESS = 70.0
 
-    if current_task is None:
-        # First task
-        next_task = task_list[0]
-        
-        num_tasks = len(task_list) - 1
-        progress_per_task = TOTAL_PROGRESS / num_tasks if num_tasks > 0 else 0.0
-        
-        new_progress = state.get("progress_bar", 0.0)  # no increment here
-        # print("====Inside Executor agent (initial task)====")
-        # print(f"===Progress in Executor Agent: {new_progress}===")
-        # print(f"===Progress in Executor Agent: {new_progress+10}===")
-    else:
-        # Continuing task list
-        current_task_index = next((index for index, task in enumerate(task_list) if task['task_name'] == current_task['task_name']), -1)
-        task_list[current_task_index] = current_task
+    num_tasks = len(task_list) - 1
+    progress_per_task = TOTAL_PROGRESS / num_tasks if num_tasks > 0 else 0.0
 
-        num_tasks = len(task_list) - 1
-        progress_per_task = TOTAL_PROGRESS / num_tasks if num_tasks > 0 else 0.0
-        
-        print(f"\n====Progress per task: {progress_per_task}====\n")
-        current_progress = state.get("progress_bar", 0.0)
-        new_progress = min(current_progress + progress_per_task, 100.0)
+    finished_tasks = {task['task_name']: task for task in state.get('completed_tasks') or []}
+    newly_completed = 0
+    for index, task in enumerate(task_list):
+        if task['task_name'] in finished_tasks and task.get('status') != 'completed':
+            task_list[index] = {**finished_tasks[task['task_name']], 'status': 'completed'}
+            newly_completed += 1
 
+    current_progress = state.get("progress_bar", 0.0)
+    new_progress = min(current_progress + progress_per_task * newly_completed, 100.0)
+    if newly_completed:
+        print(f"\n====Progress per task: {progress_per_task}====\n")
         print("====Inside Executor agent====")
         print(f"===Progress in Executor Agent: {new_progress}===")
 
-        if current_task_index == len(task_list) - 1:
-            return Command(
-                goto=END,
-                update={
-                    'task_list': task_list,
-                    'progress_bar': new_progress
-                }
-            )
-
-        next_task = task_list[current_task_index + 1]
-
-    target_agent = next_task['agent_name']
+    pending = [task for task in task_list if task.get('status') != 'completed']
+    if not pending:
+        return Command(
+            goto=END,
+            update={
+                'task_list': task_list,
+                'progress_bar': new_progress
+            }
+        )
+
+    ready = _ready_tasks(task_list)
+    if not ready:
+        # Cyclic or forward-referencing context from the planner: fall back to plan order
+        ready = [task for task in pending if task.get('agent_name') != RESPONSE_GENERATOR_AGENT][:1] or pending[:1]
+    next_tasks = ready[:TASK_ROUTER_MAX_PARALLEL]
+    print(f"===Task Router dispatching: {[task['task_name'] for task in next_tasks]}===")
 
     return Command(
-        goto=target_agent,
+        goto=[
+            Send(task['agent_name'], {**state, 'task_list': task_list, 'current_task': task, 'progress_bar': new_progress})
+            for task in next_tasks
+        ],
         update={
-            'current_task': next_task,
             'task_list': task_list,
+            'dispatched_tasks': next_tasks,
             'progress_bar': new_progress
         }
     )
@@ -231,7 +267,7 @@ def detect_query_language(text: str) -> str:
     return 'english'
 
 
-def get_related_queries_util(previous_messages: dict) -> List[str]:
+async def get_related_queries_util(previous_messages: dict) -> List[str]:
     # input = "The following are the user queries from previous interactions from oldest to latest:\n"
     input = """
     You are given a list of user search queries and corresponding AI responses from a past interaction, ordered from oldest to latest. Your task is to generate four related search queries that a user might ask next or that are semantically similar to the original queries, taking into account both the user query and the AI response. All generated queries must focus on financial or economic aspects related to the topic of the original query and response. The queries should be concise, relevant, and designed to explore financial implications, economic impacts, or business-related angles.
@@ -314,7 +350,7 @@ def get_related_queries_util(previous_messages: dict) -> List[str]:
         # model = get_llm(model_name="gemini/gemini-2.5-pro", temperature=0.2)
         model = get_llm(model_name=grqc.MODEL, temperature=grqc.TEMPERATURE, agent_name="RelatedQueriesAgent")
         # Remove response_format
-        response = model.invoke(input=input)
+        response = await model.ainvoke(input=input)
 
     except Exception as e:
         print(f"Falling back to alternate model: {str(e)}")
@@ -322,7 +358,7 @@ def get_related_queries_util(previous_messages: dict) -> List[str]:
             # model = get_llm_alt("gemini/gemini-2.0-flash-lite", 0.6)
             model = get_llm_alt(model_name=grqc.ALT_MODEL, temperature=grqc.ALT_TEMPERATURE, agent_name="RelatedQueriesAgent")
             # Remove response_format
-            response = model.invoke(input=input)
+            response = await model.ainvoke(input=input)
         except Exception as e:
             print(f"Error occurred in fallback model: {str(e)}")
             raise e
@@ -6,7 +6,7 @@ from src.ai.ai_schemas.structured_responses import ValidationFeedback
 from langgraph.types import Command, interrupt
 from langgraph.graph import END
 import json
-from src.ai.llm.model import get_llm, get_llm_alt
+from src.ai.llm.model import get_llm, get_llm_alt, hedged_call
 #from src.ai.llm.config import ValidationConfig
 from src.ai.llm.config import  ValidationConfig
 
@@ -30,7 +30,7 @@ class ValidationAgent(BaseAgent):
         return "\n".join(input_prompt)
 
   
-    def __call__(self, state: Dict[str, Any]) -> Command[Literal["Planner Agent", "Manager Agent", "__end__"]]:
+    async def __call__(self, state: Dict[str, Any]) -> Command[Literal["Planner Agent", "Manager Agent", "__end__"]]:
         FEEDBACK_CYCLE_LIMIT = 3
 
         if state.get('feedback_cycle', 0) >= FEEDBACK_CYCLE_LIMIT:
@@ -47,21 +47,11 @@ class ValidationAgent(BaseAgent):
         system_message = SystemMessage(content=self.system_prompt)
         human_message = HumanMessage(content=input_prompt)
 
-        try:
-            response = self.model.invoke(
-                input=[system_message, human_message],
-                response_format=self.response_schema
-            )
-        except Exception as e:
-            print(f"Falling back to alternate model: {str(e)}")
-            try:
-                response = self.model_alt.invoke(
-                    input=[system_message, human_message],
-                    response_format=self.response_schema
-                )
-            except Exception as e:
-                print(f"Error occurred in fallback model: {str(e)}")
-                raise e
+        response = await hedged_call("Validation Agent", self.model, self.model_alt,
+                                     lambda model: model.ainvoke(
+                                         input=[system_message, human_message],
+                                         response_format=self.response_schema
+                                     ))
 
         validation_result = json.loads(response.content)
 
@@ -10,7 +10,6 @@ from src.ai.llm.model import get_llm, get_llm_alt
 #from src.ai.llm.config import WebSearchConfig
 from src.ai.llm.config import  WebSearchConfig
 from langgraph.types import Command
-from time import sleep
 
 
 wsc = WebSearchConfig()
@@ -23,7 +22,6 @@ class WebSearchAgent(BaseAgent):
         self.model_alt = get_llm_alt(wsc.ALT_MODEL, wsc.ALT_TEMPERATURE)
         self.tools = tool_list
         self.system_prompt = SYSTEM_PROMPT
-        self.invoke_delay = 30.0
 
     def format_input_prompt(self, state: Dict[str, Any]) -> str:
         task = state['current_task']
@@ -38,7 +36,7 @@ Address any identified issues and enhance the overall quality of the output.\n""
 
         return input_prompt
 
-    def __call__(self, state: Dict[str, Any]) -> Command[Literal["Manager Agent", "Task Router"]]:
+    async def __call__(self, state: Dict[str, Any]) -> Command[Literal["Manager Agent", "Task Router"]]:
         task = state['current_task'].copy()
 
         input_prompt = self.format_input_prompt(state)
@@ -52,19 +50,16 @@ Address any identified issues and enhance the overall quality of the output.\n""
 
         input = {"messages": context_messages + [human_message]}
         
-        sleep(self.invoke_delay)
-
         try:
             agent = create_react_agent(model=self.model, tools=self.tools, prompt=system_message)
-            communication_log = agent.invoke(input)
+            communication_log = await agent.ainvoke(input)
 
         except Exception as e:
             print(f"Falling back to alternate model: {str(e)}")
-            sleep(self.invoke_delay)
             try:
                 agent = create_react_agent(
                     model=self.model_alt, tools=self.tools, prompt=system_message)
-                communication_log = agent.invoke(input)
+                communication_log = await agent.ainvoke(input)
 
             except Exception as e:
                 print(f"Error occurred in fallback model: {str(e)}")
@@ -84,6 +79,7 @@ Address any identified issues and enhance the overall quality of the output.\n""
             goto=agent_name,
             update={
                 "messages": filtered_message_history,
-                "current_task": task
+                "current_task": task,
+                "completed_tasks": [task]
             }
         )
\ No newline at end of file
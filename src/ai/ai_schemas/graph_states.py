@@ -3,6 +3,12 @@ from datetime import datetime
 from langchain_core.messages import BaseMessage
 from typing_extensions import TypedDict
 from langgraph.graph import add_messages
+import operator
+
+
+def keep_latest(current, update):
+    # Parallel task branches each write current_task in the same step; keep the last one
+    return update
 
 
 class InsightAgentState(TypedDict):
@@ -21,7 +27,9 @@ class InsightAgentState(TypedDict):
     reasoning : bool
     subtasks: list
     task_list: list
-    current_task: dict
+    current_task: Annotated[Optional[dict], keep_latest]
+    completed_tasks: Annotated[list, operator.add]
+    dispatched_tasks: list
     final_response: str
     validation_result: Optional[dict]
     feedback_cycle: int
@@ -2,8 +2,8 @@ import requests
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
 import os
-import httpx
 from dotenv import load_dotenv
+from src.ai.tools.http_client import fetch_json
 
 load_dotenv()
 
@@ -15,8 +15,6 @@ API_KEY = os.getenv("BIG_AIR_LAB_FINANCE_API_KEY")
 FMP_BASE_URL = "https://financialmodelingprep.com"
 FMP_API_KEY = os.getenv("FM_API_KEY")
 
-TIMEOUT = 30.0
-
 
 # --- Pydantic Schemas for Tools ---
 
@@ -41,17 +39,18 @@ async def _fetch_from_backend(endpoint: str, params: dict) -> dict:
     
     url = f"{BASE_URL}/{endpoint}"
     
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        response = await client.get(
+    # Callers tag the returned dict, so don't share it with concurrent requests
+    try:
+        return await fetch_json(
             url,
             params=params,
-            headers={"Finance-API-Key": API_KEY}
+            headers={"Finance-API-Key": API_KEY},
+            retries=1,
+            coalesce=False,
+            endpoint=f"backend/{endpoint}"
         )
-        
-        if response.status_code != 200:
-            raise RuntimeError(f"Backend API Error {response.status_code}: {response.text}")
-
-        return response.json()
+    except RuntimeError as e:
+        raise RuntimeError(f"Backend API Error: {e}")
 
 
 async def _fetch_from_fmp(endpoint: str, params: dict) -> dict:
@@ -62,13 +61,10 @@ async def _fetch_from_fmp(endpoint: str, params: dict) -> dict:
     url = f"{FMP_BASE_URL}/{endpoint}"
     params["apikey"] = FMP_API_KEY
     
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        response = await client.get(url, params=params)
-        
-        if response.status_code != 200:
-            raise RuntimeError(f"FMP API Error {response.status_code}: {response.text}")
-        
-        return response.json()
+    try:
+        return await fetch_json(url, params=params, coalesce=False, endpoint=f"fmp/{endpoint}")
+    except RuntimeError as e:
+        raise RuntimeError(f"FMP API Error: {e}")
 
 
 # --- Tool Definitions ---
@@ -17,13 +17,60 @@ from src.ai.agents.sentiment_analysis_agent import SentimentAnalysisAgent
 from src.ai.agents.data_comparison_agent import DataComparisonAgent
 from src.ai.agents.map_agent import MapAgent
 from IPython.display import Markdown, Image, display
+from collections import OrderedDict
+import threading
 import os
 
+GRAPH_CHECKPOINT_MAX_THREADS = int(os.getenv("GRAPH_CHECKPOINT_MAX_THREADS", 256))
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    MemorySaver that keeps checkpoints for at most `max_threads` threads.
+    A run marks its thread live with `acquire_thread` and drops it with `release_thread`.
+    Past the limit, the least recently written thread that is not live is evicted;
+    live threads are never evicted, their runs still read their state.
+    """
+
+    def __init__(self, max_threads: int = GRAPH_CHECKPOINT_MAX_THREADS):
+        super().__init__()
+        self.max_threads = max_threads
+        self._threads = OrderedDict()
+        self._live = set()
+        self._lock = threading.Lock()
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            self._threads[thread_id] = None
+            self._threads.move_to_end(thread_id)
+            if len(self._threads) > self.max_threads:
+                self._evict()
+        return super().put(config, checkpoint, metadata, new_versions)
+
+    def _evict(self):
+        stale = [thread_id for thread_id in self._threads if thread_id not in self._live]
+        for stale_thread_id in stale[:len(self._threads) - self.max_threads]:
+            del self._threads[stale_thread_id]
+            self.delete_thread(stale_thread_id)
+        if len(self._threads) > self.max_threads:
+            print(f"Graph checkpointer over its limit of {self.max_threads} threads with {len(self._live)} live runs; not evicting live threads")
+
+    def acquire_thread(self, thread_id: str):
+        with self._lock:
+            self._live.add(thread_id)
+
+    def release_thread(self, thread_id: str):
+        with self._lock:
+            self._live.discard(thread_id)
+            self._threads.pop(thread_id, None)
+            self.delete_thread(thread_id)
+
 
 class InsightAgentGraph:
     def __init__(self):
         self.state = InsightAgentState
-        # self.checkpointer = MemorySaver()
+        self.checkpointer = BoundedMemorySaver()
         self.agents = self._initialize_agents()
         self.graph = self._create_graph()
 
@@ -75,7 +122,7 @@ class InsightAgentGraph:
         
         graph.add_edge("Response Generator Agent", END)
 
-        insight_graph = graph.compile(checkpointer=MemorySaver())
+        insight_graph = graph.compile(checkpointer=self.checkpointer)
 
         return insight_graph
 
@@ -85,7 +132,14 @@ class InsightAgentGraph:
         return self.graph.get_graph().draw_mermaid()
 
     def get_graph(self):
-        return self._create_graph()
+        # Compiled once in __init__ and shared by every request; runs are isolated by thread_id
+        return self.graph
+
+    def acquire_thread(self, thread_id: str):
+        self.checkpointer.acquire_thread(thread_id)
+
+    def release_thread(self, thread_id: str):
+        self.checkpointer.release_thread(thread_id)
 
     def get_mermaid_png(self):
         return self.graph.get_graph().draw_mermaid_png()
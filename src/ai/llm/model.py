@@ -44,8 +44,18 @@
 from langchain_community.chat_models import ChatLiteLLM
 # from langchain_litellm import ChatLiteLLM
 from dotenv import dotenv_values
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Awaitable, Callable, Deque, Dict
+from collections import deque
+import asyncio
+import time
+import re
 import os
+import threading
+from uuid import UUID
+from functools import lru_cache
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from src.ai.llm.rate_limiter import llm_scheduler, model_key
 
 
 # os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
@@ -91,63 +101,327 @@ import litellm
 # Register usage monitor callback
 # litellm.callbacks = [usage_monitor]
 
-def get_llm(model_name: str, temperature: float = None, max_tokens: int = None, agent_name: str = None):
+# Every get_llm/get_llm_alt/get_llm_groq call with the same settings returns the same client, and all
+# OpenAI-compatible clients (OpenAI, Azure, the Ollama proxy) share one keep-alive connection pool.
+LLM_HTTP_POOL = os.getenv("LLM_HTTP_POOL", "true").lower() == "true"
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", 100))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", 20))
+LLM_POOL_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", 60))
+
+OLLAMA_PROXY_MARKERS = ("gpt-oss", "kimi", "qwen", "deepseek", "minimax")
+
+if LLM_HTTP_POOL:
+    _pool_limits = httpx.Limits(
+        max_connections=LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_POOL_KEEPALIVE_EXPIRY,
+    )
+    litellm.client_session = httpx.Client(limits=_pool_limits, timeout=httpx.Timeout(600.0, connect=5.0))
+    litellm.aclient_session = httpx.AsyncClient(limits=_pool_limits, timeout=httpx.Timeout(600.0, connect=5.0))
+
+
+async def close_llm_pool():
+    """Close the shared LLM connection pools. Called on application shutdown."""
+    if litellm.aclient_session is not None:
+        await litellm.aclient_session.aclose()
+    if litellm.client_session is not None:
+        litellm.client_session.close()
+
+
+class LLMCallMetrics(BaseCallbackHandler):
+    """Concurrency, error and latency counters for the calls of one model, keyed by model name."""
+
+    run_inline = True
+    models: Dict[str, Dict[str, Any]] = {}
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._started: Dict[UUID, float] = {}
+
+    def _stats(self) -> Dict[str, Any]:
+        stats = self.models.get(self.model_name)
+        if stats is None:
+            stats = self.models[self.model_name] = {"calls": 0, "errors": 0, "inflight": 0, "max_inflight": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        return stats
+
+    def _start(self, run_id: UUID):
+        stats = self._stats()
+        self._started[run_id] = time.monotonic()
+        stats["calls"] += 1
+        stats["inflight"] += 1
+        stats["max_inflight"] = max(stats["max_inflight"], stats["inflight"])
+
+    def _end(self, run_id: UUID, failed: bool):
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        stats = self._stats()
+        elapsed = time.monotonic() - started
+        stats["inflight"] -= 1
+        stats["total_seconds"] += elapsed
+        stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+        if failed:
+            stats["errors"] += 1
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        self._end(run_id, failed=False)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        self._end(run_id, failed=True)
+
+
+class ScheduledChatLiteLLM(ChatLiteLLM):
+    """
+    ChatLiteLLM whose every model request goes through `llm_scheduler`, so the per-model
+    RPM budget and the 429 backoff apply per request, including each step of a ReAct agent
+    and never around its tool calls.
+    """
+
+    def _generate(self, messages, stop=None, run_manager=None, stream=None, **kwargs):
+        generate = super()._generate
+        if stream if stream is not None else self.streaming:
+            # Streams through _stream, which is scheduled itself
+            return generate(messages, stop=stop, run_manager=run_manager, stream=stream, **kwargs)
+        return llm_scheduler.run(self, lambda: generate(messages, stop=stop, run_manager=run_manager, stream=stream, **kwargs))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, stream=None, **kwargs):
+        agenerate = super()._agenerate
+        if stream if stream is not None else self.streaming:
+            return await agenerate(messages, stop=stop, run_manager=run_manager, stream=stream, **kwargs)
+        return await llm_scheduler.arun(self, lambda: agenerate(messages, stop=stop, run_manager=run_manager, stream=stream, **kwargs))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        stream = super()._stream
+        yield from llm_scheduler.stream(self, lambda: stream(messages, stop=stop, run_manager=run_manager, **kwargs))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        astream = super()._astream
+        async for chunk in llm_scheduler.astream(self, lambda: astream(messages, stop=stop, run_manager=run_manager, **kwargs)):
+            yield chunk
+
+
+_clients: Dict[tuple, ChatLiteLLM] = {}
+_clients_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _is_ollama_model(model_name: str) -> bool:
+    return any(marker in model_name for marker in OLLAMA_PROXY_MARKERS)
+
+
+def _shared_client(key: tuple, build: Callable[[], ChatLiteLLM]) -> ChatLiteLLM:
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = build()
+    return client
+
+
+def _build_llm(model_name: str, temperature: Optional[float], max_tokens: Optional[int], agent_name: Optional[str], is_ollama_proxy: bool, **extra) -> ChatLiteLLM:
     model_kwargs = {}
-    # Check if using Ollama models via OpenAI provider
-    is_ollama_proxy = ("gpt-oss" in model_name or "kimi" in model_name or "qwen" in model_name or "deepseek" in model_name or "minimax" in model_name) and os.environ.get("OLLAMA_API_KEY")
-    
     if is_ollama_proxy:
         model_kwargs["api_base"] = "https://ollama.com/v1"
         model_kwargs["api_key"] = os.environ["OLLAMA_API_KEY"]
-    
+
     # Prepare metadata for usage monitoring
     if agent_name:
         model_kwargs["metadata"] = {"agent_name": agent_name}
         # Only pass agent_name as a top-level arg if it's an Ollama proxy model that expects it
         if is_ollama_proxy:
             model_kwargs["agent_name"] = agent_name
-        
+
     # Pass model_kwargs explicitly so ChatLiteLLM forwards them to litellm
     # Filter out metadata from top-level kwargs to avoid "multiple values" TypeError if ChatLiteLLM accepts it as named arg
     top_level_kwargs = {k: v for k, v in model_kwargs.items() if k != 'metadata'}
-    
-    model = ChatLiteLLM(
-        model=model_name, 
-        temperature=temperature, 
-        max_tokens=max_tokens, 
-        max_retries=2, 
+
+    return ScheduledChatLiteLLM(
+        model=model_name,
+        temperature=temperature,
+        max_tokens=max_tokens,
         model_kwargs=model_kwargs,
-        **top_level_kwargs 
+        callbacks=[LLMCallMetrics(model_name)],
+        **extra,
+        **top_level_kwargs
     )
-    return model
+
+
+def get_llm(model_name: str, temperature: float = None, max_tokens: int = None, agent_name: str = None):
+    # Check if using Ollama models via OpenAI provider
+    is_ollama_proxy = _is_ollama_model(model_name) and bool(os.environ.get("OLLAMA_API_KEY"))
+    key = ("primary", model_name, temperature, max_tokens, is_ollama_proxy, agent_name)
+    return _shared_client(key, lambda: _build_llm(model_name, temperature, max_tokens, agent_name, is_ollama_proxy, max_retries=2))
 
 
 def get_llm_groq(model_name: str , temperature: float = None, top_p: float = None, top_k: int = None) -> ChatLiteLLM:
-    return ChatLiteLLM(model=model_name, temperature=temperature, top_p=top_p, top_k=top_k)
+    key = ("groq", model_name, temperature, top_p, top_k)
+    return _shared_client(key, lambda: ScheduledChatLiteLLM(model=model_name, temperature=temperature, top_p=top_p, top_k=top_k, callbacks=[LLMCallMetrics(model_name)]))
 
 
 def get_llm_alt(model_name: str, temperature: float = None, max_tokens: int = None, agent_name: str = None):
-    model_kwargs = {}
     # Check if using Ollama models via OpenAI provider
-    is_ollama_proxy = ("gpt-oss" in model_name or "kimi" in model_name or "qwen" in model_name or "deepseek" in model_name or "minimax" in model_name) and os.environ.get("OLLAMA_API_KEY")
-    
-    if is_ollama_proxy:
-        model_kwargs["api_base"] = "https://ollama.com/v1"
-        model_kwargs["api_key"] = os.environ["OLLAMA_API_KEY"]
-        
-    if agent_name:
-        model_kwargs["metadata"] = {"agent_name": agent_name}
-        # Only pass agent_name as a top-level arg if it's an Ollama proxy model that expects it
-        if is_ollama_proxy:
-            model_kwargs["agent_name"] = agent_name
+    is_ollama_proxy = _is_ollama_model(model_name) and bool(os.environ.get("OLLAMA_API_KEY"))
+    key = ("alt", model_name, temperature, max_tokens, is_ollama_proxy, agent_name)
+    return _shared_client(key, lambda: _build_llm(model_name, temperature, max_tokens, agent_name, is_ollama_proxy))
 
-    top_level_kwargs = {k: v for k, v in model_kwargs.items() if k != 'metadata'}
-    
-    model = ChatLiteLLM(
-        model=model_name, 
-        temperature=temperature, 
-        max_tokens=max_tokens, 
-        model_kwargs=model_kwargs,
-        **top_level_kwargs
-    )
-    return model
+
+def llm_client_metrics() -> Dict[str, Any]:
+    """Shared clients, pool settings and per-model call, queueing and hedging counters of this process."""
+    queueing = llm_scheduler.model_metrics()
+    models = {}
+    for model_name, stats in LLMCallMetrics.models.items():
+        finished = stats["calls"] - stats["inflight"]
+        models[model_name] = {
+            **stats,
+            "avg_seconds": round(stats["total_seconds"] / finished, 3) if finished else 0.0,
+            **queueing.get(model_name, {"queued": 0, "queued_seconds": 0.0}),
+        }
+    return {
+        "clients": len(_clients),
+        "http_pool": {"enabled": LLM_HTTP_POOL, "max_connections": LLM_POOL_MAX_CONNECTIONS, "max_keepalive": LLM_POOL_MAX_KEEPALIVE},
+        "models": models,
+        "hedging": hedge_policy.metrics,
+    }
+
+
+# Hedged primary/alternate calls: when the primary is slower than its recent LLM_HEDGE_PERCENTILE
+# latency, the alternate is started too and whichever answers first wins; the other is cancelled.
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", 200))
+# Never hedge a call that has been running for less than this many seconds
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", 2.0))
+# Share of an agent's calls that may start the alternate as a hedge. LLM_HEDGE_BUDGET_<AGENT>
+# (e.g. LLM_HEDGE_BUDGET_PLANNER_AGENT) overrides it per agent; 0 turns hedging off for that agent.
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", 0.1))
+LLM_HEDGE_BUDGET_BURST = float(os.getenv("LLM_HEDGE_BUDGET_BURST", 3))
+
+
+class HedgePolicy:
+    """
+    Per-agent latency windows and hedge budgets. Each call earns the agent `budget` of a hedge,
+    up to LLM_HEDGE_BUDGET_BURST, and each hedge spends one, so over time an agent hedges at
+    most `budget` of its calls however slow the provider gets.
+    """
+
+    def __init__(self):
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._budgets: Dict[str, float] = {}
+        self.metrics: Dict[str, Dict[str, int]] = {}
+
+    def _agent_metrics(self, agent: str) -> Dict[str, int]:
+        return self.metrics.setdefault(agent, {"calls": 0, "hedged": 0, "alternate_won": 0, "budget_exhausted": 0})
+
+    def budget_for(self, agent: str) -> float:
+        env_name = "LLM_HEDGE_BUDGET_" + re.sub(r"\W+", "_", agent).strip("_").upper()
+        return float(os.getenv(env_name, LLM_HEDGE_BUDGET))
+
+    def record(self, agent: str, model: Any, seconds: float):
+        key = f"{agent}:{model_key(model)}"
+        window = self._latencies.get(key)
+        if window is None:
+            window = self._latencies[key] = deque(maxlen=LLM_HEDGE_WINDOW)
+        window.append(seconds)
+
+    def hedge_delay(self, agent: str, model: Any) -> Optional[float]:
+        """Seconds to wait on the primary before hedging, or None while there is too little history."""
+        window = self._latencies.get(f"{agent}:{model_key(model)}")
+        if not window or len(window) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(window)
+        index = min(len(ordered) - 1, int(len(ordered) * LLM_HEDGE_PERCENTILE / 100))
+        return max(LLM_HEDGE_MIN_DELAY, ordered[index])
+
+    def start_call(self, agent: str):
+        budget = self.budget_for(agent)
+        self._budgets[agent] = min(LLM_HEDGE_BUDGET_BURST, self._budgets.get(agent, 1.0) + budget)
+        self._agent_metrics(agent)["calls"] += 1
+
+    def try_hedge(self, agent: str) -> bool:
+        metrics = self._agent_metrics(agent)
+        if self.budget_for(agent) <= 0 or self._budgets.get(agent, 0.0) < 1.0:
+            metrics["budget_exhausted"] += 1
+            return False
+        self._budgets[agent] -= 1.0
+        metrics["hedged"] += 1
+        return True
+
+
+hedge_policy = HedgePolicy()
+
+
+async def _cancel(task: asyncio.Task):
+    task.cancel()
+    try:
+        await task
+    except BaseException:
+        pass
+
+
+async def _race(agent: str, primary_task: asyncio.Task, alternate_task: asyncio.Task) -> Any:
+    """First successful result of the two tasks; the other is cancelled. Raises if both fail."""
+    pending = {primary_task, alternate_task}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is alternate_task:
+                        hedge_policy.metrics[agent]["alternate_won"] += 1
+                    return task.result()
+                error = task.exception()
+                print(f"{agent}: {'primary' if task is primary_task else 'alternate'} model failed while hedged: {error}")
+        raise error
+    finally:
+        for task in pending:
+            await _cancel(task)
+
+
+async def hedged_call(agent: str, primary: Any, alternate: Any, call: Callable[[Any], Awaitable[Any]]) -> Any:
+    """
+    Run `call(primary)`, falling back to `call(alternate)` if it raises. When the primary
+    runs past its hedge delay and the agent has budget left, `call(alternate)` is started
+    alongside it and the first successful result is returned.
+    Only for calls that are safe to run twice: no tools, and no tokens streamed to the client.
+    """
+    hedge_policy.start_call(agent)
+    started = time.monotonic()
+    primary_task = asyncio.ensure_future(call(primary))
+    delay = hedge_policy.hedge_delay(agent, primary) if LLM_HEDGE_ENABLED and alternate is not None else None
+
+    try:
+        done, _ = await asyncio.wait({primary_task}, timeout=delay)
+    except asyncio.CancelledError:
+        await _cancel(primary_task)
+        raise
+
+    if not done and hedge_policy.try_hedge(agent):
+        print(f"{agent}: primary model slower than {delay:.1f}s, hedging with alternate model")
+        try:
+            return await _race(agent, primary_task, asyncio.ensure_future(call(alternate)))
+        finally:
+            # A hedged primary took at least this long, which keeps its percentile honest
+            hedge_policy.record(agent, primary, time.monotonic() - started)
+
+    try:
+        result = await primary_task
+    except Exception as e:
+        if alternate is None:
+            raise
+        print(f"Falling back to alternate model: {str(e)}")
+        try:
+            return await call(alternate)
+        except Exception as e:
+            print(f"Error occurred in fallback model: {str(e)}")
+            raise e
+    hedge_policy.record(agent, primary, time.monotonic() - started)
+    return result
@@ -0,0 +1,213 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+
+# Requests per minute allowed per model before callers queue locally; 0 disables the bucket
+# and only the 429 backoff applies. LLM_RPM_<PROVIDER> (e.g. LLM_RPM_GEMINI) overrides it per provider.
+LLM_DEFAULT_RPM = float(os.getenv("LLM_DEFAULT_RPM", 0))
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", 2))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", 2.0))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 60.0))
+
+RATE_LIMIT_MARKERS = ("429", "rate limit", "ratelimit", "rate_limit", "quota", "resource_exhausted", "too many requests")
+
+
+def model_key(model: Any) -> str:
+    """`provider/model` string the limiter is keyed by, e.g. 'azure/gpt-4.1-mini'."""
+    if isinstance(model, str):
+        return model
+    return getattr(model, "model", None) or getattr(model, "model_name", None) or type(model).__name__
+
+
+def provider_of(key: str) -> str:
+    return key.split("/", 1)[0] if "/" in key else key
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    if getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError":
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class _ModelState:
+    def __init__(self, rpm: float):
+        self.rate = rpm / 60.0
+        self.capacity = max(rpm / 60.0, 1.0) if rpm else 0.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.strikes = 0
+        self.queued = 0
+        self.waited_seconds = 0.0
+
+
+class LLMScheduler:
+    """
+    Shared, thread-safe gate in front of LLM calls, keyed by `provider/model`.
+    Calls go straight through unless the model is cooling down after a 429/quota error
+    or a configured per-minute budget is exhausted; only then does the caller wait.
+    Backoff grows with consecutive rate-limit errors and resets on the first success.
+    """
+
+    def __init__(self):
+        self._states: Dict[str, _ModelState] = {}
+        self._lock = threading.Lock()
+        self.metrics = {"calls": 0, "rate_limited": 0, "waited_seconds": 0.0}
+
+    def _state(self, key: str) -> _ModelState:
+        state = self._states.get(key)
+        if state is None:
+            rpm = float(os.getenv(f"LLM_RPM_{provider_of(key).upper()}", LLM_DEFAULT_RPM))
+            state = self._states[key] = _ModelState(rpm)
+        return state
+
+    def _reserve(self, key: str) -> float:
+        """Take a slot for `key` and return how long the caller has to wait before using it."""
+        with self._lock:
+            state = self._state(key)
+            now = time.monotonic()
+            wait = max(0.0, state.blocked_until - now)
+            if state.rate:
+                state.tokens = min(state.capacity, state.tokens + (now - state.updated) * state.rate)
+                state.updated = now
+                state.tokens -= 1
+                if state.tokens < 0:
+                    wait = max(wait, -state.tokens / state.rate)
+            self.metrics["calls"] += 1
+            self.metrics["waited_seconds"] += wait
+            if wait:
+                state.queued += 1
+                state.waited_seconds += wait
+            return wait
+
+    def _on_rate_limited(self, key: str, error: BaseException) -> float:
+        with self._lock:
+            state = self._state(key)
+            state.strikes += 1
+            delay = _retry_after(error)
+            if delay is None:
+                delay = LLM_BACKOFF_BASE * (2 ** (state.strikes - 1)) + random.uniform(0, LLM_BACKOFF_BASE)
+            delay = min(delay, LLM_BACKOFF_MAX)
+            # Every caller of this model waits out the same cooldown instead of retrying into it
+            state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+            self.metrics["rate_limited"] += 1
+            return delay
+
+    def _on_success(self, key: str):
+        with self._lock:
+            self._state(key).strikes = 0
+
+    def model_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Calls that had to wait for a slot, and how long they waited, per model."""
+        with self._lock:
+            return {key: {"queued": state.queued, "queued_seconds": round(state.waited_seconds, 3)} for key, state in self._states.items()}
+
+    def run(self, model: Any, call: Callable[[], Any], retries: int = LLM_RATE_LIMIT_RETRIES) -> Any:
+        """
+        Run `call()` for `model`, waiting only while the model is throttled.
+        Rate-limit errors are retried after a shared backoff; anything else, or a
+        rate-limit error after `retries`, is raised so the agent can fall back.
+        """
+        key = model_key(model)
+        for attempt in range(retries + 1):
+            wait = self._reserve(key)
+            if wait:
+                time.sleep(wait)
+            try:
+                result = call()
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                delay = self._on_rate_limited(key, e)
+                print(f"Rate limited on {key}, backing off {delay:.1f}s (attempt {attempt + 1}/{retries + 1})")
+                if attempt >= retries:
+                    raise
+                continue
+            self._on_success(key)
+            return result
+
+    async def arun(self, model: Any, acall: Callable[[], Awaitable[Any]], retries: int = LLM_RATE_LIMIT_RETRIES) -> Any:
+        """`run` for coroutine calls: throttling and backoff wait on the event loop instead of blocking it."""
+        key = model_key(model)
+        for attempt in range(retries + 1):
+            wait = self._reserve(key)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                result = await acall()
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                delay = self._on_rate_limited(key, e)
+                print(f"Rate limited on {key}, backing off {delay:.1f}s (attempt {attempt + 1}/{retries + 1})")
+                if attempt >= retries:
+                    raise
+                continue
+            self._on_success(key)
+            return result
+
+    def stream(self, model: Any, open_stream: Callable[[], Iterator[Any]], retries: int = LLM_RATE_LIMIT_RETRIES) -> Iterator[Any]:
+        """
+        `run` for streamed calls. A rate-limit error is only retried before the first chunk;
+        chunks already handed to the caller cannot be taken back.
+        """
+        key = model_key(model)
+        for attempt in range(retries + 1):
+            wait = self._reserve(key)
+            if wait:
+                time.sleep(wait)
+            started = False
+            try:
+                for chunk in open_stream():
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if started or not is_rate_limit_error(e):
+                    raise
+                delay = self._on_rate_limited(key, e)
+                print(f"Rate limited on {key}, backing off {delay:.1f}s (attempt {attempt + 1}/{retries + 1})")
+                if attempt >= retries:
+                    raise
+                continue
+            self._on_success(key)
+            return
+
+    async def astream(self, model: Any, open_stream: Callable[[], AsyncIterator[Any]], retries: int = LLM_RATE_LIMIT_RETRIES) -> AsyncIterator[Any]:
+        """`stream` for async iterators."""
+        key = model_key(model)
+        for attempt in range(retries + 1):
+            wait = self._reserve(key)
+            if wait:
+                await asyncio.sleep(wait)
+            started = False
+            try:
+                async for chunk in open_stream():
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if started or not is_rate_limit_error(e):
+                    raise
+                delay = self._on_rate_limited(key, e)
+                print(f"Rate limited on {key}, backing off {delay:.1f}s (attempt {attempt + 1}/{retries + 1})")
+                if attempt >= retries:
+                    raise
+                continue
+            self._on_success(key)
+            return
+
+
+llm_scheduler = LLMScheduler()
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from langchain_community.chat_models import ChatLiteLLM
 from pydantic import BaseModel, Field
@@ -162,7 +163,7 @@ def convert_raw_data_to_hist_format(raw_data):
     return df
 
 # Get Stock Price
-# def get_stock_history(ticker, rating, reason):
+# async def get_stock_history(ticker, rating, reason):
 #     """Fetch stock history and return structured data instead of writing to a file."""
 #     try:
 #         start_date = "2000-01-01"
@@ -200,7 +201,7 @@ def convert_raw_data_to_hist_format(raw_data):
 #         print(f"Error fetching data for {ticker}: {str(e)}")
 #         return None
 
-def get_stock_history(ticker, rating, reason):
+async def get_stock_history(ticker, rating, reason):
     """Fetch stock history using MongoDB/FMP first, then fallback to yfinance if needed. Returns structured dict."""
     try:
         start_date = "2000-01-01"
@@ -210,7 +211,7 @@ def get_stock_history(ticker, rating, reason):
 
         # --- Try MongoDB/FMP first ---
         try:
-            historical_data = mongodb.get_or_update_historical(ticker, "max")
+            historical_data = await mongodb.get_or_update_historical(ticker, "max")
 
             if 'historical' in historical_data and historical_data['historical']:
                 raw_data = historical_data['historical']
@@ -223,7 +224,7 @@ def get_stock_history(ticker, rating, reason):
         if hist is None or hist.empty:
             print(f"[INFO] Falling back to yfinance for {ticker}")
             stock = yf.Ticker(ticker)
-            hist = stock.history(start=start_date, end=end_date)
+            hist = await asyncio.to_thread(stock.history, start=start_date, end=end_date)
 
             if hist.empty:
                 raise Exception("Both FMP and yfinance failed to fetch data")
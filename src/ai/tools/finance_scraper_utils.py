@@ -1,8 +1,8 @@
 import os
 import re
-import requests
 from datetime import datetime, timedelta, timezone
 from collections import defaultdict
+from src.ai.tools.http_client import fetch_json
 
 fmp_api_key = os.environ.get("FM_API_KEY")
 
@@ -61,7 +61,7 @@ def convert_fmp_to_json(fmp_data, ticker):
     return result
 
 
-def get_historical_data_fmp(ticker: str, period: str):
+async def get_historical_data_fmp(ticker: str, period: str):
     """
     Retrieve historical data for a given ticker from Financial Modeling Prep API.
     Uses simple datetime grouping since FMP data already excludes non-trading days.
@@ -113,14 +113,12 @@ def get_historical_data_fmp(ticker: str, period: str):
         # base_url = "https://financialmodelingprep.com/api/v3/historical-price-full"
         # url = f"{base_url}/{ticker}?from={from_date}&to={to_date}&apikey={fmp_api_key}"
         base_url = "https://financialmodelingprep.com/stable/historical-price-eod/full"
-        url = f"{base_url}?symbol={ticker}&from={from_date}&to={to_date}&apikey={fmp_api_key}"
+        params = {"symbol": ticker, "from": from_date, "to": to_date, "apikey": fmp_api_key}
 
-        print(f"Fetching data from FMP API: {url}")
+        print(f"Fetching data from FMP API: {base_url} ({ticker}, {from_date} - {to_date})")
         print(f"Period: {period}, Frequency: {frequency}")
         
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        data = await fetch_json(base_url, params=params)
         
         if 'historical' in data and data['historical']:
             raw_data = data['historical']
@@ -138,9 +136,6 @@ def get_historical_data_fmp(ticker: str, period: str):
         else:
             raise RuntimeError("No historical data found from FMP API")
             
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching data from FMP API: {e}")
-        raise e
     except Exception as e:
         print(f"Error in fetching historical data for {ticker}: {e}")
         raise e
@@ -1,10 +1,11 @@
 import os
-import aiohttp          
 import asyncio          
 from typing import Dict, Any, Optional, List, Type          
 from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel, Field      
 from langchain_core.tools import BaseTool  
+from src.ai.tools.http_client import fetch_json, run_sync
+from src.ai.tools.tool_cache import cached
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -16,8 +17,6 @@ API_KEY = os.getenv("BIG_AIR_LAB_FINANCE_API_KEY")
 FMP_BASE_URL = "https://financialmodelingprep.com"
 FMP_API_KEY = os.getenv("FM_API_KEY")
 
-DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=30)
-
 
 def _to_str(value) -> Optional[str]:
     """Convert numeric value to string for frontend compatibility. Returns None if value is None."""
@@ -103,30 +102,18 @@ async def _get_backend(endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
     # Example: "https://fmp.iaisolution.com/api/v1" + "/" + "financial-statements/income-statement"
     url = f"{BASE_URL}/{endpoint}"
     
-    async with aiohttp.ClientSession(timeout=DEFAULT_TIMEOUT) as session:
-        
-        # Make the GET request with authentication header
-        async with session.get(
-            url,                                   
-            params=params,                          
-            headers={"Finance-API-Key": API_KEY}    # Authentication header
-        ) as response:
-            
-            # Check if the request was successful (HTTP 200)
-            if response.status != 200:
-                # If not successful, read the error message and raise an exception
-                error_text = await response.text()
-                print(f"🔴 BACKEND FAILED: Status {response.status} | {endpoint}")
-                raise RuntimeError(
-                    f"Finance API Error {response.status} | {endpoint} | {error_text}"
-                )
-            
-            # Try to parse the JSON response
-            try:
-                return await response.json()
-            except Exception as e:
-                # If JSON parsing fails, raise a descriptive error
-                raise RuntimeError(f"Failed to parse JSON response: {e}")
+    # Shared pooled session; a single retry since every caller falls back to FMP
+    try:
+        return await fetch_json(
+            url,
+            params=params,
+            headers={"Finance-API-Key": API_KEY},    # Authentication header
+            retries=1,
+            endpoint=f"backend/{endpoint}"
+        )
+    except Exception as e:
+        print(f"🔴 BACKEND FAILED: {endpoint}")
+        raise RuntimeError(f"Finance API Error | {endpoint} | {e}")
             
 
 async def _get_fmp(endpoint: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -141,14 +128,13 @@ async def _get_fmp(endpoint: str, params: Dict[str, Any] = None) -> Dict[str, An
     
     print(f"🟡 FMP FALLBACK: Trying {endpoint}")
     
-    async with aiohttp.ClientSession(timeout=DEFAULT_TIMEOUT) as session:
-        async with session.get(url, params=params) as response:
-            if response.status != 200:
-                error_text = await response.text()
-                print(f"🔴 FMP FALLBACK FAILED: Status {response.status} | {endpoint}")
-                raise RuntimeError(f"FMP API Error {response.status} | {endpoint} | {error_text}")
-            print(f"🟢 FMP FALLBACK SUCCESS: {endpoint}")
-            return await response.json()
+    try:
+        data = await fetch_json(url, params=params, endpoint=f"fmp/{endpoint.split('?')[0]}")
+    except Exception as e:
+        print(f"🔴 FMP FALLBACK FAILED: {endpoint}")
+        raise RuntimeError(f"FMP API Error | {endpoint} | {e}")
+    print(f"🟢 FMP FALLBACK SUCCESS: {endpoint}")
+    return data
 
 
 # =============================================================================
@@ -159,6 +145,7 @@ async def _get_fmp(endpoint: str, params: Dict[str, Any] = None) -> Dict[str, An
 # 2. Balance Sheet - Assets, liabilities, and equity
 # 3. Cash Flow Statement - Cash movements in/out of the company
 
+@cached("statement")
 async def get_income_statement(symbol: str, period: str = "annual", limit: int = 5) -> Dict[str, Any]:
     backend_error = None
     fmp_error = None
@@ -182,6 +169,7 @@ async def get_income_statement(symbol: str, period: str = "annual", limit: int =
     raise RuntimeError(f"Both APIs failed. Backend: {backend_error} | FMP: {fmp_error}")
 
 
+@cached("statement")
 async def get_balance_sheet(symbol: str, period: str = "annual", limit: int = 5) -> Dict[str, Any]:
     backend_error = None
     fmp_error = None
@@ -203,6 +191,7 @@ async def get_balance_sheet(symbol: str, period: str = "annual", limit: int = 5)
     raise RuntimeError(f"Both APIs failed. Backend: {backend_error} | FMP: {fmp_error}")
 
 
+@cached("statement")
 async def get_cash_flow(symbol: str, period: str = "annual", limit: int = 5) -> Dict[str, Any]:
     backend_error = None
     fmp_error = None
@@ -232,6 +221,7 @@ async def get_cash_flow(symbol: str, period: str = "annual", limit: int = 5) ->
 # 2. Financial Ratios - Detailed profitability/liquidity ratios
 # 3. Historical Prices - Daily stock price data
 
+@cached("statement")
 async def get_key_metrics(symbol: str, period: str = "annual", limit: int = 5) -> Dict[str, Any]:
     backend_error = None
     fmp_error = None
@@ -253,6 +243,7 @@ async def get_key_metrics(symbol: str, period: str = "annual", limit: int = 5) -
     raise RuntimeError(f"Both APIs failed. Backend: {backend_error} | FMP: {fmp_error}")
 
 
+@cached("statement")
 async def get_financial_ratios(symbol: str, period: str = "annual", limit: int = 5) -> Dict[str, Any]:
     backend_error = None
     fmp_error = None
@@ -274,6 +265,7 @@ async def get_financial_ratios(symbol: str, period: str = "annual", limit: int =
     raise RuntimeError(f"Both APIs failed. Backend: {backend_error} | FMP: {fmp_error}")
 
 
+@cached("historical")
 async def get_historical_prices(symbol: str, from_date: str, to_date: str, data_type: str = "stock") -> Dict[str, Any]:
     backend_error = None
     fmp_error = None
@@ -309,6 +301,7 @@ async def get_historical_prices(symbol: str, from_date: str, to_date: str, data_
 # =============================================================================
 
 
+@cached("search")
 async def search_stocks(query: str, limit: int = 50) -> Dict[str, Any]:
     backend_error = None
     fmp_error = None
@@ -347,6 +340,7 @@ async def search_indexes(query: str, limit: int = 50) -> Dict[str, Any]:
 # REAL-TIME DATA ENDPOINTS
 # =============================================================================
 
+@cached("quote")
 async def get_realtime_quote(symbol: str) -> Dict[str, Any]:
     backend_error = None
     fmp_error = None
@@ -392,6 +386,7 @@ async def get_realtime_quote(symbol: str) -> Dict[str, Any]:
     raise RuntimeError(f"Both APIs failed. Backend: {backend_error} | FMP: {fmp_error}")
 
 
+@cached("profile")
 async def get_company_profile(symbol: str) -> Dict[str, Any]:
     backend_error = None
     fmp_error = None
@@ -420,6 +415,7 @@ async def get_company_profile(symbol: str) -> Dict[str, Any]:
     raise RuntimeError(f"Both APIs failed. Backend: {backend_error} | FMP: {fmp_error}")
 
 
+@cached("search")
 async def search_companies_realtime(query: str, limit: int = 10, exchange: str = None) -> Dict[str, Any]:
     """
     Search for companies by name or ticker symbol.
@@ -461,7 +457,7 @@ class FinancialStatementsTool(BaseTool):
         period: str = "annual",
         limit: int = 5
     ) -> Dict[str, Any]:
-        return asyncio.run(self._arun(symbol, statement, period, limit))
+        return run_sync(self._arun(symbol, statement, period, limit))
 
     async def _arun(
         self,
@@ -508,7 +504,7 @@ class MarketDataTool(BaseTool):
         from_date: Optional[str] = None,
         to_date: Optional[str] = None
     ) -> Dict[str, Any]:
-        return asyncio.run(self._arun(symbol, data_type, period, limit, from_date, to_date))
+        return run_sync(self._arun(symbol, data_type, period, limit, from_date, to_date))
 
     async def _arun(
         self,
@@ -568,18 +564,7 @@ class SearchCompanyInfoTool(BaseTool):
     args_schema: Type[BaseModel] = SearchCompanyInfoSchema
 
     def _run(self, query_list: List[QueryRequest], explanation: str = None) -> Dict[str, Any]:
-        try:
-            loop = asyncio.get_running_loop()
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(
-                    asyncio.run,
-                    self._arun(query_list, explanation)
-                )
-                return future.result()
-        except RuntimeError:
-            return asyncio.run(self._arun(query_list, explanation))
-        # return asyncio.run(self._arun(query_list, explanation))
+        return run_sync(self._arun(query_list, explanation))
 
     async def _arun(self, query_list: List[QueryRequest], explanation: str = None) -> Dict[str, Any]:
         results = []
@@ -629,7 +614,7 @@ class GetStockData(BaseTool):
         period: str = "1M",
         strictly: bool = False
     ) -> List[Dict[str, Any]]:
-        return asyncio.run(self._arun(ticker_data, explanation, period, strictly))
+        return run_sync(self._arun(ticker_data, explanation, period, strictly))
 
     async def _arun(
         self,
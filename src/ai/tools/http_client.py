@@ -0,0 +1,221 @@
+import os
+import time
+import random
+import asyncio
+import weakref
+import aiohttp
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 30))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 10))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 3))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", 0.5))
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", 100))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 20))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 60))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))
+
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# aiohttp sessions and in-flight requests are bound to the event loop that created them.
+# The app loop owns one long-lived pool; tools that run through asyncio.run get their own.
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Any, asyncio.Task]]" = weakref.WeakKeyDictionary()
+
+
+class HttpMetrics:
+    """Connection reuse and per-endpoint latency counters for the shared sessions."""
+
+    def __init__(self):
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.endpoints = defaultdict(lambda: {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+
+    @property
+    def reuse_ratio(self) -> float:
+        total = self.new_connections + self.reused_connections
+        return self.reused_connections / total if total else 0.0
+
+    def record(self, endpoint: str, elapsed_ms: float, ok: bool):
+        stats = self.endpoints[endpoint]
+        stats["count"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        if not ok:
+            stats["errors"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "reuse_ratio": round(self.reuse_ratio, 3),
+            "endpoints": {
+                endpoint: {**stats, "avg_ms": round(stats["total_ms"] / stats["count"], 2) if stats["count"] else 0.0}
+                for endpoint, stats in self.endpoints.items()
+            },
+        }
+
+
+http_metrics = HttpMetrics()
+_metrics_hooks: List[Callable[[str, float, Optional[int], HttpMetrics], None]] = []
+
+
+def add_metrics_hook(hook: Callable[[str, float, Optional[int], HttpMetrics], None]):
+    """Register `hook(endpoint, elapsed_ms, status, metrics)`, called after every request made through fetch_json."""
+    _metrics_hooks.append(hook)
+
+
+async def _on_connection_create_end(session, ctx, params):
+    http_metrics.new_connections += 1
+
+
+async def _on_connection_reuseconn(session, ctx, params):
+    http_metrics.reused_connections += 1
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+    return trace_config
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Return the pooled keep-alive session for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            use_dns_cache=True,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        )
+        session = aiohttp.ClientSession(connector=connector, timeout=DEFAULT_TIMEOUT, trace_configs=[_trace_config()])
+        _sessions[loop] = session
+    return session
+
+
+async def close_session():
+    """Close the session of the running event loop. Called on application shutdown."""
+    loop = asyncio.get_running_loop()
+    session = _sessions.pop(loop, None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def run_sync(coro: Awaitable[Any]) -> Any:
+    """asyncio.run for sync tool entry points: the loop's session is shared by the whole call and closed with it."""
+    async def _runner():
+        try:
+            return await coro
+        finally:
+            await close_session()
+
+    return asyncio.run(_runner())
+
+
+async def single_flight(key: Any, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Run `factory()` once per key at a time: concurrent callers with the same key await the
+    same in-flight task instead of each hitting the upstream. The shared result must not be mutated.
+    """
+    loop = asyncio.get_running_loop()
+    inflight = _inflight.setdefault(loop, {})
+    task = inflight.get(key)
+    if task is None:
+        task = loop.create_task(factory())
+        inflight[key] = task
+
+        def _forget(done_task, key=key):
+            if inflight.get(key) is done_task:
+                del inflight[key]
+
+        task.add_done_callback(_forget)
+    # Shield so one cancelled caller does not cancel the fetch for everyone else
+    return await asyncio.shield(task)
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return HTTP_BACKOFF_BASE * (2 ** attempt) + random.uniform(0, HTTP_BACKOFF_BASE)
+
+
+def _report(endpoint: str, started: float, status: Optional[int]):
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    http_metrics.record(endpoint, elapsed_ms, status == 200)
+    for hook in _metrics_hooks:
+        try:
+            hook(endpoint, elapsed_ms, status, http_metrics)
+        except Exception as e:
+            print(f"HTTP metrics hook failed: {e}")
+
+
+async def _request_json(method: str, url: str, params: Optional[Dict[str, Any]], headers: Optional[Dict[str, str]], retries: int, endpoint: str, json_body: Any = None) -> Any:
+    session = get_session()
+    for attempt in range(retries + 1):
+        started = time.perf_counter()
+        try:
+            async with session.request(method, url, params=params, json=json_body, headers=headers) as response:
+                _report(endpoint, started, response.status)
+                if response.status == 200:
+                    return await response.json(content_type=None)
+
+                error_text = await response.text()
+                if response.status not in RETRY_STATUSES or attempt >= retries:
+                    raise RuntimeError(f"HTTP Error {response.status} | {response.url.with_query(None)} | {error_text}")
+                delay = _retry_delay(attempt, response.headers.get("Retry-After"))
+            # Back off outside the context manager so the connection goes back to the pool first
+            await asyncio.sleep(delay)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            _report(endpoint, started, None)
+            if attempt >= retries:
+                raise RuntimeError(f"HTTP request failed after {retries + 1} attempts | {url} | {e!r}") from e
+            await asyncio.sleep(_retry_delay(attempt))
+
+
+async def fetch_json(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    retries: int = HTTP_MAX_RETRIES,
+    coalesce: bool = True,
+    endpoint: Optional[str] = None,
+) -> Any:
+    """
+    GET `url` through the shared session and return the decoded JSON body.
+    Timeouts, connection errors, 429 and 5xx responses are retried with exponential backoff.
+    With `coalesce`, identical concurrent requests share a single upstream call.
+    `endpoint` labels the request in http_metrics; it defaults to the host and path of `url`.
+    """
+    if endpoint is None:
+        parts = urlsplit(url)
+        endpoint = f"{parts.netloc}{parts.path}"
+
+    if not coalesce:
+        return await _request_json("GET", url, params, headers, retries, endpoint)
+
+    key = (url, tuple(sorted((params or {}).items())))
+    return await single_flight(key, lambda: _request_json("GET", url, params, headers, retries, endpoint))
+
+
+async def post_json(
+    url: str,
+    json_body: Any,
+    headers: Optional[Dict[str, str]] = None,
+    retries: int = HTTP_MAX_RETRIES,
+    endpoint: Optional[str] = None,
+) -> Any:
+    """POST `json_body` to `url` through the shared session, with the same retries and metrics as fetch_json."""
+    if endpoint is None:
+        parts = urlsplit(url)
+        endpoint = f"{parts.netloc}{parts.path}"
+    return await _request_json("POST", url, None, headers, retries, endpoint, json_body=json_body)
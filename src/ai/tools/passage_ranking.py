@@ -0,0 +1,101 @@
+import os
+import math
+import regex as re
+from collections import Counter
+from typing import List
+from src.ai.tools.result_dedup import estimate_tokens
+
+# Long web pages are cut down to the passages that best match the query that found them,
+# so each result costs at most WEB_PASSAGE_TOKEN_BUDGET tokens in the agent's prompt.
+WEB_PASSAGE_RANKING = os.getenv("WEB_PASSAGE_RANKING", "true").lower() == "true"
+WEB_PASSAGE_TOKEN_BUDGET = int(os.getenv("WEB_PASSAGE_TOKEN_BUDGET", 800))
+WEB_PASSAGE_WORDS = int(os.getenv("WEB_PASSAGE_WORDS", 80))
+PASSAGE_SEPARATOR = "\n...\n"
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n+')
+_TERM = re.compile(r'\w+')
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it its latest me news of on or "
+    "the their this to was what when where which who why will with".split()
+)
+
+
+def _terms(text: str) -> List[str]:
+    return _TERM.findall(text.lower())
+
+
+def split_passages(text: str, max_words: int = WEB_PASSAGE_WORDS) -> List[str]:
+    """Pack whole sentences into passages of up to `max_words` words; longer sentences are cut by words."""
+    passages = []
+    current: List[str] = []
+    for sentence in _SENTENCE_SPLIT.split(text):
+        words = sentence.split()
+        if not words:
+            continue
+        if current and len(current) + len(words) > max_words:
+            passages.append(" ".join(current))
+            current = []
+        while len(words) > max_words:
+            passages.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+        current.extend(words)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def bm25_scores(passages: List[str], query: str) -> List[float]:
+    """Okapi BM25 score of every passage for `query`, with the page's own passages as the corpus."""
+    query_terms = [term for term in set(_terms(query)) if term not in _STOPWORDS] or list(set(_terms(query)))
+    passage_terms = [Counter(_terms(passage)) for passage in passages]
+    n = len(passages)
+    avg_length = sum(sum(terms.values()) for terms in passage_terms) / n if n else 0.0
+
+    idf = {}
+    for term in query_terms:
+        df = sum(1 for terms in passage_terms if term in terms)
+        idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    scores = []
+    for terms in passage_terms:
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * sum(terms.values()) / (avg_length or 1.0))
+        score = 0.0
+        for term in query_terms:
+            tf = terms.get(term, 0)
+            if tf:
+                score += idf[term] * tf * (BM25_K1 + 1) / (tf + length_norm)
+        scores.append(score)
+    return scores
+
+
+def select_passages(text: str, query: str, token_budget: int = WEB_PASSAGE_TOKEN_BUDGET) -> str:
+    """
+    The passages of `text` that best match `query`, in page order, within `token_budget` tokens.
+    Pages already within the budget, and calls without a query, return `text` unchanged.
+    """
+    if not WEB_PASSAGE_RANKING or not text or not query or estimate_tokens(text) <= token_budget:
+        return text
+
+    passages = split_passages(text)
+    scores = bm25_scores(passages, query)
+    # Best match first; ties (including pages that never mention the query) keep page order
+    ranked = sorted(range(len(passages)), key=lambda i: (-scores[i], i))
+
+    selected = []
+    used = 0
+    for i in ranked:
+        cost = estimate_tokens(passages[i]) + 1
+        if used + cost > token_budget:
+            if selected:
+                continue
+            # Even the best passage alone is over budget: keep its head rather than nothing
+            selected.append(i)
+            passages[i] = passages[i][:token_budget * 4]
+            break
+        selected.append(i)
+        used += cost
+
+    return PASSAGE_SEPARATOR.join(passages[i] for i in sorted(selected))
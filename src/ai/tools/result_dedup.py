@@ -0,0 +1,67 @@
+import os
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+# Near-duplicate pages across the results of one search call (syndicated news, mirrors, the same
+# page found by two queries) are merged into the best-scoring copy before they reach the LLM.
+WEB_DEDUP_ENABLED = os.getenv("WEB_DEDUP_ENABLED", "true").lower() == "true"
+# Estimated Jaccard similarity of word 3-shingles above which two pages count as the same
+WEB_DEDUP_JACCARD = float(os.getenv("WEB_DEDUP_JACCARD", 0.5))
+WEB_DEDUP_PERMUTATIONS = int(os.getenv("WEB_DEDUP_PERMUTATIONS", 128))
+SHINGLE_WORDS = 3
+
+# Multiply-shift hash family: (a * x + b) mod 2^64, top 32 bits; uint64 arithmetic wraps for free
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(0, 1 << 63, size=WEB_DEDUP_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _rng.integers(0, 1 << 63, size=WEB_DEDUP_PERMUTATIONS, dtype=np.uint64)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (~4 characters per token) used for savings reports."""
+    return len(text) // 4 if text else 0
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """
+    MinHash signature of the page's lower-cased word 3-shingles.
+    None for text shorter than one shingle: empty or near-empty pages would all share a signature.
+    """
+    words = text.lower().split()
+    if len(words) < SHINGLE_WORDS:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    # Python's str hash is stable within the process, which is all one search call needs
+    hashes = np.fromiter((hash(shingle) & 0xFFFFFFFFFFFFFFFF for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    return ((hashes[:, None] * _A + _B) >> np.uint64(32)).min(axis=0)
+
+
+def drop_near_duplicates(results: List[Dict[str, Any]], scores: List[float]) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Keep one copy of each group of near-identical results: the best-scoring one (then the longest).
+    Results with too little content to fingerprint are always kept. The links of the dropped copies are added to the kept result's `duplicate_links`.
+    Returns the kept results in their original order, the number dropped and the estimated tokens saved.
+    """
+    if not WEB_DEDUP_ENABLED or len(results) < 2:
+        return results, 0, 0
+
+    signatures = [minhash(result.get('content') or "") for result in results]
+    order = sorted(range(len(results)), key=lambda i: (-(scores[i] or 0.0), -len(results[i].get('content') or "")))
+
+    kept: List[int] = []
+    dropped = 0
+    tokens_saved = 0
+    for i in order:
+        if signatures[i] is None:
+            kept.append(i)
+            continue
+        match = next((k for k in kept if signatures[k] is not None and np.mean(signatures[i] == signatures[k]) >= WEB_DEDUP_JACCARD), None)
+        if match is None:
+            kept.append(i)
+            continue
+        dropped += 1
+        tokens_saved += estimate_tokens(results[i].get('content'))
+        link = results[i].get('link')
+        if link and link != results[match].get('link'):
+            results[match].setdefault('duplicate_links', []).append(link)
+
+    return [results[i] for i in sorted(kept)], dropped, tokens_saved
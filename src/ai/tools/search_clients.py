@@ -0,0 +1,82 @@
+import os
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+from langchain_community.tools import DuckDuckGoSearchResults
+from src.ai.tools.http_client import post_json
+
+# Long-lived search provider clients shared by every search tool call. Each provider has one
+# concurrency limit for the whole process (SEARCH_CONCURRENCY_<PROVIDER>), so a burst of users
+# queues here instead of opening a thread and a connection per query or tripping the provider's rate limit.
+TAVILY_API_URL = os.getenv("TAVILY_API_URL", "https://api.tavily.com")
+SEARCH_RESULTS = 5
+TAVILY_RETRIES = 1
+SEARCH_CONCURRENCY = {
+    "tavily": int(os.getenv("SEARCH_CONCURRENCY_TAVILY", 8)),
+    # DuckDuckGo has no async client; its searches run on at most this many threads
+    "duckduckgo": int(os.getenv("SEARCH_CONCURRENCY_DUCKDUCKGO", 3)),
+}
+
+_duckduckgo = DuckDuckGoSearchResults(num_results=SEARCH_RESULTS, output_format="list")
+
+# Semaphores are bound to an event loop: the app loop holds the process-wide limits,
+# tools that run through asyncio.run get their own (like the http_client sessions)
+_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+_in_flight: Dict[str, int] = {provider: 0 for provider in SEARCH_CONCURRENCY}
+_waiting: Dict[str, int] = {provider: 0 for provider in SEARCH_CONCURRENCY}
+
+
+@asynccontextmanager
+async def _provider_slot(provider: str):
+    slots = _slots.setdefault(asyncio.get_running_loop(), {})
+    if provider not in slots:
+        slots[provider] = asyncio.Semaphore(SEARCH_CONCURRENCY[provider])
+    _waiting[provider] += 1
+    try:
+        await slots[provider].acquire()
+    finally:
+        _waiting[provider] -= 1
+    _in_flight[provider] += 1
+    try:
+        yield
+    finally:
+        _in_flight[provider] -= 1
+        slots[provider].release()
+
+
+def search_concurrency_metrics() -> Dict[str, Dict[str, int]]:
+    """Per provider limit, searches in flight and searches waiting for a slot."""
+    return {
+        provider: {"limit": limit, "in_flight": _in_flight[provider], "waiting": _waiting[provider]}
+        for provider, limit in SEARCH_CONCURRENCY.items()
+    }
+
+
+async def tavily_search(
+    query: str,
+    max_results: int = SEARCH_RESULTS,
+    include_raw_content: bool = False,
+    time_range: Optional[str] = None,
+    country: Optional[str] = None,
+    include_domains: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Tavily /search over the shared keep-alive session; failed requests raise."""
+    body = {
+        "query": query,
+        "max_results": max_results,
+        "include_raw_content": include_raw_content,
+        "time_range": time_range,
+        "country": country,
+        "include_domains": include_domains,
+    }
+    headers = {"Authorization": f"Bearer {os.getenv('TAVILY_API_KEY', '')}", "Content-Type": "application/json"}
+    async with _provider_slot("tavily"):
+        # Every search is billed: retry once, and stay inside the tools' 60 s per-query timeout
+        return await post_json(f"{TAVILY_API_URL}/search", {k: v for k, v in body.items() if v is not None}, headers=headers, retries=TAVILY_RETRIES)
+
+
+async def duckduckgo_search(query: str) -> List[Dict[str, Any]]:
+    """DuckDuckGo results as a list of {snippet, title, link}."""
+    async with _provider_slot("duckduckgo"):
+        return await asyncio.to_thread(_duckduckgo.invoke, query)
@@ -1,14 +1,16 @@
+import asyncio
 from langchain_core.tools import tool, BaseTool
 import requests
 from pydantic import BaseModel, Field
-from typing import List, Literal, Type, Dict
+from typing import List, Literal, Type, Dict, Tuple
 from langchain_community.tools import DuckDuckGoSearchRun, DuckDuckGoSearchResults
 from langchain_community.utilities import DuckDuckGoSearchAPIWrapper, GoogleSerperAPIWrapper
 from src.backend.utils.utils import pretty_format
 import os
 from src.ai.ai_schemas.tool_structured_input import RedditPostTextSchema, RedditSearchSchema, TwitterSearchSchema
-from langchain_tavily import TavilySearch
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.ai.tools.http_client import run_sync
+from src.ai.tools.search_clients import tavily_search
+from src.ai.tools.tool_cache import SEARCH_CACHE_ENABLED, search_cache_key, tool_cache
 
 
 # reddit_client_id = os.getenv("REDDIT_CLIENT_ID")
@@ -29,6 +31,9 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 # REDDIT_TOKEN = reddit_response.json()["access_token"]
 # REDDIT_HEADER = {**reddit_header1, "Authorization": f"bearer {REDDIT_TOKEN}"}
 
+TWITTER_MAX_RESULTS = 5
+TWITTER_DOMAINS = ["x.com", "twitter.com"]
+
 
 class TwitterPostSearchTool(BaseTool):
     name: str = "search_twitter"
@@ -36,40 +41,51 @@ class TwitterPostSearchTool(BaseTool):
 Returns text extracted from twitter posts.
 """
     args_schema: Type[BaseModel] = TwitterSearchSchema
+    # The posts are the content the LLM reads; the artifact maps each post link to its search's
+    # cache key for the UI sources, and stays on the ToolMessage without reaching the prompt
+    response_format: Literal["content", "content_and_artifact"] = "content_and_artifact"
+
+    def _run(self, query: List[str], explanation: str) -> Tuple[List[Dict], Dict[str, str]]:
+        return run_sync(self._arun(query, explanation))
 
-    def _run(self, query: List[str], explanation: str) -> List[Dict]:
+    async def _arun(self, query: List[str], explanation: str) -> Tuple[List[Dict], Dict[str, str]]:
         try:
-            tavily_tool = TavilySearch(max_results=5, include_domains=["x.com", "twitter.com"])
             response = []
-
-            with ThreadPoolExecutor(max_workers=len(query)) as executor:
-                future_to_query = {
-                    executor.submit(self._search_with_tavily, tavily_tool, q): q for q in query
-                }
-
-                for future in as_completed(future_to_query):
-                    try:
-                        result = future.result()
-                        response.extend(result)
-                    except Exception as e:
-                        query_str = future_to_query[future]
-                        print(f"{query_str} generated an exception: {str(e)}")
-
-            for post in response:
-                post['snippet'] = post.pop('content') or post['title']
-                post['link'] = post.pop('url')
-
-            return response
+            cache_keys = {}
+
+            # Queries run concurrently; the Tavily slots in search_clients bound the load across all users
+            results = await asyncio.gather(*(self._search_with_tavily(q) for q in query), return_exceptions=True)
+            for query_str, result in zip(query, results):
+                if isinstance(result, BaseException):
+                    print(f"{query_str} generated an exception: {str(result)}")
+                    continue
+                cache_key, posts = result
+                for post in posts:
+                    post['snippet'] = post.pop('content') or post['title']
+                    post['link'] = post.pop('url')
+                    cache_keys[post['link']] = cache_key
+                response.extend(posts)
+
+            return response, cache_keys
 
         except Exception as e:
             error_msg = f"Failed twitter search through tavily: {str(e)}"
-            return {'error': error_msg}
+            return {'error': error_msg}, {}
 
-    def _search_with_tavily(self, tavily_tool, q):
+    async def _search_with_tavily(self, q):
+        """The search's cache key and this call's own copies of its posts."""
         search_query = q
-        op = tavily_tool.invoke({"query": search_query})
-        print(f"Tavily search completed for: {search_query}")
-        return op['results']
+        cache_key = search_cache_key("twitter", search_query, max_results=TWITTER_MAX_RESULTS)
+
+        async def _search():
+            op = await tavily_search(search_query, max_results=TWITTER_MAX_RESULTS, include_domains=TWITTER_DOMAINS)
+            print(f"Tavily search completed for: {search_query}")
+            return op['results']
+
+        if not SEARCH_CACHE_ENABLED:
+            return cache_key, await _search()
+        # Posts are renamed in place by _arun, so each call gets its own copies of the cached ones
+        return cache_key, [dict(post) for post in await tool_cache.get_or_fetch("twitter_search", cache_key, _search)]
 
 
 
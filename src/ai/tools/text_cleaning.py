@@ -0,0 +1,159 @@
+import os
+import threading
+import multiprocessing
+import regex as re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+# Page cleaning for web search results. Functions here are top level and import nothing heavy,
+# so a spawned worker process can load this module on its own.
+# One core is left to the event loop; on a single-core box pages are cleaned inline
+WEB_CLEAN_PROCESSES = int(os.getenv("WEB_CLEAN_PROCESSES", min(4, (os.cpu_count() or 1) - 1)))
+# Batches smaller than this many characters are cleaned inline; shipping them to a worker costs more
+WEB_CLEAN_POOL_MIN_CHARS = int(os.getenv("WEB_CLEAN_POOL_MIN_CHARS", 20000))
+WEB_CLEAN_MAX_CHARS = 50000
+
+_HASH_MOD = (1 << 61) - 1
+_HASH_BASE = 1000003
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def collapse_repeated_words(text: str) -> str:
+    # Only collapse 3+ repeats
+    return re.sub(r'\b(\w+)(?:\s+\1\b){2,}', r'\1', text)
+
+
+def remove_duplicate_lines(text: str) -> str:
+    if not text or len(text) < 100:  # Skip for very short text
+        return text
+
+    lines = text.splitlines()
+    if len(lines) < 10:  # Skip for short content
+        return text
+
+    seen = set()
+    new_lines = []
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            if len(new_lines) == 0 or new_lines[-1].strip():
+                new_lines.append('')
+            continue
+
+        key = stripped.lower()
+        if key not in seen:
+            seen.add(key)
+            new_lines.append(line)
+
+    return "\n".join(new_lines)
+
+
+def remove_redundant_blocks(text: str, min_block_words: int = 30) -> str:
+    """
+    Drop every run of `min_block_words` or more tokens that already appeared earlier in the page.
+    Each window of `min_block_words` tokens gets a Rabin-Karp rolling hash, so the whole page
+    is scanned once in O(n); a repeated block of any length shows up as a chain of repeated windows.
+    """
+    tokens = text.split()
+    n = len(tokens)
+    if n < min_block_words * 2:
+        return text
+
+    width = min_block_words
+    token_ids = {}
+    codes = [token_ids.setdefault(token, len(token_ids) + 1) for token in tokens]
+    top = pow(_HASH_BASE, width - 1, _HASH_MOD)
+
+    h = 0
+    for code in codes[:width]:
+        h = (h * _HASH_BASE + code) % _HASH_MOD
+
+    seen = set()
+    dropped = []  # merged [start, end) token ranges to remove
+    drop_start = drop_end = 0
+    for i in range(n - width + 1):
+        if i:
+            h = ((h - codes[i - 1] * top) * _HASH_BASE + codes[i + width - 1]) % _HASH_MOD
+        if h in seen:
+            if i > drop_end:
+                if drop_end:
+                    dropped.append((drop_start, drop_end))
+                drop_start = i
+            drop_end = i + width
+        elif i >= drop_end:
+            # Only windows that survive intact count as a first occurrence
+            seen.add(h)
+    if drop_end:
+        dropped.append((drop_start, drop_end))
+
+    kept = []
+    position = 0
+    for start, end in dropped:
+        kept.extend(tokens[position:start])
+        position = end
+    kept.extend(tokens[position:])
+    return " ".join(kept)
+
+
+def clean_page_text(text: str) -> str:
+    """Whitespace normalisation, repeated words, duplicate lines and repeated blocks, for one page."""
+    try:
+        if not text or len(text) < 50:
+            return text.strip() if text else text
+
+        # Limit text size to prevent excessive processing
+        if len(text) > WEB_CLEAN_MAX_CHARS:
+            text = text[:WEB_CLEAN_MAX_CHARS] + "..."
+
+        # Basic cleaning
+        text = re.sub(r'\n\s*\n', '\n', text)
+        text = re.sub(r'\t+', ' ', text)
+        text = text.strip()
+        text = re.sub(r' +', ' ', text)
+
+        if len(text) > 100:
+            text = collapse_repeated_words(text)
+            text = remove_duplicate_lines(text)
+            if len(text) > 1000:
+                text = remove_redundant_blocks(text, min_block_words=30)
+
+        return text
+    except Exception as e:
+        print(f"Error in cleaning webpage text: {str(e)}")
+        return text[:1000] if len(text) > 1000 else text  # Return truncated version on error
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the parent runs an event loop and driver threads that must not be copied
+            _pool = ProcessPoolExecutor(max_workers=WEB_CLEAN_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def clean_pages(texts: List[str]) -> List[str]:
+    """Clean a batch of pages, on the shared process pool when the batch is big enough to pay for it."""
+    if WEB_CLEAN_PROCESSES <= 0 or len(texts) < 2 or sum(len(text or "") for text in texts) < WEB_CLEAN_POOL_MIN_CHARS:
+        return [clean_page_text(text) for text in texts]
+
+    global _pool
+    try:
+        return list(_get_pool().map(clean_page_text, texts))
+    except BrokenProcessPool as e:
+        print(f"Page cleaning pool failed, cleaning inline: {e}")
+        with _pool_lock:
+            _pool = None
+        return [clean_page_text(text) for text in texts]
+
+
+def shutdown_cleaning_pool():
+    """Stop the page cleaning workers. Called on application shutdown."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import string
+import asyncio
+import inspect
+import functools
+import threading
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from cachetools import LRUCache
+from src.ai.tools.http_client import single_flight
+from src.backend.utils.api_utils import redis_manager
+
+TOOL_CACHE_MAXSIZE = int(os.getenv("TOOL_CACHE_MAXSIZE", 2048))
+TOOL_CACHE_PREFIX = "tool_cache"
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+
+# (fresh seconds, extra seconds a stale entry may still be served while it is refreshed)
+CACHE_TTLS: Dict[str, Tuple[int, int]] = {
+    "quote": (15, 45),
+    "historical": (60 * 60, 60 * 60),
+    "search": (24 * 60 * 60, 24 * 60 * 60),
+    "profile": (24 * 60 * 60, 24 * 60 * 60),
+    "statement": (14 * 24 * 60 * 60, 7 * 24 * 60 * 60),
+    # Web and social search results, tiered by the search's time_range
+    "web_search_day": (10 * 60, 5 * 60),
+    "web_search_week": (60 * 60, 30 * 60),
+    "web_search_month": (4 * 60 * 60, 2 * 60 * 60),
+    "web_search_year": (12 * 60 * 60, 12 * 60 * 60),
+    "web_search": (30 * 60, 30 * 60),
+    "twitter_search": (10 * 60, 5 * 60),
+}
+
+SEARCH_TIME_RANGE_CLASSES = {"d": "web_search_day", "w": "web_search_week", "m": "web_search_month", "y": "web_search_year"}
+
+
+class TieredCache:
+    """
+    Two-tier TTL cache for tool responses: a bounded in-process LRU in front of Redis.
+    Entries past their fresh TTL but inside the stale window are returned immediately
+    while a single background fetch refreshes them (stale-while-revalidate).
+    Cached values are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, maxsize: int = TOOL_CACHE_MAXSIZE):
+        self.local = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._refresh_tasks = set()
+
+    def _local_get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.local.get(key)
+
+    def _local_set(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self.local[key] = entry
+
+    @staticmethod
+    def _redis_available() -> bool:
+        # The Redis client is bound to the app loop; tools run through asyncio.run only use the local tier
+        return redis_manager.client is not None and getattr(redis_manager, "loop", None) is asyncio.get_running_loop()
+
+    async def _redis_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self._redis_available():
+            return None
+        try:
+            raw = await redis_manager.safe_execute("get", f"{TOOL_CACHE_PREFIX}:{key}")
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            print(f"Tool cache read failed for {key}: {e}")
+            return None
+
+    async def _redis_set(self, key: str, entry: Dict[str, Any], expire: int):
+        if not self._redis_available():
+            return
+        try:
+            await redis_manager.safe_execute("set", f"{TOOL_CACHE_PREFIX}:{key}", json.dumps(entry, default=str), ex=expire)
+        except Exception as e:
+            print(f"Tool cache write failed for {key}: {e}")
+
+    async def _fetch_and_store(self, data_class: str, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        fresh_ttl, stale_ttl = CACHE_TTLS[data_class]
+        value = await fetch()
+        now = time.time()
+        entry = {"value": value, "fresh_until": now + fresh_ttl, "stale_until": now + fresh_ttl + stale_ttl}
+        self._local_set(key, entry)
+        await self._redis_set(key, entry, fresh_ttl + stale_ttl)
+        return value
+
+    def _refresh_in_background(self, data_class: str, key: str, fetch: Callable[[], Awaitable[Any]]):
+        async def _refresh():
+            try:
+                await single_flight(("tool_cache", key), lambda: self._fetch_and_store(data_class, key, fetch))
+            except Exception as e:
+                print(f"Tool cache refresh failed for {key}: {e}")
+
+        task = asyncio.create_task(_refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def get_or_fetch(self, data_class: str, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        key = f"{data_class}:{key}"
+        now = time.time()
+
+        entry = self._local_get(key)
+        if entry is None:
+            entry = await self._redis_get(key)
+            if entry is not None:
+                self._local_set(key, entry)
+
+        if entry is not None:
+            if now < entry["fresh_until"]:
+                return entry["value"]
+            if now < entry["stale_until"]:
+                self._refresh_in_background(data_class, key, fetch)
+                return entry["value"]
+
+        return await single_flight(("tool_cache", key), lambda: self._fetch_and_store(data_class, key, fetch))
+
+
+tool_cache = TieredCache()
+
+
+def normalize_query(query: str) -> str:
+    """Case, Unicode form, spacing and punctuation around words do not change what a search returns."""
+    words = unicodedata.normalize("NFKC", query or "").lower().split()
+    return " ".join(word for word in (word.strip(string.punctuation) for word in words) if word)
+
+
+def search_cache_key(provider: str, query: str, time_range: Optional[str] = None, country: Optional[str] = None, max_results: int = 5) -> str:
+    """Cache key of one search request; also sent to the UI with the sources it produced."""
+    return f"{provider}:{time_range or 'any'}:{country or 'any'}:{max_results}:{normalize_query(query)}"
+
+
+def search_data_class(time_range: Optional[str] = None) -> str:
+    """CACHE_TTLS class for a web search: the shorter its time_range, the sooner its results go stale."""
+    return SEARCH_TIME_RANGE_CLASSES.get((time_range or "")[:1].lower(), "web_search")
+
+
+def cached(data_class: str):
+    """Cache an async fetch function in `tool_cache`, keyed by its name and arguments."""
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            # Bind so positional and keyword calls with the same values share an entry
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = f"{func.__name__}:{json.dumps(bound.arguments, sort_keys=True, default=str)}"
+            return await tool_cache.get_or_fetch(data_class, key, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
@@ -1,10 +1,8 @@
 import asyncio,time
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
-from langchain_community.tools import DuckDuckGoSearchResults
 from langchain_community.utilities import GoogleSerperAPIWrapper
 from langchain_community.document_loaders import PyPDFLoader, WebBaseLoader, PyMuPDFLoader
-import regex as re
 from src.backend.utils.utils import pretty_format
 from typing import List, Dict, Any, Type, Tuple, Optional
 from src.ai.agents.utils import get_context_based_answer_prompt
@@ -15,12 +13,16 @@ from collections import defaultdict
 import datetime
 from datetime import timezone
 import json
-import concurrent.futures
-from langchain_tavily import TavilySearch
 from src.backend.utils.utils import get_second_level_domain, get_favicon_link
 import src.backend.db.mongodb as mongodb
 from langgraph.config import get_stream_writer
 from src.ai.llm.config import WebSearchConfig
+from src.ai.tools.http_client import run_sync
+from src.ai.tools.passage_ranking import WEB_PASSAGE_RANKING, select_passages
+from src.ai.tools.result_dedup import drop_near_duplicates
+from src.ai.tools.search_clients import SEARCH_RESULTS, duckduckgo_search, tavily_search
+from src.ai.tools.text_cleaning import clean_page_text, clean_pages, collapse_repeated_words, remove_duplicate_lines, remove_redundant_blocks
+from src.ai.tools.tool_cache import SEARCH_CACHE_ENABLED, search_cache_key, search_data_class, tool_cache
 
 
 # serper_api_key = os.environ.get("GOOGLE_SERPER_API_KEY")
@@ -195,127 +197,42 @@ When searching a query which is specific to a country or region, provide the cou
         return len(text.split())
 
     def _collapse_repeated_words(self, text: str) -> str:
-        # Use more efficient regex with limits
-        text = re.sub(r'\b(\w+)(?:\s+\1\b){2,}', r'\1', text)  # Only collapse 3+ repeats
-        return text
+        return collapse_repeated_words(text)
 
     def _remove_duplicate_lines(self, text: str) -> str:
-        """Optimized version with early termination"""
-        if not text or len(text) < 100:  # Skip for very short text
-            return text
-            
-        seen = set()
-        lines = text.splitlines()
-        if len(lines) < 10:  # Skip for short content
-            return text
-            
-        new_lines = []
-        for line in lines:
-            stripped = line.strip()
-            if not stripped:
-                if len(new_lines) == 0 or new_lines[-1].strip():
-                    new_lines.append('')
-                continue
-
-            key = stripped.lower()
-            if key not in seen:
-                seen.add(key)
-                new_lines.append(line)
-                
-        return "\n".join(new_lines)
+        return remove_duplicate_lines(text)
 
     def _remove_long_redundant_blocks_optimized(self, text: str, min_block_words: int = 30) -> str:
-        """Much more efficient version with early termination and limits"""
-        tokens = text.split()
-        n = len(tokens)
-        
-        # Early termination for small texts
-        if n < min_block_words * 2:
-            return text
-            
-        # Limit processing for very large texts to avoid performance issues
-        if n > 5000:  # Process only first 5000 tokens for very long content
-            tokens = tokens[:5000]
-            n = 5000
-
-        keep = [True] * n
-        first_occurrence = {}
-        
-        # Reduce max phrase length to improve performance
-        max_phrase = min(min_block_words + 5, n // 3)  # Reduced from n//2
-
-        # Process only larger blocks first (reverse order for efficiency)
-        for L in range(max_phrase, min_block_words - 1, -1):
-            for i in range(0, n - L + 1):
-                if not all(keep[i:i+L]):
-                    continue
-                    
-                phrase = tuple(tokens[i:i+L])
-                if phrase in first_occurrence:
-                    # Mark tokens for removal
-                    for k in range(i, i+L):
-                        keep[k] = False
-                else:
-                    first_occurrence[phrase] = i
-                    
-                # Early termination if we've processed enough
-                if len(first_occurrence) > 100:  # Limit memory usage
-                    break
-
-        filtered = [tok for (tok, kf) in zip(tokens, keep) if kf]
-        return " ".join(filtered)
+        return remove_redundant_blocks(text, min_block_words=min_block_words)
 
     def _clean_text_optimized(self, text: str) -> str:
-        """Optimized text cleaning with early termination and limits"""
-        try:
-            if not text or len(text) < 50:
-                return text.strip()
-                
-            # Limit text size to prevent excessive processing
-            if len(text) > 50000:  # 50k chars limit
-                text = text[:50000] + "..."
-                
-            # Basic cleaning
-            text = re.sub(r'\n\s*\n', '\n', text)
-            text = re.sub(r'\t+', ' ', text)
-            text = text.strip()
-            text = re.sub(r' +', ' ', text)
-
-            # Only apply expensive operations for medium-sized texts
-            if 100 < len(text) < 20000:
-                text = self._collapse_repeated_words(text)
-                text = self._remove_duplicate_lines(text)
-                
-                # Only apply block removal for longer texts
-                if len(text) > 1000:
-                    text = self._remove_long_redundant_blocks_optimized(text, min_block_words=30)
-
-            return text
-        except Exception as e:
-            print(f"Error in cleaning webpage text: {str(e)}")
-            return text[:1000] if len(text) > 1000 else text  # Return truncated version on error
-    
-    def _prepare_output_and_file_data(self, result_dict: Dict, source: str) -> Tuple[Dict, Optional[Dict]]:
+        return clean_page_text(text)
+
+    def _select_text(self, result_dict: Dict, source: str) -> str:
+        """Raw page content for Tavily results, the search snippet otherwise."""
+        raw_content = result_dict.get('raw_content')
+        snippet_content = result_dict.get('content') or result_dict.get('snippet', '')
+        # Passage ranking trims long pages after cleaning; without it, skip pages too long to send whole
+        if source == "Tavily" and raw_content and (WEB_PASSAGE_RANKING or len(raw_content.split()) <= 3000):
+            return raw_content
+        # For very long content, just clean the snippet
+        return snippet_content
+
+    def _prepare_output_and_file_data(self, result_dict: Dict, source: str, content_for_llm: Optional[str] = None, query: Optional[str] = None) -> Tuple[Dict, Optional[Dict]]:
+        """
+        `content_for_llm` is the already cleaned page text when the caller cleaned a batch of pages itself.
+        Pages longer than the passage budget are cut down to the passages that best match `query`.
+        """
         link = result_dict.get('url') or result_dict.get('link')
         title = result_dict.get('title', 'No Title')
-        raw_content = result_dict.get('raw_content')
         snippet_content = result_dict.get('content') or result_dict.get('snippet', '')
 
-        content_for_llm = ""
-
-        if source == "Tavily" and raw_content:
-            # Quick word count before expensive cleaning
-            estimated_word_count = len(raw_content.split())
-            if estimated_word_count <= 3000:  # Increased threshold slightly
-                content_for_llm = self._clean_text_optimized(raw_content)
-            else:
-                # For very long content, just clean the snippet
-                content_for_llm = self._clean_text_optimized(snippet_content)
-        else:
-            content_for_llm = self._clean_text_optimized(snippet_content)
+        if content_for_llm is None:
+            content_for_llm = self._clean_text_optimized(self._select_text(result_dict, source))
 
         if content_for_llm is None:
             content_for_llm = ""
+        content_for_llm = select_passages(content_for_llm, query)
 
         tool_output = {
             'link': link,
@@ -332,127 +249,127 @@ When searching a query which is specific to a country or region, provide the cou
 
         return tool_output, source_to_send
     
-    def _run(self, query: List[str] = None, time_range: str = None, country: str = None, explanation: str = None) -> Dict:
-        writer = get_stream_writer()
-        output = {'results': [], 'errors': []}
+    def _process_results(self, raw_results: List[Dict], source: str, q: str) -> Dict:
+        """Cleaned, passage-ranked tool output, scores and UI sources for one query's provider results."""
+        current_results = []
+        current_scores = []
+        sources_data = []
+
+        start_process = time.time()
+        if source == "Tavily":
+            # Clean all pages of the query in one batch on the cleaning process pool
+            cleaned_pages = clean_pages([self._select_text(r, source) for r in raw_results])
+        else:
+            cleaned_pages = [None] * len(raw_results)
+        for r, content_for_llm in zip(raw_results, cleaned_pages):
+            tool_res, source_to_send = self._prepare_output_and_file_data(r, source, content_for_llm, query=q)
+            current_results.append(tool_res)
+            current_scores.append((r.get('score') or 0.0) if source == "Tavily" else 0.0)
+            sources_data.append(source_to_send)
+        process_time = time.time() - start_process
+        print(f"Text processing time: {process_time:.2f}s for {len(raw_results)} results")
 
-        # Initialize search engines once
-        search_tavily = TavilySearch(max_results=5, include_raw_content=True, time_range=time_range, include_domains=None, country=country)
-        # search_google = GoogleSerperAPIWrapper(serper_api_key=serper_api_key, k=6)
-        search_duckduckgo = DuckDuckGoSearchResults(num_results=5, output_format="list")
-
-        def process_query(q):
-            current_results = []
-            sources_data = []
-            error_messages = []
-            method_used = "None"
-
-            # Try Tavily first
-            try:
-                start = time.time()
-                first_search = search_tavily.invoke(input={'query': q})
-                tavily_raw_results = first_search.get('results', [])
-                tavily_time = time.time() - start
-                print(f"Tavily search time: {tavily_time:.2f}s for query: {q}")
-
-                if tavily_raw_results:
-                    method_used = "Tavily"
-                    
-                    # Process results in batch to reduce writer calls
-                    start_process = time.time()
-                    for r in tavily_raw_results:
-                        tool_res, source_to_send = self._prepare_output_and_file_data(r, "Tavily")
-                        current_results.append(tool_res)
-                        sources_data.append(source_to_send)
+        return {"method": source, "results": current_results, "scores": current_scores, "sources": sources_data}
+
+    async def _search_query(self, q: str, time_range: str = None, country: str = None) -> Dict:
+        error_messages = []
+
+        # Try Tavily first
+        try:
+            start = time.time()
+            first_search = await tavily_search(q, max_results=SEARCH_RESULTS, include_raw_content=True, time_range=time_range, country=country)
+            tavily_raw_results = first_search.get('results', [])
+            tavily_time = time.time() - start
+            print(f"Tavily search time: {tavily_time:.2f}s for query: {q}")
+
+            if tavily_raw_results:
+                # Cleaning and ranking are CPU work; keep them off the event loop
+                return await asyncio.to_thread(self._process_results, tavily_raw_results, "Tavily", q)
+
+        except Exception as e:
+            error_messages.append(f"Tavily error for query '{q}': {str(e)}")
+
+        # # Fallback to Google (same optimization pattern)
+        # try:
+        #     google_structured_result = search_google.results(q)
+        #     google_api_results = google_structured_result.get('organic', []) + google_structured_result.get('topStories', [])
+
+        #     if google_api_results:
+        #         return self._process_results(google_api_results, "Google", q)
                     
-                    process_time = time.time() - start_process
-                    print(f"Text processing time: {process_time:.2f}s for {len(tavily_raw_results)} results")
+        # except Exception as e:
+        #     error_messages.append(f"Google error for query '{q}': {str(e)}")
 
-                    # Single writer call instead of multiple
-                    if sources_data:
-                        writer({'source_update': sources_data})
+        # Fallback to DuckDuckGo
+        try:
+            ddg_structured_results = await duckduckgo_search(q)
+            if ddg_structured_results:
+                return await asyncio.to_thread(self._process_results, ddg_structured_results, "DuckDuckGo", q)
 
-                    if current_results:
-                        return {"method": method_used, "results": current_results, "query": q, "error": None}
-                        
-            except Exception as e:
-                error_messages.append(f"Tavily error for query '{q}': {str(e)}")
-
-            # # Fallback to Google (same optimization pattern)
-            # try:
-            #     google_structured_result = search_google.results(q)
-            #     google_api_results = google_structured_result.get('organic', []) + google_structured_result.get('topStories', [])
-
-            #     if google_api_results:
-            #         method_used = "Google"
-            #         for r in google_api_results:
-            #             tool_res, source_to_send = self._prepare_output_and_file_data(r, "Google")
-            #             current_results.append(tool_res)
-            #             sources_data.append(source_to_send)
-
-            #         if sources_data:
-            #             writer({'source_update': sources_data})
-
-            #         if current_results:
-            #             return {"method": method_used, "results": current_results, "query": q, "error": None}
-                        
-            # except Exception as e:
-            #     error_messages.append(f"Google error for query '{q}': {str(e)}")
-
-            # Fallback to DuckDuckGo
-            try:
-                ddg_structured_results = search_duckduckgo.invoke(q)
-                if ddg_structured_results:
-                    method_used = "DuckDuckGo"
-                    for r in ddg_structured_results:
-                        tool_res, source_to_send = self._prepare_output_and_file_data(r, "DuckDuckGo")
-                        current_results.append(tool_res)
-                        sources_data.append(source_to_send)
-
-                    if sources_data:
-                        writer({'source_update': sources_data})
-
-                    if current_results:
-                        return {"method": method_used, "results": current_results, "query": q, "error": None}
-                        
-            except Exception as e:
-                error_messages.append(f"DuckDuckGo error for query '{q}': {str(e)}")
+        except Exception as e:
+            error_messages.append(f"DuckDuckGo error for query '{q}': {str(e)}")
 
-            return {
-                "method": "Failed",
-                "results": [],
-                "query": q,
-                "error": f"All search methods failed for query '{q}': " + "; ".join(error_messages)
-            }
+        # Raising keeps failures out of the search cache
+        raise RuntimeError(f"All search methods failed for query '{q}': " + "; ".join(error_messages))
+
+    async def _process_query(self, q: str, time_range: str = None, country: str = None, writer=None) -> Dict:
+        cache_key = search_cache_key("web", q, time_range, country, SEARCH_RESULTS)
+        try:
+            if SEARCH_CACHE_ENABLED:
+                searched = await tool_cache.get_or_fetch(search_data_class(time_range), cache_key, lambda: self._search_query(q, time_range, country))
+            else:
+                searched = await self._search_query(q, time_range, country)
+        except Exception as e:
+            return {"method": "Failed", "results": [], "query": q, "error": str(e)}
+
+        # Cached results are shared between calls; the copies below are what this call may modify
+        sources_data = [{**source, "cache_key": cache_key} for source in searched["sources"]]
+        if sources_data and writer:
+            writer({'source_update': sources_data})
+
+        return {
+            "method": searched["method"],
+            "results": [dict(result) for result in searched["results"]],
+            "scores": list(searched["scores"]),
+            "query": q,
+            "error": None,
+        }
+
+    def _run(self, query: List[str] = None, time_range: str = None, country: str = None, explanation: str = None) -> Dict:
+        return run_sync(self._arun(query, time_range, country, explanation))
+
+    async def _arun(self, query: List[str] = None, time_range: str = None, country: str = None, explanation: str = None) -> Dict:
+        writer = get_stream_writer()
+        output = {'results': [], 'errors': []}
 
         try:
             start_all = time.time()
-            
-            # Use ProcessPoolExecutor for CPU-intensive text processing
-            # Or limit ThreadPoolExecutor workers to avoid resource contention
-            max_workers = min(3, len(query))  # Limit concurrent searches
-            
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_to_query = {executor.submit(process_query, q): q for q in query}
-                
-                for future in concurrent.futures.as_completed(future_to_query):
-                    try:
-                        result = future.result(timeout=60)  # Add timeout to prevent hanging
-                        if result["method"] != "Failed":
-                            output['results'].extend(result["results"])
-                        else:
-                            if result.get("error"):
-                                output['errors'].append(result["error"])
-                    except concurrent.futures.TimeoutError:
-                        q = future_to_query[future]
-                        err_msg = f"Timeout processing query '{q}'"
-                        print(err_msg)
-                        output['errors'].append(err_msg)
-                    except Exception as e:
-                        q = future_to_query[future]
-                        err_msg = f"Critical error processing result for query '{q}': {str(e)}"
-                        print(err_msg)
-                        output['errors'].append(err_msg)
+            result_scores = []
+
+            # Queries run concurrently; the provider slots in search_clients bound the load across all users
+            results = await asyncio.gather(
+                *(asyncio.wait_for(self._process_query(q, time_range, country, writer), timeout=60) for q in query),
+                return_exceptions=True,
+            )
+            for q, result in zip(query, results):
+                if isinstance(result, asyncio.TimeoutError):
+                    err_msg = f"Timeout processing query '{q}'"
+                    print(err_msg)
+                    output['errors'].append(err_msg)
+                elif isinstance(result, BaseException):
+                    err_msg = f"Critical error processing result for query '{q}': {str(result)}"
+                    print(err_msg)
+                    output['errors'].append(err_msg)
+                elif result["method"] != "Failed":
+                    output['results'].extend(result["results"])
+                    result_scores.extend(result["scores"])
+                elif result.get("error"):
+                    output['errors'].append(result["error"])
+
+            # Syndicated copies of the same story across queries reach the LLM only once
+            output['results'], dropped, tokens_saved = drop_near_duplicates(output['results'], result_scores)
+            if dropped:
+                print(f"Near-duplicate results removed: {dropped}, ~{tokens_saved} tokens saved")
                         
             total_time = time.time() - start_all
             print(f"Total execution time: {total_time:.2f}s for {len(query)} queries")
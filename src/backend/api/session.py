@@ -4,49 +4,54 @@ import os
 import re
 import uuid
 import traceback
-import time
 import base64
 import tempfile
 
 from src.ai.chart_bot.chart_bot_utils.generate_related_qn import chart_bot_related_query
 from src.ai.stock_prediction.stock_prediction_functions import get_sentiment_rating, get_stock_history, sarimax_predict
 from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
 from fastapi import APIRouter, Request, HTTPException, Query,status, BackgroundTasks, File, UploadFile
 from fastapi.responses import StreamingResponse,JSONResponse, StreamingResponse
 from typing import Optional, Dict, Any, AsyncGenerator
 from src.ai.ai_schemas.tool_structured_input import TickerSchema
 from src.ai.tools.financial_tools import get_stock_data
 import src.backend.db.mongodb as mongodb
-from src.backend.utils.agent_comm import process_agent_input_functional
-from src.ai.agents.fast_agent import process_fast_agent_input
-from src.ai.agents.summarizer import stream_summary
 from src.backend.models.app_io_schemas import StockPredictionRequest, StockDataRequest, ResponseFeedback, ExportResponse, UpdateSessionAccess,UpdateMessageAccess
 # from src.backend.utils.api_utils import notify_slack_error, redis_manager
 from src.backend.utils.export_utils import markdown_to_pdf, markdown_to_docx, slugify
 import src.backend.utils as utils
 import src.backend.db.filestorage as filestorage
 from src.backend.db.mongodb import RelatedQueriesResponse,UploadResponse, MessageLog,StockDataRequest, QueryRequestModel
-from src.backend.core.api_limit import apiSecurityFree
+from src.backend.core.api_limit import apiSecurityFree, apiSecurityAdmin
 from src.ai.stock_prediction.stock_prediction import StockAnalysisAgent
-from src.backend.utils.api_utils import redis_manager
-from src.backend.db.mongodb import handle_partial_data_storage
+from src.backend.utils.api_utils import redis_manager, stop_registry
 from src.backend.utils.utils import render_charts_as_images
+import src.backend.utils.sse_replay as sse_replay
+import src.backend.utils.job_queue as job_queue
+from src.backend.utils.query_runner import query_job, run_query
+from src.ai.llm.model import llm_client_metrics
 
 stock_agent = StockAnalysisAgent()
 router = APIRouter()
 
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'X-Accel-Buffering': 'no'
+}
+
 @router.get("/__ping")
 async def ping():
     return {"ok": True}
 
 @router.get("/sessions")
-async def list_sessions2(user : apiSecurityFree, page: int = 1, limit: int = 25) -> Dict[str, Any]:
+async def list_sessions2(user : apiSecurityFree, page: int = 1, limit: int = 25, cursor: Optional[str] = None) -> Dict[str, Any]:
     """
     Fetch all sessions of a user, ordered by timestamp.
+    Pass the `next_cursor` of the previous page as `cursor` to page without offsets.
     """
     
-    sessions = await mongodb.get_sessions_by_user2(user.id.__str__(), page, limit)
+    sessions = await mongodb.get_sessions_by_user2(user.id.__str__(), page, limit, cursor)
     if not sessions:
         raise HTTPException(status_code=404, detail="No sessions found for this user.")
     return sessions
@@ -56,15 +61,16 @@ async def search_sessions_by_title_pagination(
     user: apiSecurityFree,
     keyword: str = None,
     page: int = 1,
-    limit: int = 10
+    limit: int = 10,
+    cursor: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Return paginated sessions whose title contains the keyword, grouped by timeline.
     """
     
     if(keyword == "" or keyword == None or keyword == " "):
-        return await mongodb.get_sessions_by_user2(user.id.__str__(), page, limit)
-    result = await mongodb.get_sessions_by_user_and_keyword_pagination(user.id.__str__(), keyword, page, limit)
+        return await mongodb.get_sessions_by_user2(user.id.__str__(), page, limit, cursor)
+    result = await mongodb.get_sessions_by_user_and_keyword_pagination(user.id.__str__(), keyword, page, limit, cursor)
     return result
 
 @router.put("/sessions/rename")
@@ -121,23 +127,10 @@ async def delete_session(user: apiSecurityFree, session_id: str):
 async def query_and_stream(user: apiSecurityFree, query: QueryRequestModel, request: Request, bgt: BackgroundTasks):
     
     user_id = user.id.__str__()
-    user_query = query.user_query
     session_id = query.session_id
-    realtime_info = query.realtime_info
-    search_mode = query.search_mode
     retry_response = query.retry_response
     message_id = query.message_id
-    prev_message_id = query.prev_message_id
-    timezone = query.timezone
-    doc_ids = query.doc_ids
     ip_address = request.client.host
-    website = str(request.base_url)
-    is_elaborate = query.is_elaborate
-    is_example = query.is_example
-
-    user_tz = ZoneInfo(timezone)
-    local_time = datetime.now(user_tz)
-    stopTime = time.time()
     # if (not user_id or not user_query):
     #     async def error_gen_missing_field():
     #         error_event = {"type": "error", "content": "user_id and user_query are required."}
@@ -157,367 +150,79 @@ async def query_and_stream(user: apiSecurityFree, query: QueryRequestModel, requ
     if not session_id:
         session_id = str(uuid.uuid4())
 
-    async def event_generator() -> AsyncGenerator[str, None]:
-        nonlocal session_id, message_id
-
-        session_info_event_data = {
-            "session_id": session_id,
-            "message_id": message_id,
-            "status": "starting query processing"
-        }
-        yield f"event: session_info\ndata: {json.dumps(session_info_event_data)}\n\n"
-
-        token_buffer = []
-        stock_graph = set()
-        user_data = await mongodb.fetch_user_by_id(user_id)
-        user_name = user_data.full_name if user_data and user_data.full_name else "user"
-        error_flag = False
-        message_log = ""
-        current_messages_log = []
-        processor_iterator = None
-        time_taken = 0
-
-
-         # Variables to track partial data for storage
-        partial_content_buffer = []  # Store all streamed content chunks
-        partial_sources = []
-        partial_related_queries = []
-        partial_metadata = None
-
-        try:
-            if search_mode == 'summarizer':
-                async for event in stream_summary(user_id, session_id, message_id, prev_message_id, user_query, local_time, timezone, is_elaborate, is_example):
-                    yield event.encode('utf-8')
-                return
-                
+    job = query_job(user_id, query, ip_address)
+    job["session_id"] = session_id
+
+    if sse_replay.available():
+        # The run is decoupled from this connection: it writes to the message's Redis Stream and the
+        # response tails it, so a dropped client can resume via /query-stream/{message_id}/events.
+        # A repeated request for a message that is still running or replayable attaches to it.
+        last_event_id = request.headers.get("last-event-id")
+        restart = retry_response and not last_event_id
+        if await sse_replay.claim_run(message_id, user_id, restart=restart):
+            if job_queue.queue_mode():
+                # Agent workers run the graph; this web worker only relays the stream
+                if not await job_queue.enqueue(job):
+                    await sse_replay.release_run(message_id)
+                    raise HTTPException(status_code=503, detail="Too many queries in progress, please retry shortly.", headers={"Retry-After": "10"})
             else:
-                if search_mode == 'fast':
-                    processor_iterator = process_fast_agent_input(
-                        user_id=user_id,
-                        session_id=session_id,
-                        user_query=user_query,
-                        message_id=message_id,
-                        prev_message_id=prev_message_id,
-                        timezone = timezone,
-                        ip_address = ip_address,
-                        doc_ids = doc_ids
-                    )
-
-                else:
-                    pro_reasoning = (search_mode == 'agentic-reasoning')
-
-                    processor_iterator = process_agent_input_functional(
-                        user_id=user_id,
-                        session_id=session_id,
-                        user_query=user_query,
-                        message_id=message_id,
-                        prev_message_id=prev_message_id,
-                        realtime_info=realtime_info,
-                        pro_reasoning=pro_reasoning,
-                        retry_response=retry_response,
-                        timezone = timezone,
-                        ip_address = ip_address,
-                        doc_ids = doc_ids,
-                    )
-                    
-            TIMEOUT_PERIOD = 300
-            KEEP_ALIVE_INTERVAL = 5
-            KEEP_ALIVE_COUNT = 0
-            MAX_KEEP_ALIVE_COUNT = 60
-            batched_event_count = 0
-            await mongodb.append_data(user_id, session_id, message_id, current_messages_log, local_time, timezone)
-            while True:
-                stop_key = f"stop:{session_id}"
-                stop_signal = await redis_manager.safe_execute("get", stop_key)
-                if stop_signal:
-                    # Handle both string and bytes responses from Redis
-                    stop_signal_str = stop_signal.decode('utf-8') if isinstance(stop_signal, bytes) else str(stop_signal)
-                    if stop_signal_str == message_id:
-                        # Clear the stop signal
-                        await redis_manager.safe_execute("delete", stop_key)
-                        raise asyncio.CancelledError("User requested stop")
-                try:
-                    processor_task = asyncio.create_task(anext(processor_iterator))
-                    try:
-                        while True:
-                            done, _ = await asyncio.wait({processor_task}, timeout=KEEP_ALIVE_INTERVAL)
-                            if processor_task in done:
-                                try:
-                                    data_from_processor = processor_task.result()
-                                    KEEP_ALIVE_COUNT = 0  # Reset keep-alive count
-                                except asyncio.CancelledError:
-                                    print("Processor task was cancelled.")
-                                    stream_completed = True
-                                    break
-                                except StopAsyncIteration:
-                                    stream_completed = True
-                                    break
-                                except Exception as e:
-                                    print("Exception in processor task:", e)
-                                    continue
-
-                                if not data_from_processor:
-                                    continue    
-                                break
-
-                            else:
-                                KEEP_ALIVE_COUNT += 1
-                                if KEEP_ALIVE_COUNT >= MAX_KEEP_ALIVE_COUNT:
-                                    processor_task.cancel()
-                                    try:
-                                        await processor_task
-                                    except Exception:
-                                        pass
-                                    raise RuntimeError(f"No update from processor for {TIMEOUT_PERIOD} seconds. Stream aborted.")
-                                yield f"data: {json.dumps({'type': 'Keep-alive', 'alive-counter': KEEP_ALIVE_COUNT})}\n\n".encode('utf-8')
-                                
-                                # Check for stop signal during keep-alive
-                                stop_signal = await redis_manager.safe_execute("get", stop_key)
-                                if stop_signal:
-                                    # Handle both string and bytes responses from Redis
-                                    stop_signal_str = stop_signal.decode('utf-8') if isinstance(stop_signal, bytes) else str(stop_signal)
-                                    if stop_signal_str == message_id:
-                                        processor_task.cancel()
-                                        await redis_manager.safe_execute("delete", stop_key)
-                                        raise asyncio.CancelledError("User requested stop")
-
-                    # except StopAsyncIteration:
-                    #     stream_completed = True
-                    #     break
-                    except Exception as e:
-                        traceback.print_exc()
-                        raise RuntimeError(f"Error in waiting for data: {str(e)}")
-
-                    data_to_send = data_from_processor.copy()
-
-                    if 'start_stream' in data_to_send:
-                        payload = {"type": "connected", "message_id": message_id}
-                        yield f"data: {json.dumps(payload)}\n\n".encode('utf-8')
-
-                        if search_mode == "agentic-planner" or "agentic-reasoning":
-                            progress_payload = {"type": "progress", "progress_bar": 0.0}
-                            yield f"data: {json.dumps(progress_payload)}\n\n".encode('utf-8')
-                            
-
-                    elif 'type' in data_to_send and data_to_send['type'].endswith('chunk'):
-                        # Store chunk content for partial data recovery
-                        if 'content' in data_to_send:
-                            partial_content_buffer.append({
-                                'content': data_to_send['content'],
-                                'agent_name': data_to_send.get('agent_name', ''),
-                                'type': data_to_send['type'],
-                                'timestamp': time.time()
-                            })
-                        # agent_changed = (token_buffer and (data_to_send.get('agent_name', '') != token_buffer[0].get('agent_name', '') or data_to_send.get('id', '') != token_buffer[0].get('id', '')))
-
-                        if token_buffer and (len(token_buffer) >= 15 or data_to_send.get('agent_name') != token_buffer[0].get('agent_name')):
-                            batched_event_type = token_buffer[0].get('type', 'unknown_chunk_type')
-                            
-                            batched_event = {
-                                "type": batched_event_type, 
-                                "agent_name": token_buffer[0].get('agent_name', ''), 
-                                "message_id": message_id, 
-                                "id": token_buffer[0].get('id','')
-                            }
-
-                            if any('content' in t for t in token_buffer):
-                                batched_event["content"] = "".join([t.get('content','') for t in token_buffer if 'content' in t])
-
-                            if any('title' in t for t in token_buffer):
-                                batched_event["title"] = "".join([t.get('title','') for t in token_buffer if 'title' in t])
-
-                            yield f"data: {json.dumps(batched_event)}\n\n".encode('utf-8')
-                            batched_event_count += 1
-                            token_buffer = []
-
-                        token_buffer.append(data_to_send)
-
-                    else:
-                        if token_buffer:
-                            batched_event_type = token_buffer[0].get('type', 'unknown_chunk_type')
-                            
-                            batched_event = {
-                                "type": batched_event_type, 
-                                "agent_name": token_buffer[0].get('agent_name', ''), 
-                                "message_id": message_id, 
-                                "id": token_buffer[0].get('id','')
-                            }
-
-                            if any('content' in t for t in token_buffer):
-                                batched_event["content"] = "".join([t.get('content','') for t in token_buffer if 'content' in t])
-
-                            if any('title' in t for t in token_buffer):
-                                batched_event["title"] = "".join([t.get('title','') for t in token_buffer if 'title' in t])
-
-                            yield f"data: {json.dumps(batched_event)}\n\n".encode('utf-8')
-                            token_buffer = []
-
-                        if 'type' in data_to_send:
-                            if data_to_send['type'] == 'stock_data':
-                                symbol = data_to_send['data']['realtime']['symbol']
-                                if symbol not in stock_graph:
-                                    stock_graph.add(symbol)
-                                    stock_payload = {"stock_data": data_to_send.get('data'), "message_id": message_id, "id": data_to_send.get('chat_session_id', '')}
-                                    yield f"event: stock_chart\ndata: {json.dumps(stock_payload)}\n\n".encode('utf-8')
-
-                           
-                            elif data_to_send['type'] == 'map_layers':
-                                data_to_send['message_id'] = message_id
-                                yield f"event: map_data\ndata: {json.dumps(data_to_send)}\n\n".encode('utf-8')
-                            
-                            else:
-                                data_to_send['message_id'] = message_id
-                                yield f"data: {json.dumps(data_to_send)}\n\n".encode('utf-8')
-                        elif 'message_logs' in data_to_send:
-                            message_log += data_to_send['message_logs']
-                        elif 'enriched_content' in data_to_send:
-                            current_messages_log.append(data_to_send['enriched_content'])
-
-                        elif 'time' in data_to_send:
-                            time_taken = data_to_send.get('in_seconds', 0)
-                            time_payload = {
-                                "type": "response_time", 
-                                "content": data_to_send['time'],
-                                "message_id": message_id
-                            }
-                            yield f"data: {json.dumps(time_payload)}\n\n".encode('utf-8')
-                        
-                        elif 'state' in data_to_send:
-                            if 'sources' in data_to_send and data_to_send.get('sources'):
-                                sources_payload = {"type": "sources", "content": data_to_send['sources'], "message_id": message_id}
-                                partial_sources.extend(data_to_send['sources'])
-                                yield f"data: {json.dumps(sources_payload)}\n\n".encode('utf-8')
-
-                            if 'related_queries' in data_to_send and data_to_send.get('related_queries'):
-                                related_payload = {"type": "related_queries", "content": data_to_send['related_queries'], "message_id": message_id}
-                                partial_related_queries.extend(data_to_send['related_queries'])
-                                yield f"data: {json.dumps(related_payload)}\n\n".encode('utf-8')
-
-                        elif 'error' in data_to_send:
-                            error_flag = True
-                            error_payload = {"type": "error", "content": data_to_send['error'], "message_id": message_id}
-
-                            # if not ("localhost" in website or "127.0.0.1" in website):
-                            #     await notify_slack_error(user_name or user_id, str(error_payload))
-
-                            yield f"data: {json.dumps(error_payload)}\n\n".encode('utf-8')
-                        
-                        elif 'store_data' in data_to_send:
-                            store_data = data_to_send['store_data']
-                            store_data['retry'] = data_to_send.get('retry', False)
-                            partial_metadata = store_data.get('metadata', None)
-                            bgt.add_task(mongodb.append_data, user_id, session_id, message_id, current_messages_log, local_time, timezone, store_data['retry'], store_data.get('metadata', None), time_taken)
-
-                            yield f"data: {json.dumps({'type': 'metadata', 'data': store_data.get('metadata',None)})}\n\n".encode('utf-8')
-
-                            # if not error_flag:
-                            #     yield f"data: {json.dumps({'type': 'complete', 'message_id': message_id, 'notification': data_to_send.get('notification', True), 'suggestions': data_to_send.get('suggestions', True)})}\n\n".encode('utf-8')
-
-                            if not error_flag:
-                                complete_payload = {
-                                    'type': 'complete', 
-                                    'message_id': message_id, 
-                                    'notification': data_to_send.get('notification', True), 
-                                    'suggestions': data_to_send.get('suggestions', True),
-                                    # 'retry': data_to_send.get('retry', False),
-                                    'retry': store_data['retry']
-                                }
-
-                                if search_mode == "agentic-planner" or "agentic-reasoning":
-                                    progress_payload = {"type": "progress", "progress_bar": 100.0}
-                                    yield f"data: {json.dumps(progress_payload)}\n\n".encode('utf-8')
-                                
-                                if batched_event_count > 300:
-                                    complete_payload['is_elaborate'] = False
-                                else:
-                                    complete_payload['is_elaborate'] = True                             
-                                    
-                                yield f"data: {json.dumps(complete_payload)}\n\n".encode('utf-8')
-
-                            if message_log:
-                                bgt.add_task(mongodb.append_graph_log_to_mongo, session_id, message_id, message_log)
-
-                            break
-
-                        elif 'logs' in data_to_send:
-                            if 'metadata' in data_to_send:
-                                yield f"data: {json.dumps({'type': 'metadata', 'data': data_to_send.get('metadata',None)})}\n\n".encode('utf-8')
-
-                            if not error_flag:
-                                complete_payload = {
-                                    'type': 'complete',
-                                    'message_id': message_id,
-                                    'notification': False,
-                                    'suggestions': False,
-                                    'retry': True
-                                }
-
-                                if search_mode == "agentic-planner" or "agentic-reasoning":
-                                    progress_payload = {"type": "progress", "progress_bar": 100.0}
-                                    yield f"data: {json.dumps(progress_payload)}\n\n".encode('utf-8')
-
-                                if batched_event_count > 300:
-                                    complete_payload['is_elaborate'] = False
-                                else:
-                                    complete_payload['is_elaborate'] = True        
-
-                                # yield f"data: {json.dumps({'type': 'complete', 'message_id': message_id, 'notification': False, 'suggestions': False})}\n\n".encode('utf-8')
-                                yield f"data: {json.dumps(complete_payload)}\n\n".encode('utf-8')
-
-                            bgt.add_task(mongodb.append_graph_log_to_mongo, session_id, message_id, message_log)
-                            break
-                except Exception as e:
-                    traceback.print_exc()
-                    raise RuntimeError(f"Data retrieval error: {str(e)}")
-        except asyncio.CancelledError:
-        
-           
-           print("User stopped query processing or timeout occurred.")
-           # Handle partial data storage for cancelled/stopped streams
-           await handle_partial_data_storage(
-                user_id=user_id,
-                session_id=session_id,
-                message_id=message_id,
-                partial_content_buffer=partial_content_buffer,
-                current_messages_log=current_messages_log,
-                partial_sources=partial_sources,
-                partial_related_queries=partial_related_queries,
-                partial_metadata=partial_metadata,
-                message_log=message_log,
-                local_time=local_time,
-                timezone=timezone,
-                time_taken=time_taken,
-                bgt=bgt,
-                is_cancelled=True
-            )
-           return
-        except Exception as e:
-            traceback.print_exc()
-            error_payload = {"type": "error", "content": f"Critical stream processing error: {str(e)}", "message_id": message_id}
-
-            # if not ("localhost" in website or "127.0.0.1" in website):
-            #     await notify_slack_error(user_name or user_id, str(error_payload))
+                run_tasks = BackgroundTasks()
+                sse_replay.start(message_id, run_query(job, run_tasks), run_tasks)
+        elif await sse_replay.run_owner(message_id) != user_id:
+            raise HTTPException(status_code=409, detail="Message is being generated for another user.")
+        elif restart:
+            # A retry never replaces a run that is still writing to the stream
+            raise HTTPException(status_code=409, detail="The previous response is still being generated; stop it before retrying.")
 
-            yield f"data: {json.dumps(error_payload)}\n\n".encode('utf-8')
+        return StreamingResponse(sse_replay.tail(message_id, last_event_id), media_type="text/event-stream", headers=SSE_HEADERS)
 
     return StreamingResponse(
-        event_generator(),
+        run_query(job, bgt),
         media_type="text/event-stream",
         background=bgt,
-        headers={
-            'Cache-Control': 'no-cache',
-            'Connection': 'keep-alive',
-            'X-Accel-Buffering': 'no'
-        }
+        headers=SSE_HEADERS
     )
 
+@router.get("/query-stream/{message_id}/events")
+async def resume_query_stream(user: apiSecurityFree, message_id: str, request: Request, last_event_id: Optional[str] = None):
+    """
+    Resume the event stream of a /query-stream run after a dropped connection.
+    Events after `Last-Event-ID` (header, or `last_event_id` query parameter) are replayed, then live ones follow.
+    """
+    if not sse_replay.available():
+        raise HTTPException(status_code=503, detail="Stream resumption is not available.")
+
+    if await sse_replay.run_owner(message_id) != user.id.__str__():
+        raise HTTPException(status_code=404, detail="No resumable stream for this message.")
+
+    last_event_id = request.headers.get("last-event-id") or last_event_id
+    return StreamingResponse(sse_replay.tail(message_id, last_event_id), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.get("/agent-queue/metrics")
+async def agent_queue_metrics(user: apiSecurityAdmin):
+    """Depth, running jobs, worker capacity and counters of the agent job queue."""
+    if not sse_replay.available():
+        raise HTTPException(status_code=503, detail="Agent queue metrics need Redis.")
+    return await job_queue.queue_metrics()
+
+@router.get("/llm-clients/metrics")
+async def llm_clients_metrics(user: apiSecurityAdmin):
+    """Shared LLM clients of this worker with per-model calls, concurrency, queueing, latency and hedging."""
+    return llm_client_metrics()
+
 @router.post("/stop-generation")
 async def stop_response_generation(user: apiSecurityFree, session_id: str = Query(..., alias="session_id"), message_id: str = Query(..., alias="message_id")):
     session_log = await mongodb.get_session_log_by_user_and_session_id(user.id.__str__(), session_id)
     if not session_log:
         raise HTTPException(status_code=404, detail="Session not found or access denied.")
-    key = f"stop:{session_id}"
-    await redis_manager.safe_execute("set", key, message_id, 3)
+    # The message must belong to that session; a run that has not stored its message yet is matched by its claim
+    msg_log = await mongodb.get_msglog_by_msgid(message_id)
+    if msg_log:
+        if msg_log.session_id != session_id:
+            raise HTTPException(status_code=404, detail="Message not found or access denied.")
+    elif await sse_replay.run_owner(message_id) != user.id.__str__():
+        raise HTTPException(status_code=404, detail="Message not found or access denied.")
+    await stop_registry.request_stop(message_id)
 
 @router.post("/stock_data")
 async def stock_data_endpoint(user: apiSecurityFree, payload: StockDataRequest):
@@ -533,8 +238,7 @@ async def stock_data_endpoint(user: apiSecurityFree, payload: StockDataRequest):
         # if period.endswith('m'):
         #     period = period+"o"
         ticker_data = TickerSchema(ticker=payload.ticker, exchange_symbol=payload.exchange_symbol)
-        result_json = await asyncio.to_thread(
-            get_stock_data._run,
+        result_json = await get_stock_data._arun(
             ticker_data=[ticker_data],
             period=payload.period,
             strictly = True
@@ -774,7 +478,7 @@ async def predict_stock(user: apiSecurityFree, request: StockPredictionRequest):
 
         rating, reason = await asyncio.to_thread(get_sentiment_rating, company_name, exchange_symbol)
 
-        history_data = await asyncio.to_thread(get_stock_history, ticker, rating, reason)
+        history_data = await get_stock_history(ticker, rating, reason)
 
         adjusted_mean_series, adjusted_ci_df = await asyncio.to_thread(
             sarimax_predict, history_data, exchange_symbol, 5
@@ -787,8 +491,7 @@ async def predict_stock(user: apiSecurityFree, request: StockPredictionRequest):
         period = request.period.lower()
         if period.endswith('m'):
             period = period+"o"
-        result_json = await asyncio.to_thread(
-            get_stock_data._run,
+        result_json = await get_stock_data._arun(
             ticker_data=[ticker_data],
             period=period
         )
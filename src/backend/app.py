@@ -2,7 +2,10 @@ from datetime import datetime, timezone
 from fastapi import FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, HTMLResponse
-from src.backend.utils.api_utils import redis_manager
+from src.backend.utils.api_utils import redis_manager, stop_registry
+from src.ai.tools import http_client
+from src.ai.llm.model import close_llm_pool
+from src.ai.tools.text_cleaning import shutdown_cleaning_pool
 from src.ai.stock_prediction.stock_prediction import StockAnalysisAgent
 from contextlib import asynccontextmanager
 from src.backend.db import mongodb
@@ -18,8 +21,17 @@ stock_agent = StockAnalysisAgent()
 @asynccontextmanager
 async def on_startup(app: FastAPI):
     await mongodb.init_db()
+    await mongodb.init_fmp_db()
+    if mongodb.MONGO_EXPLAIN_ON_STARTUP:
+        await mongodb.check_hot_query_plans()
     await redis_manager.connect()
+    await stop_registry.start()
     yield
+    await stop_registry.close()
+    await http_client.close_session()
+    await close_llm_pool()
+    shutdown_cleaning_pool()
+    mongodb.close_fmp_db()
 
 app = FastAPI(title="Finance Insight Agent API", lifespan=on_startup)
 
@@ -1,3 +1,4 @@
+import os
 from src.backend.core.limiter import AsyncRateLimiter
 from src.backend.utils.api_utils import redis_manager
 from src.backend.db import mongodb
@@ -27,7 +28,18 @@ class GetCurrentUser:
 
         return user
 
+# Operational endpoints (queue and client metrics) are only served to these accounts
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
+
+class GetAdminUser(GetCurrentUser):
+    async def __call__(self, token: Annotated[str, Depends(oauth2_scheme)], req: Request):
+        user = await super().__call__(token, req)
+        if user.email.lower() not in ADMIN_EMAILS:
+            raise HTTPException(status_code=403, detail="Forbidden")
+        return user
+
 apiSecurityStrict = Annotated[mongodb.Users, Depends(GetCurrentUser("strict"))]
 apiSecurityStandard = Annotated[mongodb.Users, Depends(GetCurrentUser("standard"))]
 apiSecurityRelaxed = Annotated[mongodb.Users, Depends(GetCurrentUser("relaxed"))]
-apiSecurityFree = Annotated[mongodb.Users, Depends(GetCurrentUser("free"))]
\ No newline at end of file
+apiSecurityFree = Annotated[mongodb.Users, Depends(GetCurrentUser("free"))]
+apiSecurityAdmin = Annotated[mongodb.Users, Depends(GetAdminUser("free"))]
\ No newline at end of file
@@ -1,4 +1,5 @@
 import asyncio
+import base64
 import os
 import re
 import time
@@ -6,8 +7,9 @@ import uuid
 from datetime import datetime, timezone, timedelta
 from beanie import init_beanie
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import DESCENDING, MongoClient, ReturnDocument
-from typing import Any, List, Optional, Dict, Union
+from pymongo import ASCENDING, DESCENDING, IndexModel, MongoClient, ReturnDocument
+from pymongo.errors import BulkWriteError
+from typing import Any, Iterable, List, Optional, Dict, Union
 from beanie.odm.fields import PydanticObjectId
 from beanie.operators import  And
 from src.backend.utils import JWT
@@ -17,7 +19,8 @@ from typing import Optional
 from src.backend.models.model import *
 from src.backend.models.app_io_schemas import Onboarding
 from src.ai.agents.utils import generate_session_title
-import requests
+from src.ai.tools.http_client import fetch_json
+from src.backend.utils.graph_log import GraphLogBuffer
 
 MONGO_URI = os.getenv("MONGO_URI")
 FMP_API_KEY= os.getenv("FM_API_KEY")
@@ -25,51 +28,154 @@ FMP_API_KEY= os.getenv("FM_API_KEY")
 jwt_handler = None
 
 
+MONGO_EXPLAIN_ON_STARTUP = os.getenv("MONGO_EXPLAIN_ON_STARTUP", "true").lower() == "true"
+
+DOCUMENT_MODELS = [MessageLog, JSONBackup, SessionLog, Users, MessageFeedback, ExternalData, SessionHistory, SessionTurn, MessageOutput, MapData, GraphLog, Personalization, Onboarding,UploadResponse, ChartBotLogs]
+
+# Indexes for the raw Motor FMP cache collections, keyed by collection name
+FMP_CACHE_INDEXES = {
+    "fmp_query_results": [IndexModel([("query", ASCENDING)], name="query", unique=True)],
+    "company_profiles": [IndexModel([("symbol", ASCENDING)], name="symbol", unique=True)],
+    "financial_statements": [IndexModel([("symbol", ASCENDING), ("statement_type", ASCENDING), ("period", ASCENDING)], name="symbol_statement_period", unique=True)],
+    "historical_data": [IndexModel([("ticker", ASCENDING), ("period", ASCENDING)], name="ticker_period", unique=True)],
+    "stock_price_changes": [IndexModel([("symbol", ASCENDING)], name="symbol", unique=True)],
+}
+
+
+async def create_indexes(collection, indexes: List[IndexModel]):
+    # One at a time, so a single index that cannot be built (e.g. duplicates under a unique key)
+    # is reported without keeping the app from starting or the other indexes from being created
+    for index in indexes:
+        try:
+            await collection.create_indexes([index])
+        except Exception as e:
+            print(f"Could not create index {index.document.get('name')} on {collection.name}: {e}")
+
+
 async def init_db():
     global jwt_handler, MONGO_URI
     client = AsyncIOMotorClient(MONGO_URI)
     database = client["insight_agent"]
     jwt_handler = JWT.JWTHandler("f524fdd634e89fd7a3d886564d026666b3ea46db9c77a57d68309f02190020cb", "HS256", "30")
-    await init_beanie(database=database, document_models=[MessageLog, JSONBackup, SessionLog, Users, MessageFeedback, ExternalData, SessionHistory, MessageOutput, MapData, GraphLog, Personalization, Onboarding,UploadResponse, ChartBotLogs])
+    await init_beanie(database=database, document_models=DOCUMENT_MODELS, skip_indexes=True)
+    for model in DOCUMENT_MODELS:
+        await create_indexes(model.get_motor_collection(), getattr(model.Settings, "indexes", []))
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+async def check_hot_query_plans():
+    """Explain the queries on the request path and log any that the planner answers with a collection scan."""
+    placeholder_id = PydanticObjectId()
+    hot_queries = [
+        (MessageLog, {"session_id": ""}, [("created_at", ASCENDING)]),
+        (MessageLog, {"message_id": ""}, None),
+        (MessageLog, {"message_id": "", "stock_chart.chart_session_id": ""}, None),
+        (MessageLog, {"stock_chart.chart_session_id": ""}, None),
+        (MessageFeedback, {"message_id": {"$in": [""]}}, None),
+        (SessionLog, {"user_id": placeholder_id, "visible": True}, [("created_at", DESCENDING), ("_id", DESCENDING)]),
+        (SessionLog, {"session_id": ""}, None),
+        (SessionHistory, {"session_id": ""}, None),
+        (SessionHistory, {"user_id": placeholder_id}, [("created_at", DESCENDING), ("_id", DESCENDING)]),
+        (SessionTurn, {"session_id": "", "message_id": ""}, None),
+        (SessionTurn, {"session_id": "", "created_at": {"$lte": datetime.now(timezone.utc)}}, [("created_at", DESCENDING), ("_id", DESCENDING)]),
+        (GraphLog, {"session_id": "", "message_id": ""}, None),
+        (ChartBotLogs, {"chat_session_id": ""}, [("created_at", ASCENDING)]),
+        (UploadResponse, {"file_id": {"$in": [""]}}, None),
+        (MapData, {"message_id": ""}, None),
+        (Users, {"email": ""}, None),
+    ]
+    fmp_db = get_fmp_db()
+    fmp_queries = [
+        (fmp_db["fmp_query_results"], {"query": ""}),
+        (fmp_db["company_profiles"], {"symbol": ""}),
+        (fmp_db["financial_statements"], {"symbol": "", "statement_type": "", "period": ""}),
+        (fmp_db["historical_data"], {"ticker": "", "period": ""}),
+        (fmp_db["stock_price_changes"], {"symbol": ""}),
+    ]
+    checks = [(model.get_motor_collection(), query, sort) for model, query, sort in hot_queries]
+    checks += [(collection, query, None) for collection, query in fmp_queries]
 
-def _fetch_fmp_data(query: str) -> Union[List[Dict[str, Any]], str]:
+    for collection, query, sort in checks:
+        try:
+            cursor = collection.find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            plan = await cursor.explain()
+            if "COLLSCAN" in _plan_stages(plan.get("queryPlanner", {}).get("winningPlan", {})):
+                print(f"WARNING: collection scan on {collection.name} for {query} (sort={sort}); check its indexes")
+        except Exception as e:
+            print(f"Could not explain query on {collection.name}: {e}")
+
+# Process-wide client for the FMP cache collections, opened and closed with the app lifespan
+fmp_client: Optional[AsyncIOMotorClient] = None
+
+async def init_fmp_db():
+    global fmp_client
+    if fmp_client is None:
+        fmp_client = AsyncIOMotorClient(MONGO_URI)
+    fmp_db = fmp_client["insight_agent_fmp"]
+    for collection_name, indexes in FMP_CACHE_INDEXES.items():
+        await create_indexes(fmp_db[collection_name], indexes)
+
+def close_fmp_db():
+    global fmp_client
+    if fmp_client is not None:
+        fmp_client.close()
+        fmp_client = None
+
+def get_fmp_db():
+    global fmp_client
+    if fmp_client is None:
+        # Lazily created for callers running outside the FastAPI lifespan (scripts, notebooks)
+        fmp_client = AsyncIOMotorClient(MONGO_URI)
+    return fmp_client["insight_agent_fmp"]
+
+async def _fetch_fmp_data(query: str) -> Union[List[Dict[str, Any]], str]:
     try:
         # url = f"https://financialmodelingprep.com/api/v3/search?query={query}&apikey={FMP_API_KEY}"
-        url = f"https://financialmodelingprep.com/stable/search-symbol?query={query}&apikey={FMP_API_KEY}"
-        fmp_response = requests.get(url)
-        fmp_response.raise_for_status()
-        return fmp_response.json()
+        url = "https://financialmodelingprep.com/stable/search-symbol"
+        return await fetch_json(url, params={"query": query, "apikey": FMP_API_KEY})
     except Exception as e:
         return f"Error in getting company information from FMP for {query}: {str(e)}"
     
-def search_company(query: str):
+async def search_company(query: str):
     query_upper = query.upper()
-    client = MongoClient(MONGO_URI)
-    db = client["insight_agent_fmp"]
-    collection = db["fmp_query_results"]
+    collection = get_fmp_db()["fmp_query_results"]
 
     one_month_ago = datetime.now() - timedelta(days=30)
-    cached = collection.find_one({"query": query_upper})
+    cached = await collection.find_one({"query": query_upper})
 
     if cached:
         if cached.get("timestamp") and cached["timestamp"] > one_month_ago:
             return cached
 
-        result = _fetch_fmp_data(query)
+        result = await _fetch_fmp_data(query)
         if isinstance(result, str):
             raise HTTPException(status_code=500, detail=result)
 
-        collection.update_one(
+        cached = await collection.find_one_and_update(
             {"_id": cached["_id"]},
             {"$set": {
                 "results": result,
                 "timestamp": datetime.now()
-            }}
+            }},
+            return_document=ReturnDocument.AFTER
         )
-        cached = collection.find_one({"_id": cached["_id"]})
         return cached
 
-    result = _fetch_fmp_data(query)
+    result = await _fetch_fmp_data(query)
     if isinstance(result, str):
         raise HTTPException(status_code=500, detail=result)
 
@@ -78,20 +184,18 @@ def search_company(query: str):
         "results": result,
         "timestamp": datetime.now()
     }
-    collection.insert_one(new_entry)
+    await collection.insert_one(new_entry)
     return new_entry
 
 
-def get_or_fetch_company_profile(symbol: str):
+async def get_or_fetch_company_profile(symbol: str):
     symbol = symbol.upper()
-    client = MongoClient(MONGO_URI)
-    db = client["insight_agent_fmp"]
-    collection = db["company_profiles"]
+    collection = get_fmp_db()["company_profiles"]
 
     today = datetime.now().date()
 
     # Check for cached data
-    existing = collection.find_one({"symbol": symbol})
+    existing = await collection.find_one({"symbol": symbol})
     if existing:
         last_updated = existing.get("last_updated")
         if last_updated and last_updated.date() == today:
@@ -102,16 +206,14 @@ def get_or_fetch_company_profile(symbol: str):
         else:
             try:
                 # url = f"https://financialmodelingprep.com/api/v3/profile/{symbol}?apikey={FMP_API_KEY}"
-                url = f"https://financialmodelingprep.com/stable/profile?symbol={symbol}&apikey={FMP_API_KEY}"
-                response = requests.get(url)
-                response.raise_for_status()
-                data = response.json()
+                url = "https://financialmodelingprep.com/stable/profile"
+                data = await fetch_json(url, params={"symbol": symbol, "apikey": FMP_API_KEY})
 
                 if not data or not isinstance(data, list):
                     raise HTTPException(status_code=404, detail="Company not found")
                 data = data[0]
 
-                collection.update_one(
+                await collection.update_one(
                     {"_id": existing["_id"]},
                     {"$set": {
                         "data": data,
@@ -132,17 +234,15 @@ def get_or_fetch_company_profile(symbol: str):
     # No existing record, fetch and store
     try:
         # url = f"https://financialmodelingprep.com/api/v3/profile/{symbol}?apikey={FMP_API_KEY}"
-        url = f"https://financialmodelingprep.com/stable/profile?symbol={symbol}&apikey={FMP_API_KEY}"
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        url = "https://financialmodelingprep.com/stable/profile"
+        data = await fetch_json(url, params={"symbol": symbol, "apikey": FMP_API_KEY})
 
         if not data or not isinstance(data, list):
             raise HTTPException(status_code=404, detail="Company not found")
 
         data = data[0]
 
-        collection.insert_one({
+        await collection.insert_one({
             "symbol": symbol,
             "data": data,
             "last_updated": datetime.now()
@@ -157,12 +257,10 @@ def get_or_fetch_company_profile(symbol: str):
         raise HTTPException(status_code=500, detail=f"Error fetching profile: {str(e)}")
 
 
-def fetch_financial_data(symbol: str, statement_type: str, period: str = "annual", limit: int = 5) -> dict:
+async def fetch_financial_data(symbol: str, statement_type: str, period: str = "annual", limit: int = 5) -> dict:
     symbol = symbol.upper()
-    client = MongoClient(MONGO_URI)
-    db = client["insight_agent_fmp"]
-    financial_statements = db["financial_statements"]
-    record = financial_statements.find_one({
+    financial_statements = get_fmp_db()["financial_statements"]
+    record = await financial_statements.find_one({
         "symbol": symbol,
         "statement_type": statement_type,
         "period": period
@@ -184,10 +282,8 @@ def fetch_financial_data(symbol: str, statement_type: str, period: str = "annual
             raise ValueError("Invalid statement_type")
 
         # url = f"https://financialmodelingprep.com/api/v3/{fmp_endpoints[statement_type]}/{symbol}?limit={limit}&apikey={FMP_API_KEY}"
-        url = f"https://financialmodelingprep.com/stable/{fmp_endpoints[statement_type]}?symbol={symbol}&limit={limit}&apikey={FMP_API_KEY}"
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        url = f"https://financialmodelingprep.com/stable/{fmp_endpoints[statement_type]}"
+        data = await fetch_json(url, params={"symbol": symbol, "limit": limit, "apikey": FMP_API_KEY})
 
         if isinstance(data, list) and data:
             now = datetime.now()
@@ -199,20 +295,16 @@ def fetch_financial_data(symbol: str, statement_type: str, period: str = "annual
                 "last_updated": now
             }
             if record:
-                financial_statements.update_one(
+                await financial_statements.update_one(
                     {"_id": record["_id"]},
                     {"$set": update_data}
                 )
             else:
-                financial_statements.insert_one(update_data)
+                await financial_statements.insert_one(update_data)
         else:
             raise Exception("No data found in FMP")
-        
-        record = financial_statements.find_one({
-            "symbol": symbol,
-            "statement_type": statement_type,
-            "period": period
-        })
+
+        return data
 
     return record["data"]
 
@@ -231,7 +323,7 @@ def fetch_financial_data(symbol: str, statement_type: str, period: str = "annual
 #     response.raise_for_status()
 #     return response.json()
 
-def get_historical_data_fmp(ticker: str, period: str):
+async def get_historical_data_fmp(ticker: str, period: str):
     today = datetime.now(timezone.utc)
     
     # FIX: Make sure from_date for YTD is also timezone-aware
@@ -252,10 +344,8 @@ def get_historical_data_fmp(ticker: str, period: str):
     to_date = datetime.now(timezone.utc)
     from_date = to_date - timedelta(days=days)
 
-    url = f"https://financialmodelingprep.com/api/v3/historical-price-full/{ticker}?from={from_date.date()}&to={to_date.date()}&apikey={FMP_API_KEY}"
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json()
+    url = f"https://financialmodelingprep.com/api/v3/historical-price-full/{ticker}"
+    return await fetch_json(url, params={"from": str(from_date.date()), "to": str(to_date.date()), "apikey": FMP_API_KEY})
 
 # def get_or_update_historical(ticker: str, period: str) -> dict:
 #     now = datetime.now()
@@ -296,14 +386,12 @@ def get_historical_data_fmp(ticker: str, period: str):
 #                 raise insert_error
 #         return data
 
-def get_or_update_historical(ticker: str, period: str) -> dict:
+async def get_or_update_historical(ticker: str, period: str) -> dict:
     now = datetime.now(timezone.utc)
     ticker = ticker.upper()
-    client = MongoClient(MONGO_URI)
-    db = client["insight_agent_fmp"]
-    historical_collection = db["historical_data"]
+    historical_collection = get_fmp_db()["historical_data"]
 
-    record = historical_collection.find_one({"ticker": ticker, "period": period})
+    record = await historical_collection.find_one({"ticker": ticker, "period": period})
     if record:
         # FIX: Ensure last_updated is timezone-aware before comparison
         last_updated = record["last_updated"]
@@ -317,15 +405,15 @@ def get_or_update_historical(ticker: str, period: str) -> dict:
         if now.date() == last_updated.date():
             return record["data"]
         else:
-            data = get_historical_data_fmp(ticker, period)
-            updated_record = historical_collection.find_one_and_update(
+            data = await get_historical_data_fmp(ticker, period)
+            updated_record = await historical_collection.find_one_and_update(
                 {"_id": record["_id"]},
                 {"$set": {"data": data, "last_updated": now}},
                 return_document=ReturnDocument.AFTER
             )
             return updated_record["data"]
     else:
-        data = get_historical_data_fmp(ticker, period)
+        data = await get_historical_data_fmp(ticker, period)
         try:
             new_doc = {
                 "ticker": ticker,
@@ -333,9 +421,9 @@ def get_or_update_historical(ticker: str, period: str) -> dict:
                 "data": data,
                 "last_updated": now
             }
-            historical_collection.insert_one(new_doc)
+            await historical_collection.insert_one(new_doc)
         except Exception as insert_error:
-            record = historical_collection.find_one({"ticker": ticker, "period": period})
+            record = await historical_collection.find_one({"ticker": ticker, "period": period})
             if record:
                 return record["data"]
             else:
@@ -344,18 +432,16 @@ def get_or_update_historical(ticker: str, period: str) -> dict:
 
 
 
-def fetch_stock_price_change(symbol: str) -> dict:
+async def fetch_stock_price_change(symbol: str) -> dict:
     """
     Get stock price change for the given symbol.
     Uses cached data if updated today; else updates from FMP.
     """
     symbol = symbol.upper()
 
-    client = MongoClient(MONGO_URI)
-    db = client["insight_agent_fmp"]
-    collection = db["stock_price_changes"]
+    collection = get_fmp_db()["stock_price_changes"]
     # 1. Check for cached data
-    record = collection.find_one({"symbol": symbol})
+    record = await collection.find_one({"symbol": symbol})
     today = datetime.now().date()
 
     if record and "last_updated" in record and record["last_updated"].date() == today:
@@ -367,11 +453,9 @@ def fetch_stock_price_change(symbol: str) -> dict:
 
     # 2. Fetch fresh data from FMP
     # url = f"https://financialmodelingprep.com/api/v3/stock-price-change/{symbol}?apikey={FMP_API_KEY}"
-    url = f"https://financialmodelingprep.com/stable/stock-price-change?symbol={symbol}&apikey={FMP_API_KEY}"
+    url = "https://financialmodelingprep.com/stable/stock-price-change"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        fmp_data = response.json()
+        fmp_data = await fetch_json(url, params={"symbol": symbol, "apikey": FMP_API_KEY})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"FMP request error: {str(e)}")
 
@@ -381,7 +465,7 @@ def fetch_stock_price_change(symbol: str) -> dict:
     new_data = fmp_data[0]
     # 3. Update or insert record in DB
     if record:
-        collection.update_one(
+        await collection.update_one(
             {"_id": record["_id"]},
             {"$set": {
                 "data": new_data,
@@ -389,7 +473,7 @@ def fetch_stock_price_change(symbol: str) -> dict:
             }}
         )
     else:
-        collection.insert_one({
+        await collection.insert_one({
             "symbol": symbol,
             "data": new_data,
             "last_updated": datetime.now()
@@ -443,62 +527,42 @@ async def get_user_by_token(token: str)->returnStatus:
 
 
 async def append_data(user_id, session_id, message_id, messages, local_time, time_zone, retry = False, metadata = None, time_taken = 0):
+    """
+    Write the message's log from `messages`, the full log collected so far, as one atomic upsert.
+    research and stock_chart are rebuilt from `messages` on every call, as the callers pass the
+    whole log each time; the other fields are only set when `messages` carries them.
+    """
     from src.backend.utils.utils import get_unique_response_id, get_date_time
     try:
-        log_entry = await MessageLog.find_one({"session_id": str(session_id), "message_id": str(message_id)})
-        if not log_entry:
-            log_entry = MessageLog(session_id=str(session_id), message_id=str(message_id))
-            log_entry.created_at = local_time
-        else:
-            log_entry.research = []
-            log_entry.stock_chart = []
+        set_fields = {"research": [], "stock_chart": []}
+        charts = {}
 
         if metadata:
-            log_entry.metadata = metadata
+            set_fields["metadata"] = metadata
 
         if time_taken:
-            log_entry.time_taken = time_taken
-
-        # canvas_response_data = {}
+            set_fields["time_taken"] = time_taken
 
         for content in messages:
             if not content:
                 continue
             if 'user_query' in content:
                 content['retry'] = retry
-                log_entry.human_input = content
+                set_fields["human_input"] = content
 
             elif 'type' in content and content['type'] == 'research':
                 if content['agent_name'] != "DB Search Agent":
-                    log_entry.research.append({'agent_name': content['agent_name'], 'title': content['title'], 'id': content.get('id', get_unique_response_id()), 'created_at': content['created_at']})
-            
+                    set_fields["research"].append({'agent_name': content['agent_name'], 'title': content['title'], 'id': content.get('id', get_unique_response_id()), 'created_at': content['created_at']})
+
             elif 'research-manager' in content:
-                log_entry.research.append({'agent_name': content['agent_name'], 'title': content['research-manager'], 'id': content.get('id', get_unique_response_id()), 'created_at': content['created_at']})
-            
+                set_fields["research"].append({'agent_name': content['agent_name'], 'title': content['research-manager'], 'id': content.get('id', get_unique_response_id()), 'created_at': content['created_at']})
+
             elif 'response' in content:
-                log_entry.response = {'agent_name': content['agent_name'], 'content': content['response'], 'id': content.get('id', get_unique_response_id()), 'created_at': content['created_at']}
+                set_fields["response"] = {'agent_name': content['agent_name'], 'content': content['response'], 'id': content.get('id', get_unique_response_id()), 'created_at': content['created_at']}
 
             elif 'type' in content and content['type'] == 'response':
-                log_entry.response = {'agent_name': content['agent_name'], 'content': content['content'], 'id': content.get('id', get_unique_response_id()), 'created_at': content['created_at']}
-
-            # elif 'type' in content and content['type'] == 'canvas_info':
-            #     canvas_response_data["document_id"] = content.get("canvas_document_id")
-            #     canvas_response_data["version_number"] = content.get("canvas_version_number", 1)
-
-            # elif 'type' in content and content['type'] == 'canvas-preview':
-            #     canvas_response_data["preview"] = content.get("content", "")
-
-            # elif 'type' in content and content['type'] == 'stock_data':
-            #     data = content['data']
-            #     symbol = data['realtime']['symbol']
-            #     timestamp = data['realtime']['timestamp']
-
-            #     already_exists = any(
-            #         d['realtime']['symbol'] == symbol and d['realtime']['timestamp'] == timestamp
-            #         for d in log_entry.stock_chart
-            #     )
-            #     if not already_exists:
-            #         log_entry.stock_chart.append(data)
+                set_fields["response"] = {'agent_name': content['agent_name'], 'content': content['content'], 'id': content.get('id', get_unique_response_id()), 'created_at': content['created_at']}
+
             elif content.get('type') == 'stock_data':
                 data = content.get('data') or {}
                 realtime = data.get('realtime') or {}
@@ -507,62 +571,36 @@ async def append_data(user_id, session_id, message_id, messages, local_time, tim
                 symbol = realtime.get('symbol') or data.get('symbol') or None
 
                 # If timestamp missing, generate one (UTC ISO8601)
-                try:
-                    timestamp = realtime.get('timestamp')
-                    if not timestamp:
-                        timestamp = datetime.now(timezone).isoformat()
-                        realtime['timestamp'] = timestamp
-                        data['realtime'] = realtime
-                        # optional debug:
-                        # print(f"[DEBUG] Auto-added timestamp for {symbol}: {timestamp}")
-                except Exception:
-                    timestamp = datetime.now(timezone).isoformat()
+                timestamp = realtime.get('timestamp')
+                if not timestamp:
+                    timestamp = datetime.now(timezone.utc).isoformat()
                     realtime['timestamp'] = timestamp
                     data['realtime'] = realtime
 
-                # Ensure log_entry.stock_chart exists and iterate defensively
-                existing_charts = log_entry.stock_chart if getattr(log_entry, "stock_chart", None) else []
-
-                already_exists = any(
-                    (d.get('realtime', {}).get('symbol') == symbol) and (d.get('realtime', {}).get('timestamp') == timestamp)
-                    for d in existing_charts
-                )
-
-                if not already_exists:
-                    # append the (possibly updated) data dict
-                    if not getattr(log_entry, "stock_chart", None):
-                        log_entry.stock_chart = []
-                    log_entry.stock_chart.append(data)
+                # First chart per (symbol, timestamp) wins, in stream order
+                charts.setdefault((symbol, timestamp), data)
 
             elif 'type' in content and content['type'] == 'map_layers':
-                log_entry.map_layers.append(content['data'])
+                set_fields["map_layers"] = content['data']
 
             elif 'sources' in content:
-                log_entry.sources = content['sources']
-            
+                set_fields["sources"] = content['sources']
+
             elif "error" in content:
-                log_entry.error = content
-        
-        # if canvas_response_data:
-        #     log_entry.canvas_response = {
-        #         "document_id": canvas_response_data.get("document_id", ""),
-        #         "version_number": canvas_response_data.get("version_number", 1),
-        #         "final_content": log_entry.response["content"] if log_entry.response else "",
-        #         "preview": canvas_response_data.get("preview", "")
-        #     }
-
-        if not log_entry.response:
-            log_entry.response = {'agent_name': 'Response Generator Agent', 'content': '**There was an error generating the response**', 'id': get_unique_response_id(), 'created_at': get_date_time(timezone=time_zone).isoformat()}
-
-        # if "document_id" in canvas_response_data:
-        #     log_entry.response = {
-        #         "agent_name":    "",
-        #         "content":       "",
-        #         "id":            get_unique_response_id(),
-        #         "created_at":    get_date_time(timezone=time_zone).isoformat()
-        #     }
-
-        lg = await log_entry.save()
+                set_fields["error"] = content
+
+        set_fields["stock_chart"] = list(charts.values())
+
+        set_on_insert = {"created_at": local_time, "access_level": AccessLevel.PRIVATE.value}
+        if "response" not in set_fields:
+            # Keep a response stored earlier; a new document gets the error placeholder
+            set_on_insert["response"] = {'agent_name': 'Response Generator Agent', 'content': '**There was an error generating the response**', 'id': get_unique_response_id(), 'created_at': get_date_time(timezone=time_zone).isoformat()}
+
+        await MessageLog.get_motor_collection().update_one(
+            {"session_id": str(session_id), "message_id": str(message_id)},
+            {"$set": set_fields, "$setOnInsert": set_on_insert},
+            upsert=True,
+        )
 
         await add_session(session_id, 'New Chat', local_time, time_zone, user_id)
 
@@ -573,25 +611,31 @@ async def append_data(user_id, session_id, message_id, messages, local_time, tim
         print(f"Error in storing message log: {str(e)}")
 
 
-async def append_graph_log_to_mongo(session_id: str, message_id: str, log: str):
-    existing_log = await GraphLog.find_one({"session_id": session_id, "message_id": message_id})
-    if existing_log:
-        existing_log.logs += f"\n{'='*15}\n\n{log}"
-        await existing_log.save()
-    else:
-        new_log = GraphLog(session_id=session_id, message_id=message_id, logs=log)
-        await new_log.insert()
+async def append_graph_log_to_mongo(session_id: str, message_id: str, log: GraphLogBuffer):
+    """Append the buffered entries as compressed chunks; retries of a message add chunks to the same document."""
+    chunks = log.to_chunks()
+    if not chunks:
+        return
+    await GraphLog.get_motor_collection().update_one(
+        {"session_id": session_id, "message_id": message_id},
+        {
+            "$push": {"chunks": {"$each": chunks}},
+            "$inc": {"dropped": log.dropped},
+            "$setOnInsert": {"created_at": datetime.now(timezone.utc)},
+        },
+        upsert=True,
+    )
         
 async def handle_partial_data_storage(
     user_id: str,
     session_id: str,
     message_id: str,
-    partial_content_buffer: list,
+    partial_content_buffer: list,  # (agent_name, content) pairs
     current_messages_log: list,
     partial_sources: list,
     partial_related_queries: list,
     partial_metadata: dict,
-    message_log: str,
+    graph_log: GraphLogBuffer,
     local_time: datetime,
     timezone: str,
     time_taken: float,
@@ -608,11 +652,11 @@ async def handle_partial_data_storage(
         if partial_content_buffer:
             # Group content by agent_name and combine
             agent_contents = {}
-            for chunk in partial_content_buffer:
-                agent_name = chunk.get('agent_name', 'Response Generator Agent')
+            for agent_name, content in partial_content_buffer:
+                agent_name = agent_name or 'Response Generator Agent'
                 if agent_name not in agent_contents:
                     agent_contents[agent_name] = []
-                agent_contents[agent_name].append(chunk['content'])
+                agent_contents[agent_name].append(content)
             
             # Create standard response entry (same format as complete responses)
             for agent_name, content_chunks in agent_contents.items():
@@ -652,8 +696,8 @@ async def handle_partial_data_storage(
         )
         
         # Store graph logs if available
-        if message_log:
-            bgt.add_task(append_graph_log_to_mongo, session_id, message_id, message_log)
+        if graph_log:
+            bgt.add_task(append_graph_log_to_mongo, session_id, message_id, graph_log)
             
         print(f"Partial data stored as normal response for message_id: {message_id}, chunks: {len(partial_content_buffer)}")
         
@@ -682,10 +726,41 @@ async def add_session(session_id, title, local_time, time_zone, user_id=None):
         print(f"Updated session {session_id} title to {title}")
 
 
-async def get_sessions_by_user2(user_id: str, page: int = 1, limit: int = 25) -> Dict[str, Any]:
+def encode_session_cursor(created_at: datetime, object_id: PydanticObjectId) -> str:
+    """Opaque keyset cursor pointing at the last session of a page."""
+    raw = f"{created_at.isoformat()}|{object_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_session_cursor(cursor: str) -> Dict[str, Any]:
+    """Mongo filter for the sessions that come after `cursor` in (created_at, _id) descending order."""
+    try:
+        created_at, object_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        created_at, object_id = datetime.fromisoformat(created_at), PydanticObjectId(object_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": object_id}},
+    ]}
+
+
+async def get_sessions_by_user2(user_id: str, page: int = 1, limit: int = 25, cursor: Optional[str] = None) -> Dict[str, Any]:
+
+    # Keyset pagination on (created_at, _id); `page` is only used by clients that don't send a cursor yet
+    query = {"user_id": PydanticObjectId(user_id), "visible": True}
+    skip_count = 0
+    if cursor:
+        query.update(decode_session_cursor(cursor))
+    else:
+        skip_count = (page - 1) * limit
+
+    # One extra row tells us whether another page exists without a separate count
+    sessions = await SessionLog.find(query).sort([("created_at", DESCENDING), ("_id", DESCENDING)]).skip(skip_count).limit(limit + 1).project(SessionSummary).to_list()
+    has_more = len(sessions) > limit
+    sessions = sessions[:limit]
+    next_cursor = encode_session_cursor(sessions[-1].created_at, sessions[-1].id) if has_more else None
 
-    skip_count = (page - 1) * limit
-    sessions = await SessionLog.find({"user_id": PydanticObjectId(user_id),"visible": True}).sort("-created_at").skip(skip_count).limit(limit).to_list()
     serialized_sessions = []
     
     for session in sessions:
@@ -696,14 +771,10 @@ async def get_sessions_by_user2(user_id: str, page: int = 1, limit: int = 25) ->
             "created_at": session.created_at.isoformat()
         })
     if not serialized_sessions:
-        return {"data": [], "has_more": False}
+        return {"data": [], "has_more": False, "next_cursor": None}
     
-    sorted_sessions = sorted(
-        serialized_sessions, key=lambda x: x["created_at"], reverse=True)
+    sorted_sessions = serialized_sessions
 
-    if bool(sorted_sessions) == False :
-        return None
-    
     if sorted_sessions[0].get("timezone"):
         tz = ZoneInfo(sorted_sessions[0].get("timezone"))
     else:
@@ -749,15 +820,10 @@ async def get_sessions_by_user2(user_id: str, page: int = 1, limit: int = 25) ->
                 "timeline": timeline,
                 "data": sessions
             })
-    total_fetched = skip_count + len(serialized_sessions)
-    total_count = await SessionLog.find(
-        {"user_id": PydanticObjectId(user_id), "visible": True}
-    ).count()
-    has_more = bool(total_count - total_fetched > 0)
-
     return {
         "data":result,
         "has_more": has_more,
+        "next_cursor": next_cursor,
     }
 
 
@@ -780,13 +846,33 @@ async def get_messages_by_session(session_id: str) -> List[dict]:
     try:
         session_messages = {"session_id": session_id, 'message_list': [
         ]}
+
+        # Fetch feedback and uploaded file metadata for the whole session in two $in queries
+        message_ids = [log.message_id for log in logs]
+        file_ids = list({
+            file_id
+            for log in logs if log.human_input and isinstance(log.human_input, dict)
+            for file_id in (log.human_input.get("doc_ids") or [])
+        })
+
+        feedback_by_message = {}
+        if message_ids:
+            for feedback in await MessageFeedback.find({"message_id": {"$in": message_ids}}).to_list():
+                # Keep the first match per message, as find_one did
+                feedback_by_message.setdefault(feedback.message_id, feedback)
+
+        uploads_by_file = {}
+        if file_ids:
+            for upload in await UploadResponse.find({"file_id": {"$in": file_ids}}).to_list():
+                uploads_by_file.setdefault(upload.file_id, upload)
+
         for log in logs:
             research_data = log.research if log.research else None
             if (research_data and isinstance(research_data, list) and len(research_data) > 0 and 'created_at' in research_data[0]):
                 research_data = sorted(research_data, key=lambda x: x['created_at'])
 
             
-            feedback = await MessageFeedback.find_one({"message_id": log.message_id})
+            feedback = feedback_by_message.get(log.message_id)
             feedback_data = {
                 "liked": "yes" if feedback and feedback.liked is True else "no" if feedback and feedback.liked is False else None,
                 "feedback_tag": feedback.feedback_tag if feedback else [],
@@ -798,7 +884,7 @@ async def get_messages_by_session(session_id: str) -> List[dict]:
                 doc_ids = log.human_input.get("doc_ids", [])
                 if doc_ids:
                     for file_id in doc_ids:
-                        doc = await UploadResponse.find_one({"file_id": file_id})
+                        doc = uploads_by_file.get(file_id)
                         if doc:
                             file_name = doc.original_filename
                             if file_name and "." in file_name:
@@ -951,93 +1037,152 @@ async def multi_fetch_by_filename(filenames: list):
             print(f"MongoDB batch fetch error: {str(e)}")
             return None
 
-async def update_session_history_in_db(session_id: str, user_id: str, message_id: str, user_query: str, assistant_response: str, doc_ids: List[str], local_time: Optional[datetime], time_zone: Optional[str]):
-    from src.backend.utils.utils import get_date_time
+async def _migrate_legacy_history(session_id: str, user_object_id: PydanticObjectId, before: datetime):
+    """Move a session's legacy SessionHistory.history array into SessionTurn documents, once."""
+    legacy = await SessionHistory.get_motor_collection().find_one(
+        {"session_id": session_id, "user_id": user_object_id, "history.0": {"$exists": True}},
+        {"history": 1},
+    )
+    if not legacy:
+        return
+
+    history = legacy["history"]
+    turns = []
+    for idx, entry in enumerate(history):
+        for message_id, (user_query, assistant_response, doc_ids) in entry.items():
+            # Legacy order is array order; space the turns out just before the turn being written
+            created_at = before - timedelta(milliseconds=len(history) - idx)
+            turns.append({
+                "session_id": session_id,
+                "user_id": user_object_id,
+                "message_id": message_id,
+                "user_query": user_query,
+                "response": assistant_response,
+                "doc_ids": doc_ids or [],
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
 
-    user_object_id = PydanticObjectId(user_id)
-    session = await SessionHistory.find_one(SessionHistory.session_id == session_id, SessionHistory.user_id == user_object_id)
+    if turns:
+        try:
+            await SessionTurn.get_motor_collection().insert_many(turns, ordered=False)
+        except BulkWriteError as e:
+            # A concurrent write already migrated some of them
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+    await SessionHistory.get_motor_collection().update_one({"_id": legacy["_id"]}, {"$unset": {"history": ""}})
 
-    message_entry = {message_id: (user_query, assistant_response, doc_ids)}
 
-    if not session:
-        session = SessionHistory(
-            user_id=user_object_id,
-            session_id=session_id,
-            title="New Chat",
-            history=[message_entry],
-            created_at=local_time,
-            updated_at=local_time,
-        )
+async def update_session_history_in_db(session_id: str, user_id: str, message_id: str, user_query: str, assistant_response: str, doc_ids: List[str], local_time: Optional[datetime], time_zone: Optional[str]):
+    user_object_id = PydanticObjectId(user_id)
+    now = datetime.now(timezone.utc)
 
-        title = await generate_title(session.history)
-        session.title = title
-        await session.insert()
+    # Session header: upsert and read back the previous title in one round trip; history is never loaded
+    previous = await SessionHistory.get_motor_collection().find_one_and_update(
+        {"session_id": session_id, "user_id": user_object_id},
+        {
+            "$set": {"updated_at": local_time},
+            "$setOnInsert": {"title": "New Chat", "created_at": local_time},
+        },
+        projection={"title": 1, "history": {"$slice": 1}},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE,
+    )
+
+    if previous and previous.get("history"):
+        await _migrate_legacy_history(session_id, user_object_id, now)
+
+    # A retried message keeps its created_at, and with it its place in the session
+    await SessionTurn.get_motor_collection().update_one(
+        {"session_id": session_id, "message_id": message_id},
+        {
+            "$set": {"user_query": user_query, "response": assistant_response, "doc_ids": doc_ids or [], "updated_at": now},
+            "$setOnInsert": {"user_id": user_object_id, "created_at": now},
+        },
+        upsert=True,
+    )
+
+    if not previous:
+        title = await generate_title([{message_id: (user_query, assistant_response, doc_ids)}])
+        await SessionHistory.get_motor_collection().update_one({"session_id": session_id, "user_id": user_object_id}, {"$set": {"title": title}})
         await add_session(session_id, title, local_time, time_zone, user_id)
 
-    else:
-        message_found = False
-        for entry in reversed(session.history):
-            if message_id in entry:
-                entry[message_id] = (user_query, assistant_response, doc_ids)
-                message_found = True
-                break
-
-        if not message_found:
-            session.history.append(message_entry)
+    elif not previous.get("title") or previous.get("title") == "New Chat":
+        title = await generate_title([{message_id: (user_query, assistant_response, doc_ids)}])
+        if title and title != "New Chat":
+            await SessionHistory.get_motor_collection().update_one({"session_id": session_id, "user_id": user_object_id}, {"$set": {"title": title}})
 
-        if not session.title or session.title == "New Chat":
-            title = await generate_title(session.history)
-            if title and title != "New Chat":
-                session.title = title
+            session_log = await SessionLog.find_one(SessionLog.session_id == session_id, SessionLog.user_id == user_object_id)
+            if session_log:
+                session_log.title = title
+                await session_log.save()
 
-                session_log = await SessionLog.find_one(SessionLog.session_id == session_id, SessionLog.user_id == user_object_id)
-                if session_log:
-                    session_log.title = title
-                    await session_log.save()
-        session.updated_at = local_time
-        await session.save()
 
-
-async def get_session_history_from_db(session_id: str, prev_message_id: str, limit: int = None) -> dict:
-    session = await SessionHistory.find_one(SessionHistory.session_id == session_id)
+def _collect_turns(turns: Iterable[tuple]) -> dict:
+    """Build the prompt history from (user_query, assistant_response, doc_ids) turns, newest first."""
     all_messages = []
     all_doc_ids = []
-    
-    if session:
-        collecting = False
-        for entry in reversed(session.history):
-            if prev_message_id in entry:
-                collecting = True
-            
-            if collecting:
-                message_data = list(entry.values())[0]
-                # message_data is a tuple: (user_query, assistant_response, doc_ids)
-                user_query, assistant_response, doc_ids = message_data
-                
-                # Add user query and assistant response to messages
-                all_messages.append([user_query, assistant_response])
-                
-                # Add doc_ids to the list (extend to flatten the list if doc_ids is a list)
-                if doc_ids:
-                    if isinstance(doc_ids, list):
-                        all_doc_ids.extend(doc_ids)
-                    else:
-                        all_doc_ids.extend([doc_ids])
+    for user_query, assistant_response, doc_ids in turns:
+        all_messages.append([user_query, assistant_response])
+        if doc_ids:
+            if isinstance(doc_ids, list):
+                all_doc_ids.extend(doc_ids)
+            else:
+                all_doc_ids.extend([doc_ids])
 
-                if limit and len(all_messages) >= limit:
-                    break
+    # Reverse to get chronological order
+    all_messages.reverse()
+    all_doc_ids.reverse()
+    return {'messages': all_messages, 'doc_ids': all_doc_ids}
 
-        # Reverse to get chronological order
-        all_messages.reverse()
 
-        all_doc_ids.reverse()
-        
-        return {
-            'messages': all_messages,
-            'doc_ids': all_doc_ids
-        }
-    
-    return {'messages': [], 'doc_ids': []}
+async def get_session_history_from_db(session_id: str, prev_message_id: str, limit: int = None) -> dict:
+    """The turns of a session up to and including `prev_message_id`, at most `limit` of them."""
+    if not prev_message_id:
+        return {'messages': [], 'doc_ids': []}
+
+    # Anchor on the message, then walk the (session_id, created_at) index backwards from it
+    turns_pipeline = [
+        {"$match": {"session_id": session_id, "$expr": {"$lte": ["$created_at", "$$anchor"]}}},
+        {"$sort": {"created_at": -1, "_id": -1}},
+    ]
+    if limit:
+        turns_pipeline.append({"$limit": limit})
+    turns_pipeline.append({"$project": {"_id": 0, "user_query": 1, "response": 1, "doc_ids": 1}})
+
+    pipeline = [
+        {"$match": {"session_id": session_id, "message_id": prev_message_id}},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": SessionTurn.get_motor_collection().name,
+            "let": {"anchor": "$created_at"},
+            "pipeline": turns_pipeline,
+            "as": "turns",
+        }},
+        {"$project": {"_id": 0, "turns": 1}},
+    ]
+    result = await SessionTurn.get_motor_collection().aggregate(pipeline).to_list(length=1)
+    if result:
+        return _collect_turns((t["user_query"], t["response"], t.get("doc_ids")) for t in result[0]["turns"])
+
+    # Sessions not written to since turns moved out of SessionHistory
+    legacy = await SessionHistory.get_motor_collection().find_one(
+        {"session_id": session_id, "history.0": {"$exists": True}},
+        {"history": 1},
+    )
+    if not legacy:
+        return {'messages': [], 'doc_ids': []}
+
+    turns = []
+    collecting = False
+    for entry in reversed(legacy["history"]):
+        if prev_message_id in entry:
+            collecting = True
+        if collecting:
+            turns.append(list(entry.values())[0])
+            if limit and len(turns) >= limit:
+                break
+    return _collect_turns(turns)
 
 
 async def insert_map_data(session_id: str, message_id: str, data: Dict[str, Any]):
@@ -1123,61 +1268,69 @@ async def get_sessions_by_user_and_keyword_pagination(
     user_id: str,
     keyword: str,
     page: int,
-    limit: int
+    limit: int,
+    cursor: Optional[str] = None
 ) -> Dict[str, Any]:
 
-    regex = re.compile(re.escape(keyword), re.IGNORECASE)
-
-    # Step 1: Find all matching sessions from history
-    sessions = await SessionHistory.find(
-        {
-            "user_id": PydanticObjectId(user_id),
-            "title": {"$regex": regex},
-        }
-    ).to_list()
-    
-    if not sessions:
-        return {"data": [], "has_more": False}
-
-    # Step 2: Get all session_ids from history
-    session_ids = [s.session_id for s in sessions]
-
-    # Step 3: Find all visible session logs for these IDs (only return session_id field)
-    logs = await SessionLog.find(
-        {
-            "user_id": PydanticObjectId(user_id),
-            "session_id": {"$in": session_ids},
-            "visible": True
-        }
-    ).to_list()
-
-    # Step 4: Extract valid session_ids from logs
-    valid_session_ids = {log.session_id for log in logs}
-
-    # Step 5: Filter sessions in one pass
-    valid_sessions = [s for s in sessions if s.session_id in valid_session_ids]
+    user_object_id = PydanticObjectId(user_id)
+    match = {
+        "user_id": user_object_id,
+        "title": {"$regex": re.escape(keyword), "$options": "i"},
+    }
+    skip_count = 0
+    if cursor:
+        match.update(decode_session_cursor(cursor))
+    else:
+        skip_count = (page - 1) * limit
+
+    # Single server-side pass: match and sort on the (user_id, created_at, _id) index, drop the
+    # history arrays straight away, keep only sessions still visible in the sidebar, and let
+    # $facet return the page plus a probe row for has_more.
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"created_at": -1, "_id": -1}},
+        {"$project": {"session_id": 1, "user_id": 1, "title": 1, "created_at": 1, "timezone": 1}},
+        {"$lookup": {
+            # Beanie reads Settings.name, not Settings.collection, so ask the bound collection
+            "from": SessionLog.get_motor_collection().name,
+            "let": {"session_id": "$session_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$and": [
+                    {"$eq": ["$session_id", "$$session_id"]},
+                    {"$eq": ["$user_id", user_object_id]},
+                    {"$eq": ["$visible", True]},
+                ]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 1}},
+            ],
+            "as": "visible_log",
+        }},
+        {"$match": {"visible_log": {"$ne": []}}},
+        {"$facet": {
+            "data": [{"$skip": skip_count}, {"$limit": limit}, {"$project": {"visible_log": 0}}],
+            "next": [{"$skip": skip_count + limit}, {"$limit": 1}, {"$project": {"_id": 1}}],
+        }},
+    ]
+    result = await SessionHistory.get_motor_collection().aggregate(pipeline).to_list(length=1)
+    facet = result[0] if result else {"data": [], "next": []}
 
-    if not valid_sessions:
-        return {"data": [], "has_more": False}
+    if not facet["data"]:
+        return {"data": [], "has_more": False, "next_cursor": None}
 
-    # Step 6: Serialize
-    serialized = [
+    # Serialize (already newest first)
+    paginated_data = [
         {
-            "id": str(s.session_id),
-            "user_id": str(s.user_id),
-            "title": s.title.title(),
-            "created_at": s.created_at.isoformat(),
-            "timezone": getattr(s, "timezone", None)
+            "id": str(s["session_id"]),
+            "user_id": str(s["user_id"]),
+            "title": (s.get("title") or "New Chat").title(),
+            "created_at": s["created_at"].isoformat(),
+            "timezone": s.get("timezone")
         }
-        for s in valid_sessions
+        for s in facet["data"]
     ]
-
-    serialized.sort(key=lambda x: x["created_at"], reverse=True)
-
-    total = len(serialized)
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_data = serialized[start:end]
+    has_more = bool(facet["next"])
+    last = facet["data"][-1]
+    next_cursor = encode_session_cursor(last["created_at"], last["_id"]) if has_more else None
 
     tz = ZoneInfo(paginated_data[0].get("timezone") or "UTC") if paginated_data else ZoneInfo("UTC")
     current_date = datetime.now(tz).date()
@@ -1213,7 +1366,8 @@ async def get_sessions_by_user_and_keyword_pagination(
 
     return {
         "data": grouped_data,
-        "has_more": end < total
+        "has_more": has_more,
+        "next_cursor": next_cursor
     }
 
 async def rename_session_title(user_id:str, session_id: str, new_title:str):
@@ -1247,6 +1401,7 @@ async def delete_session(user_id: PydanticObjectId, session_id: str):
             MapData.find(MapData.session_id == session_id).delete(),
             SessionLog.find(SessionLog.session_id == session_id).delete(),
             SessionHistory.find(SessionHistory.session_id == session_id).delete(),
+            SessionTurn.find(SessionTurn.session_id == session_id).delete(),
             ##Get message_ids at the same time (parallel)
             MessageOutput.find(MessageOutput.session_id == session_id).to_list(),
         ]
@@ -1254,8 +1409,8 @@ async def delete_session(user_id: PydanticObjectId, session_id: str):
         results = await asyncio.gather(*deletion_and_fetch_tasks, return_exceptions=True)
         print("Operation stop")
         # Check if session existed (if all deletions returned 0, session didn't exist)
-        deletion_results = results[:5]  # First 7 are deletions
-        message_outputs = results[5]    # Last one is message_outputs
+        deletion_results = results[:6]  # First 6 are deletions
+        message_outputs = results[6]    # Last one is message_outputs
         
         total_deleted = sum(
             getattr(result, 'deleted_count', 0) 
@@ -1300,7 +1455,7 @@ async def delete_session(user_id: PydanticObjectId, session_id: str):
         
         ##Build response (streamlined)
         deleted_items = []
-        deletion_names = ['message_outputs', 'message_logs', 'map_data', 'session_log', 'session_history']
+        deletion_names = ['message_outputs', 'message_logs', 'map_data', 'session_log', 'session_history', 'session_turns']
         
         for i, result in enumerate(deletion_results):
             if not isinstance(result, Exception) and hasattr(result, 'deleted_count') and result.deleted_count > 0:
@@ -1487,28 +1642,28 @@ async def store_user_query(user_id: str, session_id: str, message_id: str, user_
     from src.backend.utils.utils import get_unique_response_id
     local_time = datetime.now(ZoneInfo(timezone))
 
-    log_entry = await MessageLog.find_one({
-        "session_id": str(session_id),
-        "message_id": str(message_id)
-    })
-    if not log_entry:
-        human_input_data = {
-            "user_query": user_query,
-            "file_id" : doc_ids or [],
-        }
-
-        dummy_response = {'agent_name': "Unknown Agent", 'content': "*There was an error generating the response!*", 'id': get_unique_response_id()}
-
-        log_entry = MessageLog(
-            session_id=str(session_id),
-            message_id=str(message_id),
-            created_at=local_time,
-            human_input=human_input_data,
-            response=dummy_response,
-        )
-        await log_entry.insert()
+    human_input_data = {
+        "user_query": user_query,
+        "file_id" : doc_ids or [],
+    }
 
-        print("log_entry_created", log_entry)
+    dummy_response = {'agent_name': "Unknown Agent", 'content': "*There was an error generating the response!*", 'id': get_unique_response_id()}
+
+    # Only fills in a message append_data hasn't created yet; no read first
+    result = await MessageLog.get_motor_collection().update_one(
+        {"session_id": str(session_id), "message_id": str(message_id)},
+        {"$setOnInsert": {
+            "created_at": local_time,
+            "human_input": human_input_data,
+            "response": dummy_response,
+            "research": [],
+            "stock_chart": [],
+            "access_level": AccessLevel.PRIVATE.value,
+        }},
+        upsert=True,
+    )
+    if result.upserted_id:
+        print("log_entry_created", message_id)
     # else:
     #     log_entry.human_input = human_input_data
     #     log_entry.created_at = local_time  # optional update
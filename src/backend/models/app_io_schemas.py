@@ -2,6 +2,7 @@ from datetime import datetime, timezone
 from enum import Enum
 from beanie import Document
 from beanie.odm.fields import PydanticObjectId
+from pymongo import ASCENDING, IndexModel
 from pydantic import BaseModel, EmailStr, Field, field_validator
 from typing import Optional, Dict, Any, List, Generator, Annotated, Literal
 from fastapi import Form
@@ -143,6 +144,9 @@ class Onboarding(Document):
 
     class Settings:
         collection = "onboarding"
+        indexes = [
+            IndexModel([("user_id", ASCENDING)], name="user_id"),
+        ]
 
     class Config:
         arbitrary_types_allowed = True
@@ -4,6 +4,7 @@ from typing import Any, Dict, List, Literal, Optional
 import uuid
 
 from beanie import Document, PydanticObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from pydantic import BaseModel, EmailStr, Field, field_validator
 from src.ai.ai_schemas.validation_utils import validate_password_strength
 
@@ -54,6 +55,9 @@ class Users(Document):
 
     class Settings:
         collection = "users"
+        indexes = [
+            IndexModel([("email", ASCENDING)], name="email", unique=True),
+        ]
 
     class Config:
         arbitrary_types_allowed = True
@@ -107,6 +111,9 @@ class Personalization(Document):
 
     class Settings:
         collection = "personalization"
+        indexes = [
+            IndexModel([("user_id", ASCENDING)], name="user_id", unique=True),
+        ]
 
     class Config:
         arbitrary_types_allowed = True
@@ -153,6 +160,11 @@ class MessageLog(Document):
 
     class Settings:
         collection = "log_entries"
+        indexes = [
+            IndexModel([("message_id", ASCENDING)], name="message_id", unique=True),
+            IndexModel([("session_id", ASCENDING), ("created_at", ASCENDING)], name="session_created_at"),
+            IndexModel([("stock_chart.chart_session_id", ASCENDING)], name="chart_session_id", sparse=True),
+        ]
 
 
 class MessageFeedback(Document):
@@ -164,6 +176,9 @@ class MessageFeedback(Document):
 
     class Settings:
         collection = "message_feedback"
+        indexes = [
+            IndexModel([("message_id", ASCENDING), ("response_id", ASCENDING)], name="message_response", unique=True),
+        ]
 
 class SessionLog(Document):
     user_id: PydanticObjectId
@@ -177,6 +192,11 @@ class SessionLog(Document):
 
     class Settings:
         collection = "sessions"
+        indexes = [
+            # Sidebar listing: newest visible sessions of a user, keyset-paginated on (created_at, _id)
+            IndexModel([("user_id", ASCENDING), ("visible", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_visible_created_at"),
+            IndexModel([("session_id", ASCENDING), ("user_id", ASCENDING)], name="session_user"),
+        ]
 
     def to_dict(self) -> dict:
         """Convert model instance to dictionary with proper serialization"""
@@ -190,12 +210,17 @@ class SessionHistory(Document):
     user_id: PydanticObjectId
     session_id: str = Field(...)
     title: Optional[str] = "New Chat"
-    history: List[dict] = []
+    history: List[dict] = []  # legacy turns, moved to SessionTurn on the next write to the session
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     class Settings:
         collection = "session_histories"
+        indexes = [
+            # Title search: a user's sessions newest first, keyset-paginated on (created_at, _id)
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_created_at"),
+            IndexModel([("session_id", ASCENDING)], name="session_id"),
+        ]
 
     def to_dict(self) -> dict:
         data = self.model_dump()
@@ -204,6 +229,36 @@ class SessionHistory(Document):
         return data
 
 
+class SessionTurn(Document):
+    """One user query and its response in a session, stored on its own instead of in SessionHistory.history."""
+    session_id: str
+    user_id: PydanticObjectId
+    message_id: str
+    user_query: str
+    response: str
+    doc_ids: List[str] = []
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "session_turns"
+        indexes = [
+            # Last N turns up to a message: one backwards range scan
+            IndexModel([("session_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="session_created_at"),
+            IndexModel([("session_id", ASCENDING), ("message_id", ASCENDING)], name="session_message", unique=True),
+        ]
+
+
+class SessionSummary(BaseModel):
+    """Projection used for session listings, so large fields such as `history` are never loaded."""
+    id: PydanticObjectId = Field(alias="_id")
+    session_id: str
+    user_id: PydanticObjectId
+    title: Optional[str] = "New Chat"
+    created_at: datetime
+    timezone: Optional[str] = None
+
+
 class MessageOutput(Document):
     user_id: PydanticObjectId
     session_id: str = Field(...)
@@ -215,6 +270,9 @@ class MessageOutput(Document):
 
     class Settings:
         collection = "message_outputs"
+        indexes = [
+            IndexModel([("session_id", ASCENDING)], name="session_id"),
+        ]
 
     def to_dict(self) -> dict:
         data = self.model_dump()
@@ -257,6 +315,10 @@ class ChartBotLogs(Document):
 
     class Settings:
         collection = "chart_bot_logs"
+        indexes = [
+            IndexModel([("chat_session_id", ASCENDING), ("created_at", ASCENDING)], name="chat_session_created_at"),
+            IndexModel([("user_id", ASCENDING), ("chat_session_id", ASCENDING), ("created_at", ASCENDING)], name="user_chat_session_created_at"),
+        ]
 
 
 class SemiStaticData(Document):
@@ -268,16 +330,24 @@ class ExternalData(Document):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     class Settings:
         collection = "external_data"
+        indexes = [
+            IndexModel([("filename", ASCENDING)], name="filename"),
+        ]
 
 
 class GraphLog(Document):
     session_id: str
     message_id: str
-    logs: str
+    logs: Optional[str] = None  # plain-text logs written before chunked logging
+    chunks: List[Dict[str, Any]] = Field(default_factory=list)  # see src.backend.utils.graph_log
+    dropped: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     class Settings:
         name = "graph_logs"
+        indexes = [
+            IndexModel([("session_id", ASCENDING), ("message_id", ASCENDING)], name="session_message"),
+        ]
 
 
 class MapData(Document):
@@ -288,6 +358,10 @@ class MapData(Document):
 
     class Settings:
         collection = "map_data"
+        indexes = [
+            IndexModel([("message_id", ASCENDING)], name="message_id"),
+            IndexModel([("session_id", ASCENDING)], name="session_id"),
+        ]
 
 
 class UploadResponse(Document):
@@ -299,6 +373,10 @@ class UploadResponse(Document):
 
     class Settings:
         collection = "user_uploads"
+        indexes = [
+            IndexModel([("file_id", ASCENDING)], name="file_id", unique=True),
+            IndexModel([("user_id", ASCENDING)], name="user_id"),
+        ]
 
 class CompanyProfile(Document):
     symbol: str = Field(...)
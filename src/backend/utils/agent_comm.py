@@ -1,6 +1,7 @@
 from typing import Dict, Any, List, AsyncGenerator, Optional
 from src.ai.insight_graph import InsightAgentGraph
 from src.backend.utils.utils import get_date_time, format_langgraph_message, PRICING, get_user_metadata
+from src.backend.utils.graph_log import graph_log_entry
 import traceback
 from src.ai.agents.utils import get_related_queries_util
 # from src.ai.tools.finance_data_tools import get_currency_exchange_rates
@@ -28,20 +29,19 @@ async def process_agent_input_functional(user_id: str, session_id: str, user_que
     await mongodb.store_user_query(user_id, session_id, message_id, user_query, timezone, doc_ids)
 
     def store_current_message(msg_type: str, content: dict):
+        # Decide before copying: most streamed items are chunks that are never stored
+        if 'response' not in content and 'research-manager' not in content:
+            if msg_type == 'agent_updates' and 'type' not in content:
+                return
+
+            if 'type' in content and content['type'].endswith('chunk'):
+                return
+
         enriched_content = content.copy()
 
         if 'created_at' not in enriched_content:
             enriched_content['created_at'] = local_time.isoformat()
 
-        if 'response' in enriched_content or 'research-manager' in enriched_content:
-            return enriched_content
-
-        if msg_type == 'agent_updates' and 'type' not in enriched_content:
-            return
-
-        if 'type' in enriched_content and enriched_content['type'].endswith('chunk'):
-            return
-
         return enriched_content
 
 
@@ -96,9 +96,11 @@ async def process_agent_input_functional(user_id: str, session_id: str, user_que
         "prev_doc_ids": prev_session_data.get('doc_ids', []),
     }
     yield {"enriched_content": store_current_message("human_input", input_data)}
-    message_logs = f"HUMAN INPUT\n{str(input_data)}\n\n"
-    yield {"message_logs": message_logs}
+    log_entry = graph_log_entry("human_input", input_data)
+    if log_entry:
+        yield log_entry
     insight_agent_runnable = agent_graph_instance.get_graph()
+    agent_graph_instance.acquire_thread(message_id)
 
     TOOL_CALLING_AGENTS = {"DB Search Agent", "Web Search Agent", "Finance Data Agent", "Coding Agent", "Social Media Scrape Agent"}
     is_completed = False
@@ -106,8 +108,9 @@ async def process_agent_input_functional(user_id: str, session_id: str, user_que
 
         async for agent_id, stream_mode, update in insight_agent_runnable.astream(input_data, config, stream_mode=["updates", "messages", "custom"], subgraphs=True):
             if stream_mode == 'updates':
-                message_logs = f"AGENT UPDATE\n{str((agent_id, stream_mode, update))}\n\n"
-                yield {"message_logs": message_logs}
+                log_entry = graph_log_entry("update", update, agent_id)
+                if log_entry:
+                    yield log_entry
 
             if stream_mode == 'custom':
                 if 'source_update' in update:
@@ -124,8 +127,9 @@ async def process_agent_input_functional(user_id: str, session_id: str, user_que
 
             msg_to_yield = await format_langgraph_message((agent_id, stream_mode, update))
             if msg_to_yield:
-                message_logs = f"FORMATTED MESSAGE\n{str(msg_to_yield)}\n\n"
-                yield {"message_logs": message_logs}
+                log_entry = graph_log_entry("message", msg_to_yield, agent_id)
+                if log_entry:
+                    yield log_entry
 
             if isinstance(msg_to_yield, dict):
                 if 'token_usage' in msg_to_yield:
@@ -133,7 +137,9 @@ async def process_agent_input_functional(user_id: str, session_id: str, user_que
                 else:
                     yield msg_to_yield
 
-                    yield {"enriched_content": store_current_message("agent_updates", msg_to_yield)}
+                    enriched_content = store_current_message("agent_updates", msg_to_yield)
+                    if enriched_content:
+                        yield {"enriched_content": enriched_content}
                     if 'sources' in msg_to_yield:
                         sources_for_message.extend(msg_to_yield['sources'])
 
@@ -150,7 +156,9 @@ async def process_agent_input_functional(user_id: str, session_id: str, user_que
                     else:
                         yield m_item
 
-                        yield {"enriched_content": store_current_message("agent_updates", m_item)}
+                        enriched_content = store_current_message("agent_updates", m_item)
+                        if enriched_content:
+                            yield {"enriched_content": enriched_content}
                         if 'sources' in m_item:
                             sources_for_message.extend(m_item['sources'])
 
@@ -165,7 +173,7 @@ async def process_agent_input_functional(user_id: str, session_id: str, user_que
                 time_event["time"] = f"{minutes} min {remaining_seconds} sec"
             yield time_event
 
-            final_state = insight_agent_runnable.get_state(config=config).values
+            final_state = (await insight_agent_runnable.aget_state(config=config)).values
             final_response_state = final_state.get('final_response')
 
             yield {"enriched_content": store_current_message('agent_updates', {'response': collect_response, 'agent_name': 'Response Generator Agent'})}
@@ -188,7 +196,7 @@ async def process_agent_input_functional(user_id: str, session_id: str, user_que
             final_data_event = {'state': "completed_from_graph"}
 
             if final_state.get('is_relevant_query', False):
-                related_queries = await asyncio.to_thread(get_related_queries_util, await mongodb.get_session_history_from_db(session_id, message_id, limit = 3))
+                related_queries = await get_related_queries_util(await mongodb.get_session_history_from_db(session_id, message_id, limit = 3))
 
                 if related_queries:
                     final_data_event['related_queries'] = related_queries
@@ -204,8 +212,9 @@ async def process_agent_input_functional(user_id: str, session_id: str, user_que
     except Exception as e:
         error_msg = f"Error in agent processing: {traceback.format_exc()}"
         print(error_msg)
-        message_logs = f"ERROR MESSAGE\n{str(error_msg)}\n\n"
-        yield {"message_logs": message_logs}
+        log_entry = graph_log_entry("error", error_msg)
+        if log_entry:
+            yield log_entry
         error_event = {'error': error_msg}
         yield error_event
 
@@ -216,4 +225,4 @@ async def process_agent_input_functional(user_id: str, session_id: str, user_que
         yield {"store_data": {}, 'notification': False, 'suggestions': False, 'retry': True}
 
     finally:
-        pass
\ No newline at end of file
+        agent_graph_instance.release_thread(message_id)
\ No newline at end of file
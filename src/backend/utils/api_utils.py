@@ -12,6 +12,7 @@ from redis.exceptions import ConnectionError, TimeoutError, RedisError
 from urllib.parse import urlparse
 import logging
 import asyncio
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
 load_dotenv(dotenv_path=".env", override=True)
@@ -26,6 +27,7 @@ class RedisManager:
     def __init__(self, **kwargs):
         self.redis_config = kwargs
         self.client = None
+        self.loop = None
 
     async def connect(self):
         retries = 5
@@ -37,6 +39,7 @@ class RedisManager:
                 self.client = Redis(**self.redis_config)
                 # Test the connection
                 await self.client.ping()
+                self.loop = asyncio.get_running_loop()
                 logger.info("Connected to Redis Cluster.")
                 return
             except (ConnectionError, TimeoutError) as e:
@@ -78,6 +81,93 @@ redis_manager = RedisManager(
     password=REDIS_PASSWORD,
 )
 
+STOP_CHANNEL = "stop-generation"
+STOP_MARKER_TTL = 30
+
+
+def stop_marker_key(message_id: str) -> str:
+    return f"stop:{message_id}"
+
+
+class StopRegistry:
+    """
+    Push-based stop signals for streaming responses.
+    Each stream registers an asyncio.Event for its message_id. Every worker holds one Redis
+    pub/sub subscription on STOP_CHANNEL and sets the event when a stop for a stream it owns
+    arrives, so streams check a local flag instead of polling Redis.
+    """
+
+    def __init__(self, redis_manager: RedisManager):
+        self.redis_manager = redis_manager
+        self.events: Dict[str, asyncio.Event] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def close(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self):
+        delay = 1
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.redis_manager.client.pubsub()
+                await pubsub.subscribe(STOP_CHANNEL)
+                delay = 1
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        event = self.events.get(message.get("data"))
+                        if event:
+                            event.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Stop signal subscription lost: {e}; resubscribing in {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    async def register(self, message_id: str) -> asyncio.Event:
+        event = self.events.setdefault(message_id, asyncio.Event())
+        # A stop sent before the stream registered is only visible through its marker key
+        try:
+            if await self.redis_manager.safe_execute("get", stop_marker_key(message_id)):
+                event.set()
+        except Exception as e:
+            logger.warning(f"Could not read stop marker for {message_id}: {e}")
+        return event
+
+    def unregister(self, message_id: str):
+        self.events.pop(message_id, None)
+
+    def is_stopped(self, message_id: str) -> bool:
+        event = self.events.get(message_id)
+        return bool(event and event.is_set())
+
+    async def request_stop(self, message_id: str):
+        event = self.events.get(message_id)
+        if event:
+            event.set()
+        await self.redis_manager.safe_execute("set", stop_marker_key(message_id), "1", ex=STOP_MARKER_TTL)
+        await self.redis_manager.safe_execute("publish", STOP_CHANNEL, message_id)
+
+
+stop_registry = StopRegistry(redis_manager)
+
 def generate_otp(length: int = 6) -> str:
     return "".join(random.choices(string.digits, k=length))
 
@@ -183,8 +273,4 @@ def create_success_html(access_token,base_url):
 
 
 async def check_stop_conversation(session_id: str, message_id: str):
-    stop_msg = await redis_manager.safe_execute("get", f"stop:{session_id}")
-    if stop_msg == message_id:
-        return True
-    else:
-        return False
\ No newline at end of file
+    return stop_registry.is_stopped(message_id)
\ No newline at end of file
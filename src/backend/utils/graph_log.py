@@ -0,0 +1,102 @@
+import os
+import time
+import zlib
+import reprlib
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+import orjson
+
+# off: nothing, errors: errors only, updates: + user input and node updates,
+# messages: + formatted non-chunk messages, full: + every streamed chunk
+GRAPH_LOG_LEVELS = {"off": 0, "errors": 1, "updates": 2, "messages": 3, "full": 4}
+KIND_LEVELS = {"error": 1, "human_input": 2, "update": 2, "message": 3, "chunk": 4}
+
+GRAPH_LOG_LEVEL = GRAPH_LOG_LEVELS.get(os.getenv("GRAPH_LOG_LEVEL", "messages").lower(), GRAPH_LOG_LEVELS["messages"])
+GRAPH_LOG_MAX_BYTES = int(os.getenv("GRAPH_LOG_MAX_BYTES", 256 * 1024))
+GRAPH_LOG_ENTRY_MAX_CHARS = int(os.getenv("GRAPH_LOG_ENTRY_MAX_CHARS", 4000))
+GRAPH_LOG_CHUNK_ENTRIES = int(os.getenv("GRAPH_LOG_CHUNK_ENTRIES", 200))
+
+# Bounded repr so logging a full graph state doesn't walk every message in it
+_repr = reprlib.Repr()
+_repr.maxlevel = 5
+_repr.maxdict = 10
+_repr.maxlist = 10
+_repr.maxtuple = 10
+_repr.maxstring = 400
+_repr.maxother = 400
+
+
+def _kind_of(kind: str, payload: Any) -> str:
+    if kind != "message":
+        return kind
+    items = payload if isinstance(payload, list) else [payload]
+    if items and all(isinstance(item, dict) and str(item.get('type', '')).endswith('chunk') for item in items):
+        return "chunk"
+    return kind
+
+
+def graph_log_entry(kind: str, payload: Any, agent: Optional[Any] = None) -> Optional[Dict[str, Any]]:
+    """
+    Build the `{"graph_log": entry}` item a processor yields for the stream to collect,
+    or None when GRAPH_LOG_LEVEL samples this kind out. The payload is rendered here with
+    a bounded repr and truncated to GRAPH_LOG_ENTRY_MAX_CHARS.
+    """
+    kind = _kind_of(kind, payload)
+    if KIND_LEVELS.get(kind, 0) > GRAPH_LOG_LEVEL:
+        return None
+
+    data = payload if isinstance(payload, str) else _repr.repr(payload)
+    if len(data) > GRAPH_LOG_ENTRY_MAX_CHARS:
+        data = data[:GRAPH_LOG_ENTRY_MAX_CHARS] + f"... [{len(data) - GRAPH_LOG_ENTRY_MAX_CHARS} chars truncated]"
+
+    entry = {"ts": time.time(), "kind": kind, "data": data}
+    if agent:
+        entry["agent"] = str(agent)
+    return {"graph_log": entry}
+
+
+class GraphLogBuffer:
+    """
+    Size-capped ring buffer of graph log entries for one message.
+    Once the rendered entries exceed GRAPH_LOG_MAX_BYTES the oldest are dropped and counted.
+    """
+
+    def __init__(self, max_bytes: int = GRAPH_LOG_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries: Deque[Dict[str, Any]] = deque()
+        self.size = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def append(self, entry: Dict[str, Any]):
+        self.entries.append(entry)
+        self.size += len(entry["data"])
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            self.size -= len(self.entries.popleft()["data"])
+            self.dropped += 1
+
+    def to_chunks(self, chunk_entries: int = GRAPH_LOG_CHUNK_ENTRIES) -> List[Dict[str, Any]]:
+        """zlib-compressed JSON chunks of at most `chunk_entries` entries, ready for a `$push`."""
+        entries = list(self.entries)
+        created_at = datetime.now(timezone.utc)
+        chunks = []
+        for i in range(0, len(entries), chunk_entries):
+            batch = entries[i:i + chunk_entries]
+            chunks.append({
+                "created_at": created_at,
+                "entries": len(batch),
+                "codec": "zlib+json",
+                "data": zlib.compress(orjson.dumps(batch)),
+            })
+        return chunks
+
+
+def decode_graph_log_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Entries stored by GraphLogBuffer.to_chunks, in write order."""
+    entries = []
+    for chunk in chunks:
+        entries.extend(orjson.loads(zlib.decompress(chunk["data"])))
+    return entries
@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+from src.backend.utils.api_utils import redis_manager
+import src.backend.utils.sse_replay as sse_replay
+
+# inline: the web worker that accepted /query-stream runs the agent (default).
+# queue: the request enqueues a job and a separate worker pool (python -m src.backend.worker) runs it.
+AGENT_EXECUTION_MODE = os.getenv("AGENT_EXECUTION_MODE", "inline").lower()
+AGENT_QUEUE_KEY = os.getenv("AGENT_QUEUE_KEY", "agent_jobs")
+# Admission control: new queries are refused while this many jobs are waiting
+AGENT_QUEUE_MAX_DEPTH = int(os.getenv("AGENT_QUEUE_MAX_DEPTH", 100))
+AGENT_WORKER_CONCURRENCY = int(os.getenv("AGENT_WORKER_CONCURRENCY", 4))
+AGENT_QUEUE_POLL_SECONDS = int(os.getenv("AGENT_QUEUE_POLL_SECONDS", 5))
+
+METRICS_KEY = f"{AGENT_QUEUE_KEY}:metrics"
+WORKERS_KEY = f"{AGENT_QUEUE_KEY}:workers"
+WORKER_HEARTBEAT_TTL = 30
+# A worker whose heartbeat is this old is presumed dead and its jobs are recovered
+WORKER_DEAD_AFTER = WORKER_HEARTBEAT_TTL * 3
+
+
+def processing_key(worker_id: str) -> str:
+    """Jobs a worker has taken and not finished; they outlive the worker so they can be recovered."""
+    return f"{AGENT_QUEUE_KEY}:processing:{worker_id}"
+
+
+def queue_mode() -> bool:
+    return AGENT_EXECUTION_MODE == "queue"
+
+
+async def enqueue(job: Dict[str, Any]) -> bool:
+    """
+    Queue `job` for the worker pool. Returns False, without queuing, when the queue is full.
+    The depth check and the push are separate commands, so the limit is approximate under bursts.
+    """
+    depth = await redis_manager.safe_execute("llen", AGENT_QUEUE_KEY)
+    if depth >= AGENT_QUEUE_MAX_DEPTH:
+        await redis_manager.safe_execute("hincrby", METRICS_KEY, "rejected", 1)
+        return False
+
+    payload = json.dumps({**job, "enqueued_at": time.time()})
+    await redis_manager.safe_execute("lpush", AGENT_QUEUE_KEY, payload)
+    await redis_manager.safe_execute("hincrby", METRICS_KEY, "enqueued", 1)
+    return True
+
+
+async def queue_metrics() -> Dict[str, Any]:
+    """Queue depth, running jobs, live workers and lifetime counters, shared by all web and agent workers."""
+    depth = await redis_manager.safe_execute("llen", AGENT_QUEUE_KEY)
+    counters = await redis_manager.safe_execute("hgetall", METRICS_KEY) or {}
+    workers = await redis_manager.safe_execute("hgetall", WORKERS_KEY) or {}
+    now = time.time()
+    live_workers = {}
+    inflight = 0
+    for worker, info in workers.items():
+        info = json.loads(info)
+        if now - info["seen"] < WORKER_HEARTBEAT_TTL:
+            live_workers[worker] = info
+        # Jobs of a dead worker count until they are recovered
+        inflight += await redis_manager.safe_execute("llen", processing_key(worker))
+    counters = {name: float(value) if "." in value else int(value) for name, value in counters.items()}
+    completed = counters.get("completed", 0) + counters.get("failed", 0)
+    return {
+        "mode": AGENT_EXECUTION_MODE,
+        "depth": depth,
+        "max_depth": AGENT_QUEUE_MAX_DEPTH,
+        "inflight": inflight,
+        "workers": live_workers,
+        "capacity": sum(info["concurrency"] for info in live_workers.values()),
+        "avg_wait_seconds": round(counters.get("wait_seconds", 0) / completed, 2) if completed else 0.0,
+        "avg_run_seconds": round(counters.get("run_seconds", 0) / completed, 2) if completed else 0.0,
+        **counters,
+    }
+
+
+async def recover_jobs(dead_worker_id: str, worker_id: str) -> Dict[str, int]:
+    """
+    Take back the jobs a dead worker had taken. A job whose run never wrote to its message's
+    stream goes back to the head of the queue; a job that had started is not run twice (its
+    frames are already out), so its stream gets an error and END and the client can retry.
+    Each job moves through `worker_id`'s processing list, so a crash mid-recovery loses nothing.
+    """
+    recovered = {"requeued": 0, "failed": 0}
+    own_key = processing_key(worker_id)
+    while True:
+        raw = await redis_manager.safe_execute("lmove", processing_key(dead_worker_id), own_key, "RIGHT", "LEFT")
+        if raw is None:
+            break
+        job = json.loads(raw)
+        if await sse_replay.run_started(job["message_id"]):
+            await sse_replay.fail_run(job["message_id"], "The server running this query stopped. Please retry.")
+            recovered["failed"] += 1
+        else:
+            await redis_manager.safe_execute("rpush", AGENT_QUEUE_KEY, raw)
+            recovered["requeued"] += 1
+        await redis_manager.safe_execute("lrem", own_key, 1, raw)
+
+    await redis_manager.safe_execute("hdel", WORKERS_KEY, dead_worker_id)
+    if recovered["requeued"]:
+        await redis_manager.safe_execute("hincrby", METRICS_KEY, "requeued", recovered["requeued"])
+    if recovered["failed"]:
+        await redis_manager.safe_execute("hincrby", METRICS_KEY, "failed", recovered["failed"])
+    return recovered
+
+
+class AgentWorkerPool:
+    """
+    Pulls jobs off AGENT_QUEUE_KEY and runs up to `concurrency` of them at once with `handler`.
+    A worker only takes a job when it has a free slot, so waiting jobs stay in Redis for
+    whichever worker frees up first. A taken job is moved, not popped, into the worker's
+    processing list and removed once it finishes; live workers recover the jobs of dead ones.
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Awaitable[None]], concurrency: int = AGENT_WORKER_CONCURRENCY):
+        self.handler = handler
+        self.concurrency = concurrency
+        self.worker_id = f"{os.uname().nodename}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.processing_key = processing_key(self.worker_id)
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks = set()
+        self._stopping = False
+        # The heartbeat outlives `stop`: a draining worker is still alive and its jobs must not be recovered
+        self._closed = False
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    async def _heartbeat(self):
+        while not self._closed:
+            try:
+                info = json.dumps({"concurrency": self.concurrency, "running": len(self._tasks), "seen": time.time()})
+                await redis_manager.safe_execute("hset", WORKERS_KEY, self.worker_id, info)
+                await self._recover_dead_workers()
+            except Exception as e:
+                print(f"Agent worker heartbeat failed: {e}")
+            await asyncio.sleep(WORKER_HEARTBEAT_TTL / 3)
+
+    async def _recover_dead_workers(self):
+        workers = await redis_manager.safe_execute("hgetall", WORKERS_KEY) or {}
+        now = time.time()
+        for worker, info in workers.items():
+            if worker != self.worker_id and now - json.loads(info)["seen"] >= WORKER_DEAD_AFTER:
+                recovered = await recover_jobs(worker, self.worker_id)
+                print(f"Agent worker {worker} is gone: requeued {recovered['requeued']}, failed {recovered['failed']} of its jobs")
+
+    async def _run_job(self, raw: str):
+        started = time.time()
+        outcome = "completed"
+        try:
+            job = json.loads(raw)
+            await redis_manager.safe_execute("hincrbyfloat", METRICS_KEY, "wait_seconds", started - job.pop("enqueued_at", started))
+            await self.handler(job)
+        except Exception as e:
+            outcome = "failed"
+            print(f"Agent job failed on {self.worker_id}: {e}")
+        finally:
+            self._slots.release()
+            try:
+                # Ack: the job is done with either way, so it is not recovered
+                await redis_manager.safe_execute("lrem", self.processing_key, 1, raw)
+                await redis_manager.safe_execute("hincrby", METRICS_KEY, outcome, 1)
+                await redis_manager.safe_execute("hincrbyfloat", METRICS_KEY, "run_seconds", time.time() - started)
+            except Exception as e:
+                print(f"Agent job metrics update failed: {e}")
+
+    async def run(self):
+        print(f"Agent worker {self.worker_id} started with {self.concurrency} slots")
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        while not self._stopping:
+            await self._slots.acquire()
+            try:
+                raw: Optional[str] = await redis_manager.safe_execute("blmove", AGENT_QUEUE_KEY, self.processing_key, AGENT_QUEUE_POLL_SECONDS, "RIGHT", "LEFT")
+            except Exception as e:
+                self._slots.release()
+                print(f"Agent queue poll failed: {e}")
+                await asyncio.sleep(AGENT_QUEUE_POLL_SECONDS)
+                continue
+
+            if not raw:
+                self._slots.release()
+                continue
+
+            task = asyncio.create_task(self._run_job(raw))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def stop(self):
+        """Stop taking new jobs; `run` returns after its current poll."""
+        self._stopping = True
+
+    async def close(self):
+        """Stop taking jobs and wait for the running ones to finish."""
+        self.stop()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._closed = True
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+        # A recovery cut short by shutdown leaves its job here; keep the entry so another worker recovers it
+        if not await redis_manager.safe_execute("llen", self.processing_key):
+            await redis_manager.safe_execute("hdel", WORKERS_KEY, self.worker_id)
@@ -0,0 +1,353 @@
+import asyncio
+import time
+import traceback
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from typing import Any, AsyncGenerator, Dict
+from fastapi import BackgroundTasks
+import src.backend.db.mongodb as mongodb
+from src.backend.db.mongodb import handle_partial_data_storage
+from src.backend.utils.agent_comm import process_agent_input_functional
+from src.ai.agents.fast_agent import process_fast_agent_input
+from src.ai.agents.summarizer import stream_summary
+from src.backend.utils.api_utils import stop_registry
+from src.backend.utils.sse import sse_frame, TokenCoalescer
+from src.backend.utils.graph_log import GraphLogBuffer
+
+
+def query_job(user_id: str, query, ip_address: str) -> Dict[str, Any]:
+    """Everything a /query-stream run needs, as a JSON-serialisable job that can run in-process or on a worker."""
+    return {
+        "user_id": user_id,
+        "user_query": query.user_query,
+        "session_id": query.session_id,
+        "realtime_info": query.realtime_info,
+        "search_mode": query.search_mode,
+        "retry_response": query.retry_response,
+        "message_id": query.message_id,
+        "prev_message_id": query.prev_message_id,
+        "timezone": query.timezone,
+        "doc_ids": query.doc_ids,
+        "ip_address": ip_address,
+        "is_elaborate": query.is_elaborate,
+        "is_example": query.is_example,
+    }
+
+
+async def run_query(job: Dict[str, Any], bgt: BackgroundTasks) -> AsyncGenerator[bytes, None]:
+    """Run the agent for a query job and yield its SSE frames. Storage writes are queued on `bgt`."""
+    user_id = job["user_id"]
+    user_query = job["user_query"]
+    session_id = job["session_id"]
+    realtime_info = job["realtime_info"]
+    search_mode = job["search_mode"]
+    retry_response = job["retry_response"]
+    message_id = job["message_id"]
+    prev_message_id = job["prev_message_id"]
+    timezone = job["timezone"]
+    doc_ids = job["doc_ids"]
+    ip_address = job["ip_address"]
+    is_elaborate = job["is_elaborate"]
+    is_example = job["is_example"]
+    local_time = datetime.now(ZoneInfo(timezone))
+
+    session_info_event_data = {
+        "session_id": session_id,
+        "message_id": message_id,
+        "status": "starting query processing"
+    }
+    yield sse_frame(session_info_event_data, event="session_info")
+
+    coalescer = TokenCoalescer(message_id)
+    stock_graph = set()
+    user_data = await mongodb.fetch_user_by_id(user_id)
+    user_name = user_data.full_name if user_data and user_data.full_name else "user"
+    error_flag = False
+    graph_log = GraphLogBuffer()
+    current_messages_log = []
+    processor_iterator = None
+    stop_waiter = None
+    time_taken = 0
+
+
+     # Variables to track partial data for storage
+    partial_content_buffer = []  # Store all streamed content chunks
+    partial_sources = []
+    partial_related_queries = []
+    partial_metadata = None
+
+    try:
+        if search_mode == 'summarizer':
+            async for event in stream_summary(user_id, session_id, message_id, prev_message_id, user_query, local_time, timezone, is_elaborate, is_example):
+                yield event.encode('utf-8')
+            return
+            
+        else:
+            if search_mode == 'fast':
+                processor_iterator = process_fast_agent_input(
+                    user_id=user_id,
+                    session_id=session_id,
+                    user_query=user_query,
+                    message_id=message_id,
+                    prev_message_id=prev_message_id,
+                    timezone = timezone,
+                    ip_address = ip_address,
+                    doc_ids = doc_ids
+                )
+
+            else:
+                pro_reasoning = (search_mode == 'agentic-reasoning')
+
+                processor_iterator = process_agent_input_functional(
+                    user_id=user_id,
+                    session_id=session_id,
+                    user_query=user_query,
+                    message_id=message_id,
+                    prev_message_id=prev_message_id,
+                    realtime_info=realtime_info,
+                    pro_reasoning=pro_reasoning,
+                    retry_response=retry_response,
+                    timezone = timezone,
+                    ip_address = ip_address,
+                    doc_ids = doc_ids,
+                )
+                
+        TIMEOUT_PERIOD = 300
+        KEEP_ALIVE_INTERVAL = 5
+        KEEP_ALIVE_COUNT = 0
+        MAX_KEEP_ALIVE_COUNT = 60
+        ELABORATE_CHUNK_LIMIT = 300 * 15  # answers longer than 300 of the old 15-chunk batches
+        # Stop requests are pushed to this event by the worker's pub/sub listener; no Redis I/O in the loop
+        stop_event = await stop_registry.register(message_id)
+        stop_waiter = asyncio.create_task(stop_event.wait())
+        await mongodb.append_data(user_id, session_id, message_id, current_messages_log, local_time, timezone)
+        while True:
+            if stop_event.is_set():
+                raise asyncio.CancelledError("User requested stop")
+            try:
+                processor_task = asyncio.create_task(anext(processor_iterator))
+                try:
+                    while True:
+                        # Wake up early when buffered tokens are due so a stalled agent doesn't hold them back
+                        timeout = coalescer.time_left() if coalescer else KEEP_ALIVE_INTERVAL
+                        done, _ = await asyncio.wait({processor_task, stop_waiter}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                        if stop_waiter in done:
+                            processor_task.cancel()
+                            raise asyncio.CancelledError("User requested stop")
+                        if processor_task in done:
+                            try:
+                                data_from_processor = processor_task.result()
+                                KEEP_ALIVE_COUNT = 0  # Reset keep-alive count
+                            except asyncio.CancelledError:
+                                print("Processor task was cancelled.")
+                                stream_completed = True
+                                break
+                            except StopAsyncIteration:
+                                stream_completed = True
+                                break
+                            except Exception as e:
+                                print("Exception in processor task:", e)
+                                continue
+
+                            if not data_from_processor:
+                                continue    
+                            break
+
+                        elif coalescer:
+                            yield coalescer.flush()
+
+                        else:
+                            KEEP_ALIVE_COUNT += 1
+                            if KEEP_ALIVE_COUNT >= MAX_KEEP_ALIVE_COUNT:
+                                processor_task.cancel()
+                                try:
+                                    await processor_task
+                                except Exception:
+                                    pass
+                                raise RuntimeError(f"No update from processor for {TIMEOUT_PERIOD} seconds. Stream aborted.")
+                            yield sse_frame({'type': 'Keep-alive', 'alive-counter': KEEP_ALIVE_COUNT})
+
+                # except StopAsyncIteration:
+                #     stream_completed = True
+                #     break
+                except Exception as e:
+                    traceback.print_exc()
+                    raise RuntimeError(f"Error in waiting for data: {str(e)}")
+
+                data_to_send = data_from_processor
+
+                if 'start_stream' in data_to_send:
+                    payload = {"type": "connected", "message_id": message_id}
+                    yield sse_frame(payload)
+
+                    if search_mode == "agentic-planner" or "agentic-reasoning":
+                        progress_payload = {"type": "progress", "progress_bar": 0.0}
+                        yield sse_frame(progress_payload)
+                        
+
+                elif 'type' in data_to_send and data_to_send['type'].endswith('chunk'):
+                    # Store chunk content for partial data recovery
+                    if 'content' in data_to_send:
+                        partial_content_buffer.append((data_to_send.get('agent_name', ''), data_to_send['content']))
+
+                    frame = coalescer.add(data_to_send)
+                    if frame:
+                        yield frame
+
+                else:
+                    if coalescer:
+                        yield coalescer.flush()
+
+                    # Only non-chunk events get tagged with the message id, so copy just these
+                    data_to_send = data_to_send.copy()
+                    if 'type' in data_to_send:
+                        if data_to_send['type'] == 'stock_data':
+                            symbol = data_to_send['data']['realtime']['symbol']
+                            if symbol not in stock_graph:
+                                stock_graph.add(symbol)
+                                stock_payload = {"stock_data": data_to_send.get('data'), "message_id": message_id, "id": data_to_send.get('chat_session_id', '')}
+                                yield sse_frame(stock_payload, event="stock_chart")
+
+                       
+                        elif data_to_send['type'] == 'map_layers':
+                            data_to_send['message_id'] = message_id
+                            yield sse_frame(data_to_send, event="map_data")
+                        
+                        else:
+                            data_to_send['message_id'] = message_id
+                            yield sse_frame(data_to_send)
+                    elif 'graph_log' in data_to_send:
+                        graph_log.append(data_to_send['graph_log'])
+                    elif 'enriched_content' in data_to_send:
+                        current_messages_log.append(data_to_send['enriched_content'])
+
+                    elif 'time' in data_to_send:
+                        time_taken = data_to_send.get('in_seconds', 0)
+                        time_payload = {
+                            "type": "response_time", 
+                            "content": data_to_send['time'],
+                            "message_id": message_id
+                        }
+                        yield sse_frame(time_payload)
+                    
+                    elif 'state' in data_to_send:
+                        if 'sources' in data_to_send and data_to_send.get('sources'):
+                            sources_payload = {"type": "sources", "content": data_to_send['sources'], "message_id": message_id}
+                            partial_sources.extend(data_to_send['sources'])
+                            yield sse_frame(sources_payload)
+
+                        if 'related_queries' in data_to_send and data_to_send.get('related_queries'):
+                            related_payload = {"type": "related_queries", "content": data_to_send['related_queries'], "message_id": message_id}
+                            partial_related_queries.extend(data_to_send['related_queries'])
+                            yield sse_frame(related_payload)
+
+                    elif 'error' in data_to_send:
+                        error_flag = True
+                        error_payload = {"type": "error", "content": data_to_send['error'], "message_id": message_id}
+
+                        # if not ("localhost" in website or "127.0.0.1" in website):
+                        #     await notify_slack_error(user_name or user_id, str(error_payload))
+
+                        yield sse_frame(error_payload)
+                    
+                    elif 'store_data' in data_to_send:
+                        store_data = data_to_send['store_data']
+                        store_data['retry'] = data_to_send.get('retry', False)
+                        partial_metadata = store_data.get('metadata', None)
+                        bgt.add_task(mongodb.append_data, user_id, session_id, message_id, current_messages_log, local_time, timezone, store_data['retry'], store_data.get('metadata', None), time_taken)
+
+                        yield sse_frame({'type': 'metadata', 'data': store_data.get('metadata',None)})
+
+                        # if not error_flag:
+                        #     yield f"data: {json.dumps({'type': 'complete', 'message_id': message_id, 'notification': data_to_send.get('notification', True), 'suggestions': data_to_send.get('suggestions', True)})}\n\n".encode('utf-8')
+
+                        if not error_flag:
+                            complete_payload = {
+                                'type': 'complete', 
+                                'message_id': message_id, 
+                                'notification': data_to_send.get('notification', True), 
+                                'suggestions': data_to_send.get('suggestions', True),
+                                # 'retry': data_to_send.get('retry', False),
+                                'retry': store_data['retry']
+                            }
+
+                            if search_mode == "agentic-planner" or "agentic-reasoning":
+                                progress_payload = {"type": "progress", "progress_bar": 100.0}
+                                yield sse_frame(progress_payload)
+                            
+                            if coalescer.chunk_count > ELABORATE_CHUNK_LIMIT:
+                                complete_payload['is_elaborate'] = False
+                            else:
+                                complete_payload['is_elaborate'] = True                             
+                                
+                            yield sse_frame(complete_payload)
+
+                        if graph_log:
+                            bgt.add_task(mongodb.append_graph_log_to_mongo, session_id, message_id, graph_log)
+
+                        break
+
+                    elif 'logs' in data_to_send:
+                        if 'metadata' in data_to_send:
+                            yield sse_frame({'type': 'metadata', 'data': data_to_send.get('metadata',None)})
+
+                        if not error_flag:
+                            complete_payload = {
+                                'type': 'complete',
+                                'message_id': message_id,
+                                'notification': False,
+                                'suggestions': False,
+                                'retry': True
+                            }
+
+                            if search_mode == "agentic-planner" or "agentic-reasoning":
+                                progress_payload = {"type": "progress", "progress_bar": 100.0}
+                                yield sse_frame(progress_payload)
+
+                            if coalescer.chunk_count > ELABORATE_CHUNK_LIMIT:
+                                complete_payload['is_elaborate'] = False
+                            else:
+                                complete_payload['is_elaborate'] = True        
+
+                            # yield f"data: {json.dumps({'type': 'complete', 'message_id': message_id, 'notification': False, 'suggestions': False})}\n\n".encode('utf-8')
+                            yield sse_frame(complete_payload)
+
+                        bgt.add_task(mongodb.append_graph_log_to_mongo, session_id, message_id, graph_log)
+                        break
+            except Exception as e:
+                traceback.print_exc()
+                raise RuntimeError(f"Data retrieval error: {str(e)}")
+    except asyncio.CancelledError:
+    
+       
+       print("User stopped query processing or timeout occurred.")
+       # Handle partial data storage for cancelled/stopped streams
+       await handle_partial_data_storage(
+            user_id=user_id,
+            session_id=session_id,
+            message_id=message_id,
+            partial_content_buffer=partial_content_buffer,
+            current_messages_log=current_messages_log,
+            partial_sources=partial_sources,
+            partial_related_queries=partial_related_queries,
+            partial_metadata=partial_metadata,
+            graph_log=graph_log,
+            local_time=local_time,
+            timezone=timezone,
+            time_taken=time_taken,
+            bgt=bgt,
+            is_cancelled=True
+        )
+       return
+    except Exception as e:
+        traceback.print_exc()
+        error_payload = {"type": "error", "content": f"Critical stream processing error: {str(e)}", "message_id": message_id}
+
+        # if not ("localhost" in website or "127.0.0.1" in website):
+        #     await notify_slack_error(user_name or user_id, str(error_payload))
+
+        yield sse_frame(error_payload)
+    finally:
+        if stop_waiter:
+            stop_waiter.cancel()
+        stop_registry.unregister(message_id)
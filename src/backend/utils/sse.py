@@ -0,0 +1,88 @@
+import os
+import time
+from typing import Any, Dict, List, Optional
+import orjson
+
+SSE_FLUSH_INTERVAL = float(os.getenv("SSE_FLUSH_INTERVAL", 0.04))
+SSE_FLUSH_BYTES = int(os.getenv("SSE_FLUSH_BYTES", 2048))
+
+
+def _default(value: Any) -> str:
+    return str(value)
+
+
+def sse_frame(payload: Dict[str, Any], event: Optional[str] = None) -> bytes:
+    """Encode one Server-Sent Event straight to bytes."""
+    data = orjson.dumps(payload, default=_default)
+    if event:
+        return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+    return b"data: " + data + b"\n\n"
+
+
+class TokenCoalescer:
+    """
+    Merges consecutive streamed chunks of the same agent into one SSE frame.
+    A frame is flushed when the agent or chunk type changes, when the buffered text
+    reaches SSE_FLUSH_BYTES, or once the oldest buffered chunk is SSE_FLUSH_INTERVAL old.
+    """
+
+    def __init__(self, message_id: str, flush_interval: float = SSE_FLUSH_INTERVAL, flush_bytes: int = SSE_FLUSH_BYTES):
+        self.message_id = message_id
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.chunk_count = 0
+        self._head: Optional[Dict[str, Any]] = None
+        self._content: List[str] = []
+        self._title: List[str] = []
+        self._size = 0
+        self._started = 0.0
+
+    def __bool__(self) -> bool:
+        return self._head is not None
+
+    def time_left(self) -> Optional[float]:
+        """Seconds until the buffer is due for a time-based flush, or None when it is empty."""
+        if self._head is None:
+            return None
+        return max(0.0, self._started + self.flush_interval - time.monotonic())
+
+    def add(self, chunk: Dict[str, Any]) -> Optional[bytes]:
+        """Buffer `chunk`; returns the frame of the previous buffer if it had to be flushed first."""
+        frame = None
+        if self._head is not None and (chunk.get('agent_name') != self._head.get('agent_name') or chunk.get('type') != self._head.get('type')):
+            frame = self.flush()
+
+        if self._head is None:
+            self._head = chunk
+            self._started = time.monotonic()
+        self.chunk_count += 1
+        if 'content' in chunk:
+            self._content.append(chunk['content'] or '')
+            self._size += len(chunk['content'] or '')
+        if 'title' in chunk:
+            self._title.append(chunk['title'] or '')
+            self._size += len(chunk['title'] or '')
+
+        if frame is None and (self._size >= self.flush_bytes or self.time_left() == 0.0):
+            frame = self.flush()
+        return frame
+
+    def flush(self) -> Optional[bytes]:
+        if self._head is None:
+            return None
+        batched_event = {
+            "type": self._head.get('type', 'unknown_chunk_type'),
+            "agent_name": self._head.get('agent_name', ''),
+            "message_id": self.message_id,
+            "id": self._head.get('id', '')
+        }
+        if self._content:
+            batched_event["content"] = "".join(self._content)
+        if self._title:
+            batched_event["title"] = "".join(self._title)
+
+        self._head = None
+        self._content = []
+        self._title = []
+        self._size = 0
+        return sse_frame(batched_event)
@@ -0,0 +1,170 @@
+import os
+import time
+import asyncio
+from typing import AsyncIterator, Optional
+from fastapi import BackgroundTasks
+from src.backend.utils.api_utils import redis_manager, stop_marker_key
+from src.backend.utils.sse import sse_frame
+
+# Every frame of a /query-stream run is appended to a per-message Redis Stream. The HTTP response
+# only tails that stream, so a dropped client can reconnect with Last-Event-ID and pick up where it
+# left off while the run itself carries on (and is paid for) exactly once.
+SSE_STREAM_TTL = int(os.getenv("SSE_STREAM_TTL", 15 * 60))
+SSE_STREAM_MAXLEN = int(os.getenv("SSE_STREAM_MAXLEN", 20000))
+SSE_TAIL_BLOCK_MS = int(os.getenv("SSE_TAIL_BLOCK_MS", 5000))
+# A run that has not written anything for this long (e.g. its worker died) ends the tail
+SSE_TAIL_IDLE_TIMEOUT = int(os.getenv("SSE_TAIL_IDLE_TIMEOUT", 300))
+# A live run pushes the stream's and the claim's expiry out again this often, so neither
+# expires under a run longer than SSE_STREAM_TTL; the TTL then counts from the run's END
+SSE_TTL_REFRESH_SECONDS = int(os.getenv("SSE_TTL_REFRESH_SECONDS", 30))
+
+FRAME_FIELD = "f"
+END_FIELD = "end"
+
+_runs = set()
+
+# Ownership check, liveness check and re-claim in one step, so a retry can neither wipe another
+# user's stream nor race the run it replaces. A run is live until its END entry is written; a claim
+# whose stream has no entries yet is a run that has not started. The stop marker left by stopping
+# the previous run is cleared too, or it would stop the retry as soon as it registers.
+_RESTART_SCRIPT = """
+local owner = redis.call('GET', KEYS[2])
+if owner and owner ~= ARGV[1] then
+    return 0
+end
+local last = redis.call('XREVRANGE', KEYS[1], '+', '-', 'COUNT', 1)
+if #last > 0 then
+    if last[1][2][1] ~= ARGV[3] then
+        return 0
+    end
+elseif owner then
+    return 0
+end
+redis.call('DEL', KEYS[1], KEYS[3])
+redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+
+def stream_key(message_id: str) -> str:
+    return f"sse:{message_id}"
+
+
+def run_key(message_id: str) -> str:
+    return f"sse_run:{message_id}"
+
+
+def available() -> bool:
+    """Durable streams need the app loop's Redis client; without it /query-stream streams directly."""
+    try:
+        return redis_manager.client is not None and redis_manager.loop is asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+
+
+async def claim_run(message_id: str, user_id: str, restart: bool = False) -> bool:
+    """
+    True when the caller should start the run for `message_id`; False when a run for it is
+    live or still replayable, in which case the caller should tail it instead.
+    `restart` drops the previous run's events first (used for retries), but only when that run
+    belongs to `user_id` and has ended; otherwise it returns False and leaves the run alone.
+    """
+    if restart:
+        return bool(await redis_manager.safe_execute(
+            "eval", _RESTART_SCRIPT, 3, stream_key(message_id), run_key(message_id), stop_marker_key(message_id),
+            user_id, SSE_STREAM_TTL, END_FIELD,
+        ))
+    return bool(await redis_manager.safe_execute("set", run_key(message_id), user_id, nx=True, ex=SSE_STREAM_TTL))
+
+
+async def release_run(message_id: str):
+    """Give up a claim that was never started, so the client can try again."""
+    await redis_manager.safe_execute("delete", run_key(message_id))
+
+
+async def run_owner(message_id: str) -> Optional[str]:
+    return await redis_manager.safe_execute("get", run_key(message_id))
+
+
+async def run_started(message_id: str) -> bool:
+    """Whether a run has written anything to the message's stream yet."""
+    return bool(await redis_manager.safe_execute("exists", stream_key(message_id)))
+
+
+async def fail_run(message_id: str, content: str):
+    """End the stream of a run that died without ending it, so its clients get an error instead of waiting."""
+    key = stream_key(message_id)
+    frame = sse_frame({"type": "error", "content": content, "message_id": message_id})
+    await redis_manager.safe_execute("xadd", key, {FRAME_FIELD: frame}, maxlen=SSE_STREAM_MAXLEN, approximate=True)
+    await redis_manager.safe_execute("xadd", key, {END_FIELD: "1"})
+    await redis_manager.safe_execute("expire", key, SSE_STREAM_TTL)
+    await redis_manager.safe_execute("expire", run_key(message_id), SSE_STREAM_TTL)
+
+
+async def publish(message_id: str, frames: AsyncIterator[bytes], background: BackgroundTasks):
+    """
+    Drain `frames` into the message's stream, then run the tasks the run queued on `background`.
+    Runs detached from any request; a failing Redis write is logged and the run still completes.
+    """
+    key = stream_key(message_id)
+    write_failed = False
+    refreshed_at = None
+
+    async def _append(fields: dict):
+        nonlocal write_failed, refreshed_at
+        try:
+            await redis_manager.safe_execute("xadd", key, fields, maxlen=SSE_STREAM_MAXLEN, approximate=True)
+            now = time.monotonic()
+            if refreshed_at is None or now - refreshed_at >= SSE_TTL_REFRESH_SECONDS:
+                refreshed_at = now
+                await redis_manager.safe_execute("expire", key, SSE_STREAM_TTL)
+                await redis_manager.safe_execute("expire", run_key(message_id), SSE_STREAM_TTL)
+        except Exception as e:
+            if not write_failed:
+                print(f"SSE stream write failed for {message_id}: {e}")
+            write_failed = True
+
+    try:
+        async for frame in frames:
+            await _append({FRAME_FIELD: frame})
+    except Exception as e:
+        print(f"SSE run for {message_id} failed: {e}")
+    finally:
+        await _append({END_FIELD: "1"})
+        try:
+            await redis_manager.safe_execute("expire", key, SSE_STREAM_TTL)
+            await redis_manager.safe_execute("expire", run_key(message_id), SSE_STREAM_TTL)
+        except Exception as e:
+            print(f"SSE stream expiry failed for {message_id}: {e}")
+        await background()
+
+
+def start(message_id: str, frames: AsyncIterator[bytes], background: BackgroundTasks):
+    """Start `publish` as a task that is not tied to the request that asked for it."""
+    task = asyncio.create_task(publish(message_id, frames, background))
+    _runs.add(task)
+    task.add_done_callback(_runs.discard)
+
+
+async def tail(message_id: str, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+    """Replay the message's frames after `last_event_id` (all of them by default), then follow live ones."""
+    key = stream_key(message_id)
+    last_id = last_event_id or "0-0"
+    idle = 0.0
+
+    while True:
+        response = await redis_manager.safe_execute("xread", {key: last_id}, count=100, block=SSE_TAIL_BLOCK_MS)
+        if not response:
+            idle += SSE_TAIL_BLOCK_MS / 1000
+            if idle >= SSE_TAIL_IDLE_TIMEOUT or not await redis_manager.safe_execute("exists", key, run_key(message_id)):
+                return
+            continue
+
+        idle = 0.0
+        for _, entries in response:
+            for entry_id, fields in entries:
+                last_id = entry_id
+                if END_FIELD in fields:
+                    return
+                # The stream entry id doubles as the SSE id the browser sends back as Last-Event-ID
+                yield f"id: {entry_id}\n".encode() + fields[FRAME_FIELD].encode()
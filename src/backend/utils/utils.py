@@ -708,10 +708,12 @@ async def format_social_media_agent_update(agent_name, stream_mode, update):
                             op = json.loads(msg.content)
                             update_links = []
                             link_data = []
+                            # Each post's search cache key comes in the tool's artifact, outside what the LLM reads
+                            cache_keys = msg.artifact or {}
                             for post in op:
                                 if 'link' in post and 'title' in post:
                                     sources.append({'link': post['link'], 'title': post['title'], 'snippet': post.get('snippet') or post.get('title', ''), 'favicon': get_favicon_link(
-                                        post['link']), 'domain': 'X.COM'})
+                                        post['link']), 'domain': 'X.COM', 'cache_key': cache_keys.get(post['link'])})
 
                                     update_links.extend([f"[X.com]({post['link']})"])
                                     link_data.extend([post['link']])
@@ -1175,9 +1177,11 @@ async def format_task_router_update(agent_name, stream_mode, update):
                     return response_list
 
                 value = update.get(message_container_key, {})
-                current_task_dict = value.get('current_task')
+                # The router can start several independent tasks at once
+                task_dicts = value.get('dispatched_tasks') or [value.get('current_task')]
+                task_dicts = [task for task in task_dicts if task and isinstance(task, dict)]
 
-                if not current_task_dict or not isinstance(current_task_dict, dict):
+                if not task_dicts:
                     return response_list
 
                 if value.get('progress_bar'):
@@ -1187,12 +1191,13 @@ async def format_task_router_update(agent_name, stream_mode, update):
                         'progress_bar': value['progress_bar']
                     })
 
-                markdown_output = f"**Task Router** is initiating ***{current_task_dict['agent_name']}*** to perform the task '*{current_task_dict['task_name']}*'."
-                if current_task_dict.get('task_feedback'):
-                    markdown_output = f"**Task Validator** is retrying the task '*{current_task_dict['task_name']}*' {current_task_dict['retry']}th time through ***{current_task_dict['agent_name']}*** with following feedback:\n{current_task_dict['task_feedback']}"
-                # markdown_output += f"with following instructions:\n{value['instructions']}"
-                response_list.append({'type': 'task_change', 'agent_name': current_task_dict['agent_name'],
-                        'task_name': current_task_dict['task_name'], 'id': get_unique_response_id()})
+                for current_task_dict in task_dicts:
+                    markdown_output = f"**Task Router** is initiating ***{current_task_dict['agent_name']}*** to perform the task '*{current_task_dict['task_name']}*'."
+                    if current_task_dict.get('task_feedback'):
+                        markdown_output = f"**Task Validator** is retrying the task '*{current_task_dict['task_name']}*' {current_task_dict['retry']}th time through ***{current_task_dict['agent_name']}*** with following feedback:\n{current_task_dict['task_feedback']}"
+                    # markdown_output += f"with following instructions:\n{value['instructions']}"
+                    response_list.append({'type': 'task_change', 'agent_name': current_task_dict['agent_name'],
+                            'task_name': current_task_dict['task_name'], 'id': get_unique_response_id()})
                 return response_list
                     # else:
                     #     return {'type': 'message', 'agent_name': agent_name, 'content': "Solution generated by specialized agents."}
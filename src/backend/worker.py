@@ -0,0 +1,45 @@
+import asyncio
+import signal
+from typing import Any, Dict
+from fastapi import BackgroundTasks
+from src.backend.db import mongodb
+from src.backend.utils.api_utils import redis_manager, stop_registry
+from src.backend.utils.job_queue import AgentWorkerPool
+from src.backend.utils.query_runner import run_query
+from src.ai.tools import http_client
+from src.ai.llm.model import close_llm_pool
+from src.ai.tools.text_cleaning import shutdown_cleaning_pool
+import src.backend.utils.sse_replay as sse_replay
+
+
+async def handle_query_job(job: Dict[str, Any]):
+    """Run a queued /query-stream job; its frames go to the message's Redis Stream the web workers relay."""
+    bgt = BackgroundTasks()
+    await sse_replay.publish(job["message_id"], run_query(job, bgt), bgt)
+
+
+async def main():
+    await mongodb.init_db()
+    await mongodb.init_fmp_db()
+    await redis_manager.connect()
+    await stop_registry.start()
+
+    pool = AgentWorkerPool(handle_query_job)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, pool.stop)
+
+    try:
+        await pool.run()
+    finally:
+        # Let running answers finish before shutting down
+        await pool.close()
+        await stop_registry.close()
+        await http_client.close_session()
+        await close_llm_pool()
+        shutdown_cleaning_pool()
+        mongodb.close_fmp_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Run from a plain checkout: import `src` from the repo root and give the model config dummy credentials
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LLM_PROVIDER", "openai")
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,26 @@
+from src.ai.tools.result_dedup import drop_near_duplicates
+
+ARTICLE = "Apple shares rose three percent on Tuesday after the company reported record services revenue for the quarter"
+
+
+def test_results_without_content_are_all_kept():
+    results = [
+        {"link": "https://a.example", "content": ""},
+        {"link": "https://b.example", "content": None},
+        {"link": "https://c.example", "content": "no snippet"},
+    ]
+    kept, dropped, _ = drop_near_duplicates(results, [0.9, 0.8, 0.7])
+    assert [r["link"] for r in kept] == ["https://a.example", "https://b.example", "https://c.example"]
+    assert dropped == 0
+
+
+def test_syndicated_copy_folds_into_best_scoring_result():
+    results = [
+        {"link": "https://wire.example", "content": ARTICLE},
+        {"link": "https://mirror.example", "content": ARTICLE + " Reporting by staff"},
+        {"link": "https://empty.example", "content": ""},
+    ]
+    kept, dropped, _ = drop_near_duplicates(results, [0.5, 0.9, 0.1])
+    assert [r["link"] for r in kept] == ["https://mirror.example", "https://empty.example"]
+    assert kept[0]["duplicate_links"] == ["https://wire.example"]
+    assert dropped == 1
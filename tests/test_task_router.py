@@ -0,0 +1,55 @@
+from langgraph.graph import END
+from src.ai.agents.utils import _ready_tasks, task_router_node
+
+RESPONSE_GENERATOR = "Response Generator Agent"
+
+
+def _plan():
+    # t1; t2 needs t1; t3 (Response Generator) only names t1 but must still wait for t2
+    return [
+        {"task_name": "t1", "agent_name": "Web Search Agent", "required_context": []},
+        {"task_name": "t2", "agent_name": "Finance Data Agent", "required_context": ["t1"]},
+        {"task_name": "t3", "agent_name": RESPONSE_GENERATOR, "required_context": ["t1"]},
+    ]
+
+
+def _run_router(task_list):
+    """Drive task_router_node wave by wave, completing every dispatched task; returns the waves."""
+    state = {"task_list": task_list, "completed_tasks": [], "progress_bar": 0.0}
+    waves = []
+    while True:
+        command = task_router_node(state)
+        state = {**state, **command.update}
+        if command.goto == END:
+            return waves
+        sends = command.goto
+        waves.append([send.node for send in sends])
+        assert len(waves) < 10, "router keeps re-dispatching"
+        state["completed_tasks"] = state["completed_tasks"] + [send.arg["current_task"] for send in sends]
+
+
+def test_response_generator_waits_for_every_other_task():
+    task_list = _plan()
+    assert [task["task_name"] for task in _ready_tasks(task_list)] == ["t1"]
+
+    task_list[0]["status"] = "completed"
+    assert [task["task_name"] for task in _ready_tasks(task_list)] == ["t2"]
+
+    task_list[1]["status"] = "completed"
+    assert [task["task_name"] for task in _ready_tasks(task_list)] == ["t3"]
+
+
+def test_response_generator_is_dispatched_once_and_alone():
+    waves = _run_router(_plan())
+    assert waves == [["Web Search Agent"], ["Finance Data Agent"], [RESPONSE_GENERATOR]]
+
+
+def test_cyclic_context_falls_back_to_a_non_final_task():
+    task_list = [
+        {"task_name": "t1", "agent_name": "Web Search Agent", "required_context": ["t2"]},
+        {"task_name": "t2", "agent_name": "Finance Data Agent", "required_context": ["t1"]},
+        {"task_name": "t3", "agent_name": RESPONSE_GENERATOR, "required_context": []},
+    ]
+    waves = _run_router(task_list)
+    assert waves[-1] == [RESPONSE_GENERATOR]
+    assert sum(wave.count(RESPONSE_GENERATOR) for wave in waves) == 1